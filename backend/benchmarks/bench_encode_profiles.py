@@ -0,0 +1,73 @@
+# bench_encode_profiles.py
+"""
+Encode speed / size per overlay encoding profile.
+
+Burns a synthetic SRT into frontend/public/sample_video.mp4 once per profile
+(using the overlay service's own FFmpeg command) and reports encode fps,
+wall time and output size as JSON.
+
+    python bench_encode_profiles.py [--video path] [--profiles balanced archival]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "overlay"))
+sys.path.insert(0, os.path.join(HERE, "..", "shared"))
+import overlay  # noqa: E402
+
+SAMPLE_VIDEO = os.path.join(HERE, "..", "..", "frontend", "public", "sample_video.mp4")
+
+
+def write_srt(path: str, cues: int = 120) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(cues):
+            f.write(f"{i + 1}\n00:{i // 60:02d}:{i % 60:02d},000 --> 00:{i // 60:02d}:{i % 60:02d},900\n")
+            f.write(f"Subtitle line {i + 1}\n\n")
+
+
+def bench(video: str, srt: str, name: str, style: dict) -> dict:
+    profile = overlay.resolve_profile(name)
+    out = os.path.join(tempfile.mkdtemp(), f"out.{profile['container']}")
+    cmd = overlay.build_burn_cmd(video, srt, out, style, profile)
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - t0
+    if proc.returncode != 0:
+        return {"profile": name, "error": proc.stderr[-500:]}
+    frames = re.findall(r"frame=\s*(\d+)", proc.stderr)
+    frames = int(frames[-1]) if frames else 0
+    size = os.path.getsize(out)
+    os.remove(out)
+    return {
+        "profile": name,
+        "encoder": overlay.select_video_encoder(),
+        "container": profile["container"],
+        "seconds": round(elapsed, 2),
+        "frames": frames,
+        "encode_fps": round(frames / elapsed, 1) if elapsed else None,
+        "output_bytes": size,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", default=SAMPLE_VIDEO)
+    ap.add_argument("--profiles", nargs="*", default=list(overlay.ENCODING_PROFILES))
+    args = ap.parse_args()
+
+    srt = os.path.join(tempfile.mkdtemp(), "bench.srt")
+    write_srt(srt)
+    results = [bench(args.video, srt, name, {}) for name in args.profiles]
+    print(json.dumps({"video": os.path.abspath(args.video), "input_bytes": os.path.getsize(args.video),
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
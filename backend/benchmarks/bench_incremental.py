@@ -0,0 +1,92 @@
+# bench_incremental.py
+"""
+Incremental re-translation: edit a few cues of a long SRT and compare a full
+/translate with one that also sends the previous source and translation.
+
+Builds an N-cue SRT, translates it once (deterministic model), then edits --edits
+cues (reworded), shifts --retime others by a few hundred ms, deletes one and
+inserts one, and translates the edited file both ways. Checks that every
+output cue carries the expected translation and the new timing.
+
+    python bench_incremental.py --cues 2000 --edits 5 --retime 50 --latency 0.05
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "translation"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+import translation  # noqa: E402
+import deterministic_model  # noqa: E402
+import subtitles  # noqa: E402
+
+
+class Upload:
+    def __init__(self, name: str, data: bytes):
+        self.filename, self.file = name, io.BytesIO(data)
+
+
+def srt_bytes(cues) -> bytes:
+    buf = io.StringIO()
+    subtitles.write_srt(cues, buf)
+    return buf.getvalue().encode()
+
+
+def translate(fake, source: bytes, previous=None) -> tuple:
+    calls = fake.calls
+    t0 = time.perf_counter()
+    out, stats = translation.run_translation(tempfile.mkdtemp(), Upload("in.srt", source), "fr", None,
+                                             tuple(Upload(n, b) for n, b in zip(("p.srt", "t.srt"), previous))
+                                             if previous else None)
+    with open(out, "rb") as f:
+        return f.read(), {"seconds": round(time.perf_counter() - t0, 3), "model_calls": fake.calls - calls,
+                          "stats": stats.get("efficiency", {})}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cues", type=int, default=2000)
+    ap.add_argument("--edits", type=int, default=5)
+    ap.add_argument("--retime", type=int, default=50)
+    ap.add_argument("--latency", type=float, default=0.05)
+    args = ap.parse_args()
+
+    translation.TM = None  # measure the diff, not the translation memory
+    fake = deterministic_model.install(translation, latency=args.latency)
+    rng = random.Random(1)
+    old = [subtitles.Cue(i + 1, i * 2000, i * 2000 + 1500, f"cue number {i + 1} says something")
+           for i in range(args.cues)]
+    old_src = srt_bytes(old)
+    old_tr, _ = translate(fake, old_src)
+
+    new = [subtitles.Cue(c.index, c.start, c.end, c.text) for c in old]
+    for i in rng.sample(range(args.cues), args.edits):
+        new[i].text = f"reworded cue {i + 1}"
+    for i in rng.sample(range(args.cues), args.retime):
+        new[i].start += 300
+        new[i].end += 300
+    del new[args.cues // 2]
+    new.insert(args.cues // 3, subtitles.Cue(0, new[args.cues // 3].start - 400, new[args.cues // 3].start - 50,
+                                             "a brand new cue"))
+    new_src = srt_bytes(new)
+
+    full, full_report = translate(fake, new_src)
+    incremental, inc_report = translate(fake, new_src, (old_src, old_tr))
+    expected = [(c.start, c.end, deterministic_model.deterministic_translate(c.text)) for c in new]
+    got = [(c.start, c.end, c.text) for c in subtitles.parse_srt(incremental.decode())]
+    print(json.dumps({
+        "cues": args.cues, "edited": args.edits, "retimed": args.retime, "deleted": 1, "inserted": 1,
+        "full": full_report,
+        "incremental": inc_report,
+        "incremental_matches_expected": got == expected,
+        "full_matches_expected": [(c.start, c.end, c.text) for c in subtitles.parse_srt(full.decode())] == expected,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# bench_load.py
+"""
+Load test of the whole pipeline on one machine, for regression tracking.
+
+Starts four processes: stub_services as the extractor (returns a ZIP with a
+synthetic transcript), the real translation service with a deterministic
+backend (fake_translator), the real overlay service (FFmpeg must be on
+PATH) and the real orchestrator wired to them. Then runs --jobs jobs,
+--concurrency at a time, each one:
+
+    POST /process_initial (wait=true) with sample_video.mp4
+    POST /overlay for that job, reading the whole video back
+
+and prints JSON with p50/p95/p99 latency per step and per job, throughput
+and each service's peak RSS (VmHWM from /proc, so Linux only; FFmpeg child
+processes are not included).
+
+Every job uploads a slightly different video (random trailing bytes) and
+gets a fresh transcript text, so no cache layer hits; --reuse-video sends the
+same bytes every time to measure the cached path instead.
+
+    python bench_load.py --jobs 20 --concurrency 4 --cues 5 --model-latency 0.05 --out load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from bench_orchestrator_memory import HERE, ORCH_DIR, free_port, peak_rss_mb, start
+
+OVERLAY_DIR = os.path.join(HERE, "..", "overlay")
+SAMPLE_VIDEO = os.path.join(HERE, "..", "..", "frontend", "public", "sample_video.mp4")
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    q = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+    return {"n": len(values), "p50": round(q[49], 3), "p95": round(q[94], 3), "p99": round(q[98], 3),
+            "max": round(max(values), 3)}
+
+
+async def run_job(client: httpx.AsyncClient, video: bytes, args) -> dict:
+    result = {"ok": False}
+    t0 = time.perf_counter()
+    try:
+        r = await client.post("/process_initial", files={"file": ("sample.mp4", video, "video/mp4")},
+                              data={"target_lang": args.lang, "wait": "true"})
+        r.raise_for_status()
+        job = r.json()
+        t1 = time.perf_counter()
+        result["process_initial"] = t1 - t0
+        if not args.skip_overlay:
+            data = {"job_id": job["job_id"], "style_json": args.style_json, "mode": args.mode}
+            if args.profile:
+                data["profile"] = args.profile
+            received = 0
+            async with client.stream("POST", "/overlay", data=data) as r:
+                r.raise_for_status()
+                async for chunk in r.aiter_bytes():
+                    received += len(chunk)
+            result["overlay"] = time.perf_counter() - t1
+            result["overlay_bytes"] = received
+        result["job"] = time.perf_counter() - t0
+        result["ok"] = True
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+async def drive(url: str, args) -> tuple:
+    with open(SAMPLE_VIDEO, "rb") as f:
+        sample = f.read()
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def one(_):
+        # Trailing bytes change the content hash without breaking the MP4.
+        video = sample if args.reuse_video else sample + os.urandom(16)
+        async with slots:
+            return await run_job(client, video, args)
+
+    async with httpx.AsyncClient(base_url=url, timeout=None) as client:
+        for n in range(args.warmup):
+            await one(n)
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(one(n) for n in range(args.jobs)))
+        return results, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jobs", type=int, default=20)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--warmup", type=int, default=1, help="jobs run (and not counted) before the measured ones")
+    ap.add_argument("--cues", type=int, default=5, help="cues in the stub transcript (2 s apart)")
+    ap.add_argument("--lang", default="fr")
+    ap.add_argument("--model-latency", type=float, default=0.05, help="seconds per fake model call")
+    ap.add_argument("--extractor-latency", type=float, default=0.0, help="seconds per stub /transcribe call")
+    ap.add_argument("--mode", choices=("burn", "soft"), default="burn")
+    ap.add_argument("--profile", default=None, help="overlay encoding profile")
+    ap.add_argument("--style-json", default="{}")
+    ap.add_argument("--skip-overlay", action="store_true", help="only drive /process_initial")
+    ap.add_argument("--reuse-video", action="store_true", help="same video every job (cache hits)")
+    ap.add_argument("--out", help="also write the JSON report here")
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_load_")
+    ports = {name: free_port() for name in ("extractor", "translator", "overlay", "orchestrator")}
+    procs = {}
+    try:
+        procs["extractor"] = start("stub_services:app", HERE, ports["extractor"], {
+            "STUB_CUES": str(args.cues),
+            "STUB_LATENCY": str(args.extractor_latency),
+            "STUB_UNIQUE_CUES": "false" if args.reuse_video else "true",
+        })
+        procs["translator"] = start("fake_translator:app", HERE, ports["translator"], {
+            "FAKE_MODEL_LATENCY": str(args.model_latency),
+            "TM_PATH": os.path.join(work, "tm.sqlite3"),
+        })
+        procs["overlay"] = start("overlay:app", OVERLAY_DIR, ports["overlay"], {
+            "ASSET_DIR": os.path.join(work, "assets"),
+            "RENDER_DIR": os.path.join(work, "renders"),
+        })
+        base = {name: f"http://127.0.0.1:{port}" for name, port in ports.items()}
+        procs["orchestrator"] = start("orchestrator:app", ORCH_DIR, ports["orchestrator"], {
+            "EXTRACTOR_URL": f"{base['extractor']}/transcribe",
+            "TRANSLATOR_URL": f"{base['translator']}/translate",
+            "OVERLAY_URL": f"{base['overlay']}/overlay",
+            "CACHE_DIR": os.path.join(work, "cache"),
+            "JOB_DIR": os.path.join(work, "jobs"),
+        })
+
+        results, wall = asyncio.run(drive(base["orchestrator"], args))
+        ok = [r for r in results if r["ok"]]
+        report = {
+            "config": {k: v for k, v in vars(args).items() if k != "out"},
+            "wall_s": round(wall, 3),
+            "jobs_ok": len(ok),
+            "jobs_failed": len(results) - len(ok),
+            "throughput_jobs_per_s": round(len(ok) / wall, 3) if wall else None,
+            "latency_s": {step: percentiles([r[step] for r in ok if step in r])
+                          for step in ("process_initial", "overlay", "job")},
+            "peak_rss_mb": {name: round(peak_rss_mb(p.pid), 1) for name, p in procs.items()},
+            "errors": sorted({r["error"] for r in results if not r["ok"]}),
+        }
+    finally:
+        for p in procs.values():
+            p.terminate()
+            p.wait()
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# bench_orchestrator_memory.py
+"""
+Peak-RSS benchmark for the orchestrator with a large synthetic video.
+
+Starts stub_services and the real orchestrator as separate uvicorn processes,
+pushes a sparse N MB file through /process_initial and /overlay, then reports
+the orchestrator's peak RSS (VmHWM from /proc, so Linux only).
+
+    python bench_orchestrator_memory.py --size-mb 2048 --chunk-kb 1024
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ORCH_DIR = os.path.join(HERE, "..", "orchestrator")
+SHARED_DIR = os.path.join(HERE, "..", "shared")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def service_env(env: dict) -> dict:
+    """os.environ plus `env`, with the shared package on PYTHONPATH (the services import it)."""
+    env = {**os.environ, **env}
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (SHARED_DIR, env.get("PYTHONPATH")) if p)
+    return env
+
+
+def start(module: str, cwd: str, port: int, env: dict) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning"],
+        cwd=cwd, env=service_env(env),
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=0.5)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{module} did not start")
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-mb", type=int, default=2048)
+    ap.add_argument("--chunk-kb", type=int, default=1024, help="orchestrator STREAM_CHUNK_SIZE")
+    args = ap.parse_args()
+
+    video = tempfile.mkstemp(suffix=".mp4")[1]
+    with open(video, "wb") as f:
+        f.truncate(args.size_mb * 1024 * 1024)
+
+    stub_port, orch_port = free_port(), free_port()
+    stub = start("stub_services:app", HERE, stub_port, {})
+    orch = None
+    try:
+        base = f"http://127.0.0.1:{stub_port}"
+        orch = start("orchestrator:app", ORCH_DIR, orch_port, {
+            "EXTRACTOR_URL": f"{base}/transcribe",
+            "TRANSLATOR_URL": f"{base}/translate",
+            "OVERLAY_URL": f"{base}/overlay",
+            "STREAM_CHUNK_SIZE": str(args.chunk_kb * 1024),
+            "OVERLAY_ASSET_UPLOADS": "false",  # measure the full video round trip through /overlay
+            "CACHE_DIR": tempfile.mkdtemp(),
+        })
+        idle_rss = peak_rss_mb(orch.pid)
+
+        orch_url = f"http://127.0.0.1:{orch_port}"
+        t0 = time.perf_counter()
+        with httpx.Client(timeout=None) as client, open(video, "rb") as vf:
+            r = client.post(f"{orch_url}/process_initial",
+                            files={"file": ("big.mp4", vf, "video/mp4")}, data={"target_lang": "fr", "wait": "true"})
+            r.raise_for_status()
+            job_id = r.json()["job_id"]
+            t1 = time.perf_counter()
+            received = 0
+            with client.stream("POST", f"{orch_url}/overlay", data={"job_id": job_id, "style_json": "{}"}) as r:
+                r.raise_for_status()
+                for chunk in r.iter_bytes():
+                    received += len(chunk)
+        t2 = time.perf_counter()
+
+        print(json.dumps({
+            "video_mb": args.size_mb,
+            "stream_chunk_kb": args.chunk_kb,
+            "orchestrator_idle_rss_mb": round(idle_rss, 1),
+            "orchestrator_peak_rss_mb": round(peak_rss_mb(orch.pid), 1),
+            "process_initial_s": round(t1 - t0, 2),
+            "overlay_s": round(t2 - t1, 2),
+            "overlay_bytes_ok": received == args.size_mb * 1024 * 1024,
+        }, indent=2))
+    finally:
+        for p in (orch, stub):
+            if p:
+                p.terminate()
+                p.wait()
+        os.remove(video)
+
+
+if __name__ == "__main__":
+    main()
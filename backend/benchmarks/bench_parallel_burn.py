@@ -0,0 +1,124 @@
+# bench_parallel_burn.py
+"""
+Segment-parallel burn: correctness check + speedup vs. segment count.
+
+Builds a longer clip by looping frontend/public/sample_video.mp4, burns a
+dense synthetic SRT (stacked cues deliberately straddling the keyframe cuts) with the
+single-process command and with burn_segments_parallel for each segment
+count, and reports the speedup.
+
+Correctness is checked with a lossless (CRF 0) encode of both paths: every
+decoded frame of the parallel output must hash identically (framemd5) and
+carry the same timestamp as the single-process output, so a dropped,
+duplicated or shifted cue at a segment boundary fails the check.
+
+    python bench_parallel_burn.py --loops 12 --segments 1 2 4 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "overlay"))
+sys.path.insert(0, os.path.join(HERE, "..", "shared"))
+import overlay  # noqa: E402
+import subtitles  # noqa: E402
+
+SAMPLE_VIDEO = os.path.join(HERE, "..", "..", "frontend", "public", "sample_video.mp4")
+
+
+def make_long_video(loops: int, workdir: str) -> str:
+    out = os.path.join(workdir, "long.mp4")
+    subprocess.run(["ffmpeg", "-y", "-stream_loop", str(loops - 1), "-i", SAMPLE_VIDEO,
+                    "-c:v", "libx264", "-preset", "ultrafast", "-g", "60", "-c:a", "copy", out],
+                   check=True, capture_output=True)
+    return out
+
+
+def make_srt(duration: float, workdir: str) -> str:
+    path = os.path.join(workdir, "dense.srt")
+    cues, t, n = [], 0, 0
+    while t < duration * 1000:
+        n += 1
+        cues.append(subtitles.Cue(n, t, t + 1700, f"Cue {n} at {t / 1000:.1f}s"))
+        # Runs of four overlapping, odd-length cues (stacked by libass) with a
+        # short gap between runs, so some runs always straddle segment cuts.
+        t += 1300 if n % 4 else 2700
+    subtitles.write_srt(cues, path)
+    return path
+
+
+LOSSLESS = {"name": "lossless-check", "preset": "ultrafast", "crf": 0, "tune": None, "container": "mkv"}
+
+
+def frame_hashes(path: str) -> list:
+    """[(pts, md5)] for every decoded video frame."""
+    out = subprocess.run(["ffmpeg", "-i", path, "-map", "0:v:0", "-f", "framemd5", "-"],
+                         capture_output=True, text=True).stdout
+    rows = [line.split(",") for line in out.splitlines() if line and not line.startswith("#")]
+    return [(r[2].strip(), r[5].strip()) for r in rows]
+
+
+def compare(reference: list, candidate: list) -> dict:
+    mismatched = [i for i, (a, b) in enumerate(zip(reference, candidate)) if a != b]
+    return {
+        "frames": len(candidate),
+        "frames_match": len(candidate) == len(reference),
+        "identical": not mismatched and len(candidate) == len(reference),
+        "first_mismatched_frames": mismatched[:10],
+    }
+
+
+def timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--loops", type=int, default=12, help="sample_video repeats (10 s each)")
+    ap.add_argument("--segments", type=int, nargs="*", default=[2, 4, os.cpu_count() or 1])
+    ap.add_argument("--profile", default="balanced")
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    video = make_long_video(args.loops, workdir)
+    duration = overlay.probe_duration(video)
+    srt = make_srt(duration, workdir)
+    profile = overlay.resolve_profile(args.profile)
+    ext = profile["container"]
+
+    single = os.path.join(workdir, f"single.{ext}")
+    base_s = timed(lambda: subprocess.run(overlay.build_burn_cmd(video, srt, single, {}, profile),
+                                          check=True, capture_output=True))
+
+    ref_path = os.path.join(workdir, "single_lossless.mkv")
+    subprocess.run(overlay.build_burn_cmd(video, srt, ref_path, {}, LOSSLESS), check=True, capture_output=True)
+    reference = frame_hashes(ref_path)
+
+    results = [{"segments": 1, "seconds": round(base_s, 2), "speedup": 1.0}]
+    for n in sorted(set(n for n in args.segments if n > 1)):
+        out = os.path.join(workdir, f"parallel_{n}.{ext}")
+        secs = timed(lambda: asyncio.run(overlay.burn_segments_parallel(video, srt, out, {}, profile, n, duration)))
+
+        check = os.path.join(workdir, f"parallel_{n}_lossless.mkv")
+        asyncio.run(overlay.burn_segments_parallel(video, srt, check, {}, LOSSLESS, n, duration))
+        results.append({
+            "segments": n,
+            "seconds": round(secs, 2),
+            "speedup": round(base_s / secs, 2),
+            "vs_single_process": compare(reference, frame_hashes(check)),
+        })
+
+    print(json.dumps({"duration_s": round(duration, 2), "cpu_count": os.cpu_count(),
+                      "single_frames": len(reference), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
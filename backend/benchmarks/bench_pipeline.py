@@ -0,0 +1,105 @@
+# bench_pipeline.py
+"""
+End-to-end latency of a pipelined job vs. the stage-by-stage flow.
+
+Starts stub_services (with per-stage latency that grows with the input) and
+the real orchestrator, then for each run uploads a fresh synthetic video and
+measures upload -> final video:
+
+  sequential  /process_initial (wait) then /overlay: translate everything,
+              then burn everything
+  pipelined   /process_initial with style_json (wait) then
+              GET /jobs/{id}/output: windows are translated concurrently and
+              each one is burned as soon as its translation is back
+
+    python bench_pipeline.py --cues 600 --per-cue 0.02 --render-speed 20 --render-slots 1 --chunk-seconds 120
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from bench_orchestrator_memory import HERE, ORCH_DIR, free_port, start
+
+
+def run_once(client: httpx.Client, url: str, pipelined: bool) -> dict:
+    video = os.urandom(256 * 1024)  # new content each run, so no result cache hits
+    data = {"target_lang": "fr", "wait": "true"}
+    if pipelined:
+        data["style_json"] = "{}"
+    t0 = time.perf_counter()
+    r = client.post(f"{url}/process_initial", files={"file": ("v.mp4", video, "video/mp4")}, data=data)
+    r.raise_for_status()
+    job_id = r.json()["job_id"]
+    if pipelined:
+        r = client.get(f"{url}/jobs/{job_id}/output")
+    else:
+        r = client.post(f"{url}/overlay", data={"job_id": job_id, "style_json": "{}"})
+    r.raise_for_status()
+    total = time.perf_counter() - t0
+    job = client.get(f"{url}/jobs/{job_id}").json()
+    return {"total_s": total, "timings": job["timings"], "render": job["render"]}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cues", type=int, default=600, help="transcript cues (2 s apart)")
+    ap.add_argument("--per-cue", type=float, default=0.02, help="stub translator seconds per cue")
+    ap.add_argument("--render-speed", type=float, default=20, help="stub overlay media seconds per second")
+    ap.add_argument("--render-slots", type=int, default=1, help="stub overlay concurrent renders (encode slots)")
+    ap.add_argument("--latency", type=float, default=0.2, help="stub fixed latency per call")
+    ap.add_argument("--chunk-seconds", type=float, default=120, help="orchestrator PIPELINE_CHUNK_SECONDS")
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    stub_port, orch_port = free_port(), free_port()
+    stub = start("stub_services:app", HERE, stub_port, {
+        "STUB_CUES": str(args.cues),
+        "STUB_LATENCY": str(args.latency),
+        "STUB_TRANSLATE_PER_CUE": str(args.per_cue),
+        "STUB_RENDER_SPEED": str(args.render_speed),
+        "STUB_RENDER_SLOTS": str(args.render_slots),
+    })
+    orch = None
+    try:
+        base = f"http://127.0.0.1:{stub_port}"
+        orch = start("orchestrator:app", ORCH_DIR, orch_port, {
+            "EXTRACTOR_URL": f"{base}/transcribe",
+            "TRANSLATOR_URL": f"{base}/translate",
+            "OVERLAY_URL": f"{base}/overlay",
+            "CACHE_DIR": tempfile.mkdtemp(),
+            "PIPELINE_CHUNK_SECONDS": str(args.chunk_seconds),
+        })
+        url = f"http://127.0.0.1:{orch_port}"
+        results = {}
+        with httpx.Client(timeout=None) as client:
+            for mode in ("sequential", "pipelined"):
+                runs = [run_once(client, url, mode == "pipelined") for _ in range(args.runs)]
+                results[mode] = {
+                    "median_s": round(statistics.median(r["total_s"] for r in runs), 2),
+                    "runs_s": [round(r["total_s"], 2) for r in runs],
+                    "last_timings": runs[-1]["timings"],
+                    "render": runs[-1]["render"],
+                }
+        print(json.dumps({
+            "cues": args.cues,
+            "media_s": args.cues * 2,
+            "stub": {"latency_s": args.latency, "translate_s_per_cue": args.per_cue,
+                     "render_speed_x": args.render_speed, "render_slots": args.render_slots},
+            "chunk_seconds": args.chunk_seconds,
+            **results,
+            "speedup": round(results["sequential"]["median_s"] / results["pipelined"]["median_s"], 2),
+        }, indent=2))
+    finally:
+        for p in (orch, stub):
+            if p:
+                p.terminate()
+                p.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# bench_resume.py
+"""
+Resumed and seeked downloads of a final render through the orchestrator.
+
+Runs stub_services as extractor, translator and overlay (asset uploads off,
+so the stub overlay echoes the uploaded video back after STUB_RENDER_SPEED
+worth of simulated encoding) and the real orchestrator, then:
+
+  first      POST /overlay, read --drop-after MB and disconnect
+  resume     Range request for the rest on the Content-Location URL
+  seeks      --seeks random 1 MiB Range reads of the artifact
+  repeat     the same POST /overlay again, read in full
+  if_range   Range with a stale If-Range validator (must get the whole file)
+
+Checks every body against the uploaded video and prints timings, the number
+of overlay calls the orchestrator made (should be 1) and its peak RSS.
+
+    python bench_resume.py --video-mb 64 --render-speed 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+
+import httpx
+
+from bench_orchestrator_memory import HERE, ORCH_DIR, free_port, peak_rss_mb, start
+
+
+def overlay_calls(metrics: str) -> int:
+    return sum(int(float(n)) for n in re.findall(
+        r'^orchestrator_upstream_attempts_total\{[^}]*upstream="overlay"[^}]*\} (\S+)$', metrics, re.M))
+
+
+async def drive(url: str, video: bytes, args) -> dict:
+    report = {}
+    async with httpx.AsyncClient(base_url=url, timeout=None) as client:
+        r = await client.post("/process_initial", files={"file": ("sample.mp4", video, "video/mp4")},
+                              data={"target_lang": "fr", "wait": "true"})
+        r.raise_for_status()
+        form = {"job_id": r.json()["job_id"], "style_json": "{}"}
+
+        t0 = time.perf_counter()
+        first, drop = b"", args.drop_after * 2**20
+        async with client.stream("POST", "/overlay", data=form) as r:
+            r.raise_for_status()
+            location = r.headers["content-location"]
+            async for chunk in r.aiter_bytes():
+                first += chunk
+                if len(first) >= drop:
+                    break
+        report["first_s"] = round(time.perf_counter() - t0, 3)
+        report["first_bytes"] = len(first)
+
+        t0 = time.perf_counter()
+        r = await client.get(location, headers={"Range": f"bytes={len(first)}-"})
+        assert r.status_code == 206, r.status_code
+        assert first + r.content == video, "resumed body differs"
+        report["resume_s"] = round(time.perf_counter() - t0, 3)
+        etag = r.headers["etag"]
+
+        rng, seeks = random.Random(0), []
+        for _ in range(args.seeks):
+            start_byte = rng.randrange(0, len(video) - 2**20)
+            t0 = time.perf_counter()
+            r = await client.get(location, headers={"Range": f"bytes={start_byte}-{start_byte + 2**20 - 1}",
+                                                    "If-Range": etag})
+            seeks.append(time.perf_counter() - t0)
+            assert r.status_code == 206 and r.content == video[start_byte:start_byte + 2**20], "seek differs"
+        report["seek_ms_avg"] = round(1000 * sum(seeks) / len(seeks), 2) if seeks else None
+
+        t0 = time.perf_counter()
+        r = await client.post("/overlay", data=form)
+        assert r.status_code == 200 and r.content == video, "repeat body differs"
+        report["repeat_s"] = round(time.perf_counter() - t0, 3)
+
+        r = await client.get(location, headers={"Range": "bytes=0-99", "If-Range": '"stale"'})
+        assert r.status_code == 200 and len(r.content) == len(video), "stale If-Range was honoured"
+        report["if_range_stale_status"] = r.status_code
+
+        report["overlay_calls"] = overlay_calls((await client.get("/metrics")).text)
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video-mb", type=int, default=64)
+    ap.add_argument("--drop-after", type=int, default=8, help="MB read from the first /overlay before disconnecting")
+    ap.add_argument("--render-speed", type=float, default=20, help="stub media seconds encoded per second")
+    ap.add_argument("--cues", type=int, default=50, help="stub transcript cues (2 s apart)")
+    ap.add_argument("--seeks", type=int, default=20)
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_resume_")
+    video = os.urandom(args.video_mb * 2**20)
+    stub_port, orch_port = free_port(), free_port()
+    procs = {}
+    try:
+        procs["stubs"] = start("stub_services:app", HERE, stub_port, {
+            "STUB_CUES": str(args.cues), "STUB_RENDER_SPEED": str(args.render_speed)})
+        stub = f"http://127.0.0.1:{stub_port}"
+        procs["orchestrator"] = start("orchestrator:app", ORCH_DIR, orch_port, {
+            "EXTRACTOR_URL": f"{stub}/transcribe",
+            "TRANSLATOR_URL": f"{stub}/translate",
+            "OVERLAY_URL": f"{stub}/overlay",
+            "OVERLAY_ASSET_UPLOADS": "false",
+            "CACHE_DIR": os.path.join(work, "cache"),
+            "JOB_DIR": os.path.join(work, "jobs"),
+        })
+        report = asyncio.run(drive(f"http://127.0.0.1:{orch_port}", video, args))
+        report["video_mb"] = args.video_mb
+        report["orchestrator_peak_rss_mb"] = round(peak_rss_mb(procs["orchestrator"].pid), 1)
+    finally:
+        for p in procs.values():
+            p.terminate()
+            p.wait()
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench_scene.py
+"""
+Scene translation: one whole-script prompt vs. concurrent context windows,
+and ID alignment vs. the old position-based alignment, against the deterministic model.
+
+The fake model can merge every Nth tagged line into the previous one (as real
+models sometimes do). With ID alignment only the merged cue is wrong and its
+neighbour falls back; "positional_wrong" counts the cues the same answer
+would have mislabelled if lines were matched by counter, as before.
+
+    python bench_scene.py --lines 600 --latency 0.5 --per-line 0.01 --merge-every 97
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "translation"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+import translation  # noqa: E402
+import deterministic_model  # noqa: E402
+
+
+class ScaledModel(deterministic_model.DeterministicModel):
+    """Latency grows with the number of tagged lines in the prompt, like output tokens do."""
+
+    def __init__(self, per_line: float, **kwargs):
+        super().__init__(**kwargs)
+        self.per_line = per_line
+        self.base_latency = self.latency
+
+    def generate_content(self, prompt: str):
+        lines = sum(1 for l in prompt.split("\n") if deterministic_model._tagged.match(l))
+        self.latency = self.base_latency + self.per_line * lines
+        return super().generate_content(prompt)
+
+
+def run(lines: int, window: int, args) -> dict:
+    dialogue = [{"speaker": f"S{i % 3}", "text": f"line number {i + 1}"} for i in range(lines)]
+    subs = [{"index": i + 1, "start": i * 2000, "end": i * 2000 + 1500, "text": d["text"]}
+            for i, d in enumerate(dialogue)]
+    translation.TM = None
+    translation.SCENE_WINDOW_LINES = window
+    fake = ScaledModel(args.per_line, latency=args.latency, merge_every=args.merge_every)
+    translation.use_backend("deterministic", fake)
+
+    report = {}
+    t0 = time.perf_counter()
+    scene = translation.translate_scene(dialogue, "fr", report)
+    t1 = time.perf_counter()
+    aligned = translation.align_translations_to_srt(subs, scene, "fr", report)
+    elapsed = time.perf_counter() - t0
+
+    expected = [deterministic_model.deterministic_translate(s["text"]) for s in subs]
+    positional = [scene[i] for i in sorted(scene)]
+    return {
+        "window_lines": window,
+        "scene_s": round(t1 - t0, 3),
+        "total_s": round(elapsed, 3),
+        "model_calls": fake.calls,
+        "id_wrong": sum(a["translated_text"] != e for a, e in zip(aligned, expected)),
+        "positional_wrong": sum(p != e for p, e in zip(positional, expected)),
+        "efficiency": translation.translation_stats(aligned, "fr", report)["efficiency"],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=600)
+    ap.add_argument("--window", type=int, default=translation.SCENE_WINDOW_LINES)
+    ap.add_argument("--latency", type=float, default=0.5, help="fixed seconds per fake model call")
+    ap.add_argument("--per-line", type=float, default=0.01, help="extra seconds per tagged line in a prompt")
+    ap.add_argument("--merge-every", type=int, default=97, help="merge every Nth tagged line into the previous one")
+    args = ap.parse_args()
+
+    print(json.dumps([run(args.lines, args.lines, args), run(args.lines, args.window, args)], indent=2))
+
+
+if __name__ == "__main__":
+    main()
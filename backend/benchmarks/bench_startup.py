@@ -0,0 +1,77 @@
+# bench_startup.py
+"""
+Cold start of the translation service: time from spawning uvicorn until
+/healthz answers (live) and until /readyz answers 200 (ready: backend built),
+per translation backend. Trees without /readyz count as ready when live,
+which is what they reported.
+
+    python bench_startup.py --backends echo deterministic gemini --runs 3
+    python bench_startup.py --translation-dir /path/to/old/backend/translation
+
+gemini needs the google-generativeai package; --extra-path appends a
+directory holding it to sys.path (after the installed packages) and a dummy
+GOOGLE_API_KEY is set, so no request is made to the provider.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench_orchestrator_memory import HERE, free_port, service_env
+
+TRANSLATION_DIR = os.path.join(HERE, "..", "translation")
+
+
+def cold_start(backend: str, args) -> dict:
+    port = free_port()
+    code = (f"import sys; sys.path.extend({args.extra_path!r}); import uvicorn; "
+            f"uvicorn.run('translation:app', port={port}, log_level='warning')")
+    env = service_env({"TRANSLATION_BACKEND": backend, "TM_PATH": "", "GOOGLE_API_KEY": "dummy"})
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=args.translation_dir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+            while time.perf_counter() - t0 < args.timeout:
+                try:
+                    if "live_s" not in result:
+                        client.get("/healthz").raise_for_status()
+                        result["live_s"] = time.perf_counter() - t0
+                    r = client.get("/readyz")
+                    if r.status_code in (200, 404):
+                        result["ready_s"] = time.perf_counter() - t0
+                        return result
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.01)
+        return result
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", nargs="+", default=["echo", "deterministic", "gemini"])
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--timeout", type=float, default=30)
+    ap.add_argument("--translation-dir", default=TRANSLATION_DIR)
+    ap.add_argument("--extra-path", nargs="*", default=[])
+    args = ap.parse_args()
+
+    report = {}
+    for backend in args.backends:
+        runs = [cold_start(backend, args) for _ in range(args.runs)]
+        report[backend] = {k: round(statistics.median(r[k] for r in runs), 3) if all(k in r for r in runs) else None
+                           for k in ("live_s", "ready_s")}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# bench_subtitles.py
+"""
+Parse/write throughput and peak memory of the shared subtitles module on a
+large SRT (default 100k cues, with a BOM, CRLF line ends and a few malformed
+blocks mixed in).
+
+  legacy     read the whole file, regex-split into blocks, list of dicts
+             (what translation.parse_srt_file used to do)
+  cuelist    subtitles.read_srt -> CueList
+  stream_*   subtitles.iter_srt piped straight into write_srt / write_vtt /
+             write_ass, never holding the cues
+
+Wall time is measured untraced; peak memory is traced Python allocation
+(tracemalloc) of a second run of the same step.
+
+    python bench_subtitles.py --cues 100000
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+import subtitles  # noqa: E402
+
+ASS_HEADER = "[Script Info]\nScriptType: v4.00+\nPlayResX: 384\nPlayResY: 288\n"
+
+
+def make_srt(path: str, cues: int, malformed_every: int) -> None:
+    with open(path, "w", encoding="utf-8-sig", newline="\r\n") as f:
+        t = 0
+        for n in range(1, cues + 1):
+            if malformed_every and n % malformed_every == 0:
+                f.write(f"{n}\nnot a timing line\n\n")
+                continue
+            f.write(f"{n}\n{subtitles.format_srt_time(t)} --> {subtitles.format_srt_time(t + 1800)}\n"
+                    f"Line {n} of the benchmark script,\n<i>with a second line</i>\n\n")
+            t += 2000
+
+
+def legacy_parse(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    subs = []
+    for block in re.split(r"\n\s*\n", content.strip()):
+        lines = block.split("\n")
+        if len(lines) >= 3 and " --> " in lines[1]:
+            start, end = lines[1].strip().split(" --> ")
+            try:
+                subs.append({"index": int(lines[0].strip()), "start": start, "end": end,
+                             "text": " ".join(lines[2:]).strip()})
+            except ValueError:
+                pass
+    return subs
+
+
+def measure(fn) -> dict:
+    """Wall time of an untraced run, then peak traced allocation of a second run."""
+    t0 = time.perf_counter()
+    count = fn()
+    seconds = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"cues": count, "seconds": round(seconds, 3), "cues_per_s": int(count / seconds),
+            "peak_mb": round(peak / 2**20, 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cues", type=int, default=100_000)
+    ap.add_argument("--malformed-every", type=int, default=997, help="every Nth block has no timing line (0: none)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        src = os.path.join(workdir, "big.srt")
+        make_srt(src, args.cues, args.malformed_every)
+
+        def stream(writer, out, *extra):
+            with subtitles.open_text(src) as f:
+                return writer(subtitles.iter_srt(f), os.path.join(workdir, out), *extra)
+
+        results = {
+            "legacy": measure(lambda: len(legacy_parse(src))),
+            "cuelist": measure(lambda: len(subtitles.read_srt(src))),
+            "stream_srt": measure(lambda: stream(subtitles.write_srt, "out.srt")),
+            "stream_vtt": measure(lambda: stream(subtitles.write_vtt, "out.vtt")),
+            "stream_ass": measure(lambda: stream(subtitles.write_ass, "out.ass", ASS_HEADER)),
+        }
+        print(json.dumps({
+            "input_cues": args.cues,
+            "input_mb": round(os.path.getsize(src) / 2**20, 2),
+            **results,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
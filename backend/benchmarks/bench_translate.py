@@ -0,0 +1,65 @@
+# bench_translate.py
+"""
+Wall-clock benchmark for align_translations_to_srt against a DeterministicModel.
+
+    python bench_translate.py --cues 1500 --latency 0.2
+
+Compares the old one-call-per-cue path (TRANSLATE_BATCH_SIZE=1,
+TRANSLATE_BATCH_CONCURRENCY=1) with the configured batch settings.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "translation"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+import translation  # noqa: E402
+import deterministic_model  # noqa: E402
+
+
+def synthetic_srt(n: int):
+    return [
+        {"index": i + 1, "start": i * 1000, "end": i * 1000 + 900, "text": f"line number {i + 1}"}
+        for i in range(n)
+    ]
+
+
+def run(subs, batch_size: int, concurrency: int, latency: float, drop_every: int):
+    translation.BATCH_SIZE = batch_size
+    translation.BATCH_CONCURRENCY = concurrency
+    fake = deterministic_model.install(translation, latency=latency, drop_every=drop_every)
+    t0 = time.perf_counter()
+    aligned = translation.align_translations_to_srt(subs, {}, "fr")
+    elapsed = time.perf_counter() - t0
+    stats = translation.translation_stats(aligned, "fr")
+    return {
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        "model_calls": fake.calls,
+        "seconds": round(elapsed, 3),
+        "failed": stats["failed"],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cues", type=int, default=1500)
+    ap.add_argument("--latency", type=float, default=0.05, help="seconds per fake model call")
+    ap.add_argument("--batch-size", type=int, default=translation.BATCH_SIZE)
+    ap.add_argument("--concurrency", type=int, default=translation.BATCH_CONCURRENCY)
+    ap.add_argument("--drop-every", type=int, default=0, help="drop every Nth batch line to force fallbacks")
+    ap.add_argument("--skip-baseline", action="store_true")
+    args = ap.parse_args()
+
+    subs = synthetic_srt(args.cues)
+    results = []
+    if not args.skip_baseline:
+        results.append(run(subs, 1, 1, args.latency, 0))
+    results.append(run(subs, args.batch_size, args.concurrency, args.latency, args.drop_every))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+# fake_translator.py
+"""
+The real translation service on its deterministic backend with an injected
+latency, so it can run as its own process in benchmarks without an API key.
+
+    FAKE_MODEL_LATENCY=0.05 uvicorn fake_translator:app --port 9101
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "translation"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+import translation  # noqa: E402
+import deterministic_model  # noqa: E402
+
+deterministic_model.install(translation, latency=float(os.getenv("FAKE_MODEL_LATENCY", "0.05")))
+app = translation.app
@@ -0,0 +1,81 @@
+# load_translate.py
+"""
+Concurrency load test for the translator's /translate endpoint.
+
+Drives N concurrent requests through the ASGI app in-process with a
+deterministic model of fixed latency and reports when each request ran. With the
+model calls off the event loop the requests overlap, so total wall time
+stays close to a single request instead of N times it.
+
+    python load_translate.py --requests 8 --cues 40 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "translation"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+import translation  # noqa: E402
+import deterministic_model  # noqa: E402
+
+
+def synthetic_srt_bytes(n: int) -> bytes:
+    blocks = [f"{i}\n00:00:{i % 60:02d},000 --> 00:00:{i % 60:02d},900\nline number {i}\n" for i in range(1, n + 1)]
+    return "\n".join(blocks).encode("utf-8")
+
+
+async def one_request(client, srt_bytes: bytes, t0: float):
+    start = time.perf_counter() - t0
+    r = await client.post(
+        "/translate",
+        files={"srt": ("in.srt", srt_bytes, "text/plain")},
+        data={"target_lang": "fr", "return_json_stats": "true"},
+    )
+    end = time.perf_counter() - t0
+    return {"status": r.status_code, "start": round(start, 3), "end": round(end, 3)}
+
+
+def max_overlap(spans):
+    events = sorted([(s["start"], 1) for s in spans] + [(s["end"], -1) for s in spans])
+    cur = best = 0
+    for _, d in events:
+        cur += d
+        best = max(best, cur)
+    return best
+
+
+async def main_async(args):
+    fake = deterministic_model.install(translation, latency=args.latency)
+    srt_bytes = synthetic_srt_bytes(args.cues)
+    transport = httpx.ASGITransport(app=translation.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://translator", timeout=None) as client:
+        t0 = time.perf_counter()
+        spans = await asyncio.gather(*(one_request(client, srt_bytes, t0) for _ in range(args.requests)))
+        wall = time.perf_counter() - t0
+
+    print(json.dumps({
+        "requests": args.requests,
+        "model_latency_s": args.latency,
+        "model_calls": fake.calls,
+        "wall_s": round(wall, 3),
+        "max_concurrent_requests": max_overlap(spans),
+        "status_codes": sorted({s["status"] for s in spans}),
+        "spans": spans,
+    }, indent=2))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=8)
+    ap.add_argument("--cues", type=int, default=40)
+    ap.add_argument("--latency", type=float, default=0.5)
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
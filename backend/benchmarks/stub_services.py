@@ -0,0 +1,128 @@
+# stub_services.py
+"""
+Local stand-ins for the extractor / translator / overlay services, for benchmarks.
+
+    uvicorn stub_services:app --port 9100
+
+Routes mirror the real ones (/transcribe, /translate, /overlay, plus the
+overlay's /assets, /segments and /join). Uploads are streamed to disk, never
+held in memory. STUB_LATENCY (seconds) is added to every call to simulate slow
+upstreams; STUB_TRANSLATE_PER_CUE and STUB_RENDER_SPEED add work that grows
+with the input, and STUB_*_SLOTS bound concurrency like the real services do.
+STUB_CUES sets the transcript length; STUB_UNIQUE_CUES=true tags every
+transcript with a fresh token so downstream translation caches never hit.
+"""
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, Response
+from starlette.background import BackgroundTask
+
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", "0"))
+STUB_CUES = int(os.getenv("STUB_CUES", "50"))
+STUB_UNIQUE_CUES = os.getenv("STUB_UNIQUE_CUES", "false").lower() in ("1", "true", "yes")  # new text per call (no cache hits downstream)
+STUB_TRANSLATE_PER_CUE = float(os.getenv("STUB_TRANSLATE_PER_CUE", "0"))  # translator seconds per cue
+STUB_RENDER_SPEED = float(os.getenv("STUB_RENDER_SPEED", "0"))            # media seconds burned per second, 0 = instant
+STUB_TRANSLATE_SLOTS = asyncio.Semaphore(int(os.getenv("STUB_TRANSLATE_SLOTS", "4")))
+STUB_RENDER_SLOTS = asyncio.Semaphore(int(os.getenv("STUB_RENDER_SLOTS", "1")))
+
+_assets = set()
+
+app = FastAPI(title="Pipeline stubs")
+
+
+def synthetic_srt(n: int, tag: str = "") -> str:
+    blocks = []
+    for i in range(n):
+        s, e = i * 2, i * 2 + 1
+        blocks.append(f"{i + 1}\n00:{s // 60:02d}:{s % 60:02d},000 --> 00:{e // 60:02d}:{e % 60:02d},500\nline {i + 1}{tag}\n")
+    return "\n".join(blocks)
+
+
+def _cue_times(srt_text: str) -> list:
+    """[(start_s, end_s)] of every cue, enough to size the simulated work."""
+    times = []
+    for line in srt_text.splitlines():
+        if "-->" in line:
+            start, end = (sum(float(x) * m for x, m in zip(t.strip().replace(",", ".").split(":"), (3600, 60, 1)))
+                          for t in line.split("-->"))
+            times.append((start, end))
+    return times
+
+
+async def _render(media_seconds: float) -> None:
+    async with STUB_RENDER_SLOTS:
+        await asyncio.sleep(STUB_LATENCY + (media_seconds / STUB_RENDER_SPEED if STUB_RENDER_SPEED else 0))
+
+
+def _drain(upload: UploadFile) -> str:
+    fd, path = tempfile.mkstemp()
+    with os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(upload.file, out, 1024 * 1024)
+    return path
+
+
+@app.post("/transcribe")
+async def transcribe(file: UploadFile = File(...)):
+    os.remove(_drain(file))
+    await asyncio.sleep(STUB_LATENCY)
+    buf = io.BytesIO()
+    tag = f" {uuid.uuid4().hex[:8]}" if STUB_UNIQUE_CUES else ""
+    with zipfile.ZipFile(buf, "w") as zf:
+        srt = synthetic_srt(STUB_CUES, tag)
+        zf.writestr("transcript.srt", srt)
+        zf.writestr("transcript.txt", "\n".join(f"Speaker: line {i + 1}{tag}" for i in range(STUB_CUES)))
+    return Response(buf.getvalue(), media_type="application/zip")
+
+
+@app.post("/translate")
+async def translate(srt: UploadFile = File(...), target_lang: str = Form(...),
+                    script: UploadFile | None = File(None)):
+    body = await srt.read()
+    async with STUB_TRANSLATE_SLOTS:
+        await asyncio.sleep(STUB_LATENCY + STUB_TRANSLATE_PER_CUE * len(_cue_times(body.decode())))
+    return Response(body, media_type="text/plain")
+
+
+@app.head("/assets/{sha256}")
+async def asset_exists(sha256: str):
+    return Response(status_code=200 if sha256 in _assets else 404)
+
+
+@app.put("/assets/{sha256}")
+async def asset_upload(sha256: str, request: Request):
+    async for _ in request.stream():
+        pass
+    _assets.add(sha256)
+    return Response(status_code=201)
+
+
+@app.post("/overlay")
+async def overlay(video: UploadFile | None = File(None), video_sha256: str | None = Form(None),
+                  srt: UploadFile = File(...), style_json: str = Form(...)):
+    times = _cue_times((await srt.read()).decode())
+    await _render(max((end for _, end in times), default=0))
+    if video is None:
+        return Response(b"\0" * 1024, media_type="video/mp4")
+    path = _drain(video)
+    return FileResponse(path, media_type="video/mp4", background=BackgroundTask(os.remove, path))
+
+
+@app.post("/segments")
+async def segments(video_sha256: str = Form(...), srt: UploadFile = File(...), style_json: str = Form(...),
+                   start: float = Form(...), end: float | None = Form(None)):
+    times = _cue_times((await srt.read()).decode())
+    await _render((end if end is not None else max((e for _, e in times), default=start)) - start)
+    return JSONResponse({"key": uuid.uuid4().hex, "start": start, "end": end, "cache": "miss"})
+
+
+@app.post("/join")
+async def join(video_sha256: str = Form(...), segments_json: str = Form(...)):
+    await asyncio.sleep(STUB_LATENCY)
+    return Response(b"\0" * 1024, media_type="video/mp4")
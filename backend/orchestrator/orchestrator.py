@@ -1,19 +1,28 @@
 # orchestrator.py
 import os
+import re
 import json
+import shutil
 import asyncio
+import hashlib
 import tempfile
+import time
 import uuid
-from typing import Optional, List, Dict
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Optional, List, Dict, Any, Callable, Awaitable
 from contextlib import asynccontextmanager
 import multipart, io
 import httpx
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse, FileResponse
 from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 import zipfile
+
+import subtitles
+from service_metrics import Counter, Histogram, gauge
 # =======================
 # Config & Environment
 # =======================
@@ -22,6 +31,15 @@ load_dotenv()
 EXTRACTOR_URL = os.getenv("EXTRACTOR_URL", "https://9b57ef0fb8a7.ngrok-free.app/transcribe")
 TRANSLATOR_URL = os.getenv("TRANSLATOR_URL", "https://your-render-translate.onrender.com/translate")
 OVERLAY_URL    = os.getenv("OVERLAY_URL",    "https://your-render-overlay.onrender.com/overlay")
+OVERLAY_PREVIEW_URL = os.getenv("OVERLAY_PREVIEW_URL", OVERLAY_URL.rsplit("/", 1)[0] + "/preview")
+OVERLAY_SEGMENTS_URL = os.getenv("OVERLAY_SEGMENTS_URL", OVERLAY_URL.rsplit("/", 1)[0] + "/segments")
+OVERLAY_JOIN_URL = os.getenv("OVERLAY_JOIN_URL", OVERLAY_URL.rsplit("/", 1)[0] + "/join")
+
+# The overlay service caches source videos by sha256: each video is PUT to
+# <OVERLAY_ASSETS_URL>/<sha256> once and later overlay/preview calls send only
+# the hash. Falls back to a full upload when the service has no asset cache.
+OVERLAY_ASSETS_URL = os.getenv("OVERLAY_ASSETS_URL", OVERLAY_URL.rsplit("/", 1)[0] + "/assets")
+OVERLAY_ASSET_UPLOADS = os.getenv("OVERLAY_ASSET_UPLOADS", "true").lower() in ("1", "true", "yes")
 
 CONNECT_TIMEOUT = float(os.getenv("CONNECT_TIMEOUT", "15"))
 READ_TIMEOUT    = float(os.getenv("READ_TIMEOUT", "300"))
@@ -31,8 +49,83 @@ MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
 INITIAL_BACKOFF = float(os.getenv("INITIAL_BACKOFF", "0.8"))
 BACKOFF_FACTOR = float(os.getenv("BACKOFF_FACTOR", "1.8"))
 
-# In-memory job store (could later be replaced by Redis, DB, etc.)
-JOB_STORE: Dict[str, Dict[str, str]] = {}
+# Shared connection pools: one long-lived client per upstream, closed with the app.
+# <NAME>_MAX_CONNECTIONS (EXTRACTOR_/TRANSLATOR_/OVERLAY_) caps a single upstream.
+POOL_MAX_CONNECTIONS = int(os.getenv("POOL_MAX_CONNECTIONS", "20"))
+POOL_MAX_KEEPALIVE = int(os.getenv("POOL_MAX_KEEPALIVE", "10"))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("POOL_KEEPALIVE_EXPIRY", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+
+if HTTP2_ENABLED:
+    try:
+        import h2  # noqa: F401  (httpx needs it for http2=True)
+    except ImportError:
+        print("⚠️ HTTP2_ENABLED set but 'h2' is not installed (pip install httpx[http2]) — using HTTP/1.1.")
+        HTTP2_ENABLED = False
+
+UPSTREAMS = ("extractor", "translator", "overlay")
+
+# Content-addressed result cache: <CACHE_DIR>/<video sha256>/{transcript.srt,transcript.txt,translated_<lang>.srt}
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "subtitle_pipeline_cache"))
+# Cached videos unused for CACHE_TTL seconds are dropped by the job GC, then the
+# least recently used beyond CACHE_MAX_BYTES (0 disables either limit).
+CACHE_TTL = float(os.getenv("CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+
+# Streaming buffer: uploads, upstream responses and ZIP members move through memory
+# in pieces of at most this size, so per-job RSS does not grow with video length.
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", str(1024 * 1024)))
+
+# Background jobs: /process_initial enqueues, JOB_WORKERS run the pipeline stages.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# A job with several target languages transcribes once and runs up to this
+# many translator calls for it at the same time.
+TRANSLATE_CONCURRENCY = int(os.getenv("TRANSLATE_CONCURRENCY", "4"))
+
+# Pipelined jobs (/process_initial with style_json): the transcript is cut into
+# ~PIPELINE_CHUNK_SECONDS windows at gaps between cues, and every window goes to
+# the overlay's /segments as soon as its translation is back, so encoding
+# overlaps translation. At most PIPELINE_RENDER_CONCURRENCY windows render at once.
+PIPELINE_CHUNK_SECONDS = float(os.getenv("PIPELINE_CHUNK_SECONDS", "120"))
+PIPELINE_RENDER_CONCURRENCY = int(os.getenv("PIPELINE_RENDER_CONCURRENCY", "2"))
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "inprocess")
+
+# Job store: "memory" or "sqlite" (survives restarts). Finished jobs are dropped
+# after JOB_TTL seconds idle, or least-recently-used first beyond JOB_STORE_MAX_JOBS;
+# their files in JOB_DIR are deleted with them.
+JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "memory")
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "jobs.sqlite3")
+JOB_STORE_MAX_JOBS = int(os.getenv("JOB_STORE_MAX_JOBS", "200"))
+JOB_TTL = float(os.getenv("JOB_TTL", str(6 * 3600)))
+JOB_SWEEP_INTERVAL = float(os.getenv("JOB_SWEEP_INTERVAL", "60"))
+JOB_DIR = os.getenv("JOB_DIR", os.path.join(tempfile.gettempdir(), "subtitle_pipeline_jobs"))
+ORPHAN_FILE_GRACE = float(os.getenv("ORPHAN_FILE_GRACE", "3600"))  # unreferenced JOB_DIR files older than this are removed
+os.makedirs(JOB_DIR, exist_ok=True)
+
+HTTP_CLIENTS: Dict[str, httpx.AsyncClient] = {}
+
+# Per-upstream connection usage: requests sent vs. new TCP connections opened
+POOL_STATS: Dict[str, Dict[str, float]] = {
+    name: {"requests": 0, "new_connections": 0, "connect_seconds": 0.0} for name in UPSTREAMS
+}
+
+# =======================
+# Metrics
+# =======================
+# Prometheus text exposition for GET /metrics (shared service_metrics module).
+UPSTREAM_ATTEMPTS = Counter("orchestrator_upstream_attempts_total", "Upstream call attempts by upstream and outcome (ok/error)")
+UPSTREAM_RETRIES = Counter("orchestrator_upstream_retries_total", "Upstream attempts that were retried after a failure")
+UPSTREAM_SECONDS = Histogram("orchestrator_upstream_seconds",
+                             "Upstream attempt latency by phase: response (upload + remote work until headers), download, total")
+UPSTREAM_BYTES_SENT = Counter("orchestrator_upstream_bytes_sent_total", "Request body bytes sent upstream")
+UPSTREAM_BYTES_RECEIVED = Counter("orchestrator_upstream_bytes_received_total", "Response body bytes received from upstream")
+JOB_STAGE_SECONDS = Histogram("orchestrator_job_stage_seconds",
+                              "Per-job stage durations (upload/queue_wait/extract/translate/overlay/preview/download)")
+OVERLAY_ASSETS = Counter("orchestrator_overlay_assets_total",
+                         "Overlay asset checks: hit (already cached), uploaded (PUT once), unsupported (full upload)")
+RENDER_ARTIFACTS = Counter("orchestrator_render_artifacts_total",
+                           "/overlay requests by artifact state: hit (served from disk), joined (render in flight), rendered")
+JOBS_FINISHED = Counter("orchestrator_jobs_finished_total", "Pipeline jobs by final status (done/failed) and cache result")
 
 # =======================
 # Utilities
@@ -45,50 +138,269 @@ async def _sleep_backoff(attempt: int) -> None:
     delay = INITIAL_BACKOFF * (BACKOFF_FACTOR ** attempt)
     await asyncio.sleep(delay)
 
-@asynccontextmanager
-async def get_httpx_client():
+def _new_httpx_client(upstream: str) -> httpx.AsyncClient:
     timeout = httpx.Timeout(
         connect=CONNECT_TIMEOUT,
         read=READ_TIMEOUT,
         write=READ_TIMEOUT,
         pool=TOTAL_TIMEOUT
     )
-    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-        yield client
+    max_connections = int(os.getenv(f"{upstream.upper()}_MAX_CONNECTIONS", str(POOL_MAX_CONNECTIONS)))
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(POOL_MAX_KEEPALIVE, max_connections),
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY
+    )
+    return httpx.AsyncClient(timeout=timeout, limits=limits, http2=HTTP2_ENABLED, follow_redirects=True)
+
+@asynccontextmanager
+async def get_httpx_client(upstream: str):
+    """Yield the shared pooled client for an upstream (created on first use, closed on shutdown)."""
+    client = HTTP_CLIENTS.get(upstream)
+    if client is None or client.is_closed:
+        client = HTTP_CLIENTS[upstream] = _new_httpx_client(upstream)
+    yield client
+
+async def close_httpx_clients() -> None:
+    for client in HTTP_CLIENTS.values():
+        await client.aclose()
+    HTTP_CLIENTS.clear()
+
+def _connection_tracer(upstream: str):
+    """httpx trace hook: counts requests and the TCP(+TLS) connects they actually needed."""
+    stats = POOL_STATS[upstream]
+    stats["requests"] += 1
+    started = {}
+
+    async def trace(event: str, info: dict) -> None:
+        if event in ("connection.connect_tcp.started", "connection.start_tls.started"):
+            started[event] = time.perf_counter()
+        elif event == "connection.connect_tcp.complete":
+            stats["new_connections"] += 1
+            stats["connect_seconds"] += time.perf_counter() - started.pop("connection.connect_tcp.started", time.perf_counter())
+        elif event == "connection.start_tls.complete":
+            stats["connect_seconds"] += time.perf_counter() - started.pop("connection.start_tls.started", time.perf_counter())
+
+    return trace
+
+def _pool_stats() -> Dict[str, Dict[str, float]]:
+    out = {}
+    for name, st in POOL_STATS.items():
+        reused = max(st["requests"] - st["new_connections"], 0)
+        out[name] = {
+            "requests": st["requests"],
+            "new_connections": st["new_connections"],
+            "reused_connections": reused,
+            "reuse_rate_pct": round(reused / st["requests"] * 100.0, 1) if st["requests"] else 0.0,
+            "connect_seconds_total": round(st["connect_seconds"], 3),
+        }
+    return out
+
+def _mkstemp(suffix: str):
+    """Job temp files all live in JOB_DIR so the garbage collector can find them."""
+    return tempfile.mkstemp(suffix=suffix, dir=JOB_DIR)
+
+def _remove_quietly(*paths: Optional[str]) -> None:
+    for path in paths:
+        if path:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
 
 def _save_temp_bytes(data: bytes, suffix: str) -> str:
-    path = tempfile.mkstemp(suffix=suffix)[1]
+    path = _mkstemp(suffix)[1]
     with open(path, "wb") as f:
         f.write(data)
     return path
 
+async def _spool_upload(file: UploadFile, suffix: str) -> (str, str):
+    """Write the upload to a temp file chunk by chunk, hashing as it goes. Returns (path, sha256)."""
+    digest = hashlib.sha256()
+    fd, path = _mkstemp(suffix)
+    with os.fdopen(fd, "wb") as out:
+        while True:
+            chunk = await file.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return path, digest.hexdigest()
+
+# Rendered containers the overlay service may return (see its encoding profiles)
+MEDIA_SUFFIXES = {"video/mp4": ".mp4", "video/x-matroska": ".mkv"}
+SUFFIX_MEDIA_TYPES = {v: k for k, v in MEDIA_SUFFIXES.items()}
+
+class UpstreamError(HTTPException):
+    """An upstream answered with an error status; `status` and `body` are its reply."""
+    def __init__(self, label: str, status: int, body: str):
+        super().__init__(status_code=502, detail=f"{label} error: {status} {body}")
+        self.status, self.body = status, body
+
+async def _post_to_file(client: httpx.AsyncClient, url: str, suffix: str, label: str,
+                       attempts: Optional[List[Dict[str, Any]]] = None,
+                       on_chunk: Optional[Callable[[str, bytes, Optional[int]], None]] = None, **kwargs) -> str:
+    """
+    POST (multipart file fields are streamed from disk by httpx) and stream the
+    response body into a temp file. Returns the temp file path; a video
+    Content-Type overrides `suffix`. `on_chunk(path, chunk, content_length)`
+    is called once with b"" when the file is created and after every chunk
+    written, so readers can follow the file while it grows.
+
+    Every call is one attempt in the metrics (latency split into response and
+    download, bytes each way); with `attempts` the same record, plus any
+    X-* timing headers the upstream sent, is appended to that list.
+    """
+    upstream = label.lower()
+    record: Dict[str, Any] = {"upstream": upstream, "ok": False, "bytes_sent": 0, "bytes_received": 0}
+    t0 = time.perf_counter()
+    try:
+        extensions = {"trace": _connection_tracer(upstream)}
+        async with client.stream("POST", url, headers=_headers(), extensions=extensions, **kwargs) as r:
+            record["response_s"] = round(time.perf_counter() - t0, 3)
+            record["status"] = r.status_code
+            record["bytes_sent"] = int(r.request.headers.get("content-length") or 0)
+            record.update({k.lower(): v for k, v in r.headers.items()
+                           if k.lower().startswith(("x-encode-", "x-queue-", "x-translate-", "x-render-", "x-subtitle-"))})
+            if r.is_error:
+                await r.aread()
+                record["bytes_received"] = len(r.content)
+                raise UpstreamError(label, r.status_code, r.text)
+            content_type = r.headers.get("content-type", "").split(";")[0].strip()
+            fd, path = _mkstemp(MEDIA_SUFFIXES.get(content_type, suffix))
+            try:
+                total = int(r.headers["content-length"]) if r.headers.get("content-length", "").isdigit() else None
+                with os.fdopen(fd, "wb") as out:
+                    if on_chunk:
+                        on_chunk(path, b"", total)
+                    async for chunk in r.aiter_bytes(STREAM_CHUNK_SIZE):
+                        record["bytes_received"] += len(chunk)
+                        out.write(chunk)
+                        if on_chunk:
+                            out.flush()
+                            on_chunk(path, chunk, total)
+            except Exception:
+                os.remove(path)
+                raise
+            record["download_s"] = round(time.perf_counter() - t0 - record["response_s"], 3)
+        record["ok"] = True
+        return path
+    except Exception as e:
+        record["error"] = str(getattr(e, "detail", e))[:200]
+        raise
+    finally:
+        record["total_s"] = round(time.perf_counter() - t0, 3)
+        UPSTREAM_ATTEMPTS.inc(upstream=upstream, outcome="ok" if record["ok"] else "error")
+        UPSTREAM_BYTES_SENT.inc(record["bytes_sent"], upstream=upstream)
+        UPSTREAM_BYTES_RECEIVED.inc(record["bytes_received"], upstream=upstream)
+        for phase in ("response", "download", "total"):
+            if f"{phase}_s" in record:
+                UPSTREAM_SECONDS.observe(record[f"{phase}_s"], upstream=upstream, phase=phase)
+        if attempts is not None:
+            record["attempt"] = sum(1 for a in attempts if a["upstream"] == upstream) + 1
+            attempts.append(record)
+
+def _extract_zip_member(zf: zipfile.ZipFile, name: str, suffix: str) -> str:
+    fd, path = _mkstemp(suffix)
+    with zf.open(name) as src, os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(src, out, STREAM_CHUNK_SIZE)
+    return path
+
+def _lang_key(target_lang: str) -> str:
+    return re.sub(r"[^a-z0-9_-]+", "_", target_lang.strip().lower()) or "_"
+
+def _cache_path(video_hash: str, name: str) -> str:
+    return os.path.join(CACHE_DIR, video_hash, name)
+
+def _cache_put(src_path: str, video_hash: str, name: str) -> None:
+    """Copy a result into the cache atomically (readers never see a partial file)."""
+    dst = _cache_path(video_hash, name)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = f"{dst}.{uuid.uuid4().hex}.part"
+    shutil.copyfile(src_path, tmp)
+    os.replace(tmp, dst)
+
+def _cache_get(video_hash: str, name: str, suffix: str) -> Optional[str]:
+    """Return a private temp copy of a cached result, or None on a miss."""
+    src = _cache_path(video_hash, name)
+    if not os.path.exists(src):
+        return None
+    path = _mkstemp(suffix)[1]
+    shutil.copyfile(src, path)
+    os.utime(src)  # LRU stamp for _evict_cache
+    return path
+
+def _evict_cache() -> int:
+    """Drop cached videos unused for CACHE_TTL, then least recently used beyond CACHE_MAX_BYTES."""
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+    entries = []
+    for entry in os.scandir(CACHE_DIR):
+        if entry.is_dir():
+            stats = [f.stat() for f in os.scandir(entry.path) if f.is_file()]
+            entries.append((max((st.st_mtime for st in stats), default=0.0), sum(st.st_size for st in stats), entry.path))
+    entries.sort()
+    now, total, removed = time.time(), sum(size for _, size, _ in entries), 0
+    for last_used, size, path in entries:
+        if (CACHE_TTL > 0 and now - last_used > CACHE_TTL) or (CACHE_MAX_BYTES > 0 and total > CACHE_MAX_BYTES):
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+    return removed
+
+def _plan_chunks(cues: subtitles.CueList, chunk_seconds: float) -> List[tuple]:
+    """
+    Split cues into [(first, last + 1, start_s, end_s)] windows of about
+    chunk_seconds. Cuts fall only in gaps between cues (midway), so no cue is
+    on screen across a cut; the first window starts at 0 and the last has
+    end_s=None.
+    """
+    starts, ends = cues.starts, cues.ends
+    chunks, first = [], 0
+    for i in range(1, len(cues)):
+        gap_start, gap_end = ends[i - 1], starts[i]
+        if gap_end > gap_start and gap_end - starts[first] >= chunk_seconds * 1000:
+            chunks.append((first, i))
+            first = i
+    chunks.append((first, len(cues)))
+    windows = []
+    for n, (a, b) in enumerate(chunks):
+        start = 0.0 if n == 0 else windows[-1][3]
+        end = (ends[b - 1] + starts[b]) / 2000 if n < len(chunks) - 1 else None
+        windows.append((a, b, start, end))
+    return windows
+
+def _srt_bytes(cues: subtitles.CueList) -> bytes:
+    """Cues as SRT, keeping their original numbers."""
+    buf = io.StringIO()
+    subtitles.write_srt(cues, buf, renumber=False)
+    return buf.getvalue().encode()
+
 # =======================
 # Orchestration Steps
 # =======================
-async def call_extractor(video_path: str) -> (str, str):
+async def call_extractor(video_path: str, attempts: Optional[List[Dict[str, Any]]] = None) -> (str, str):
     """Extractor now returns a ZIP containing .srt and .txt files."""
     for attempt in range(MAX_RETRIES):
         try:
-            async with get_httpx_client() as client:
+            async with get_httpx_client("extractor") as client:
                 with open(video_path, "rb") as f:
                     files = {"file": (os.path.basename(video_path), f, "video/mp4")}
-                    r = await client.post(EXTRACTOR_URL, files=files, headers=_headers())
+                    zip_path = await _post_to_file(client, EXTRACTOR_URL, ".zip", "Extractor", attempts, files=files)
 
-                if r.is_error:
-                    raise HTTPException(status_code=502, detail=f"Extractor error: {r.status_code} {r.text}")
-
-                # Handle zip file in memory
+                # Unpack the zip from disk
                 srt_path = txt_path = None
                 try:
-                    zip_bytes = io.BytesIO(r.content)
-                    with zipfile.ZipFile(zip_bytes) as zf:
+                    with zipfile.ZipFile(zip_path) as zf:
                         for name in zf.namelist():
                             if name.endswith(".srt"):
-                                srt_path = _save_temp_bytes(zf.read(name), ".srt")
+                                srt_path = _extract_zip_member(zf, name, ".srt")
                             elif name.endswith(".txt"):
-                                txt_path = _save_temp_bytes(zf.read(name), ".txt")
+                                txt_path = _extract_zip_member(zf, name, ".txt")
                 except Exception as e:
                     raise HTTPException(status_code=502, detail=f"Invalid extractor ZIP: {e}")
+                finally:
+                    os.remove(zip_path)
 
                 if not (srt_path and txt_path):
                     raise HTTPException(status_code=502, detail="Extractor ZIP missing .srt or .txt")
@@ -97,36 +409,82 @@ async def call_extractor(video_path: str) -> (str, str):
 
         except Exception as e:
             if attempt < MAX_RETRIES - 1:
+                UPSTREAM_RETRIES.inc(upstream="extractor")
                 await _sleep_backoff(attempt)
                 continue
             raise HTTPException(status_code=502, detail=f"Extractor call failed: {e}")
 
-async def call_translator(srt_path: str, txt_path: str, target_lang: str) -> str:
+async def call_translator(srt_path: str, txt_path: str, target_lang: str,
+                          attempts: Optional[List[Dict[str, Any]]] = None) -> str:
     """Translator returns translated .srt."""
     for attempt in range(MAX_RETRIES):
         try:
-            async with get_httpx_client() as client:
+            async with get_httpx_client("translator") as client:
                 with open(srt_path, "rb") as sf, open(txt_path, "rb") as tf:
                     files = {
                         "srt": (os.path.basename(srt_path), sf, "text/plain"),
                         "script": (os.path.basename(txt_path), tf, "text/plain"),
                     }
                     data = {"target_lang": target_lang}
-                    r = await client.post(TRANSLATOR_URL, files=files, data=data, headers=_headers())
-
-                if r.is_error:
-                    raise HTTPException(status_code=502, detail=f"Translator error: {r.status_code} {r.text}")
-
-                return _save_temp_bytes(r.content, ".srt")
+                    return await _post_to_file(client, TRANSLATOR_URL, ".srt", "Translator", attempts,
+                                               files=files, data=data)
 
         except Exception as e:
             if attempt < MAX_RETRIES - 1:
+                UPSTREAM_RETRIES.inc(upstream="translator")
                 await _sleep_backoff(attempt)
                 continue
             raise HTTPException(status_code=502, detail=f"Translator call failed: {e}")
 
-async def call_overlay(video_path: str, translated_srt_path: str, style_json: str) -> str:
-    """Overlay requires video + translated SRT + style JSON."""
+async def _ensure_overlay_asset(client: httpx.AsyncClient, video_path: str, video_hash: str) -> bool:
+    """
+    Make sure the overlay service holds this video under its hash: HEAD it and
+    PUT the file on a miss. False when the service has no asset cache, in which
+    case the caller uploads the video with the request as before.
+    """
+    url = f"{OVERLAY_ASSETS_URL}/{video_hash}"
+    r = await client.head(url, headers=_headers(), extensions={"trace": _connection_tracer("overlay")})
+    if r.status_code == 200:
+        OVERLAY_ASSETS.inc(outcome="hit")
+        return True
+    if r.status_code != 404:
+        OVERLAY_ASSETS.inc(outcome="unsupported")
+        return False
+
+    async def body():
+        with open(video_path, "rb") as f:
+            for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+                yield chunk
+
+    size = os.path.getsize(video_path)
+    headers = {**_headers(), "Content-Type": "application/octet-stream", "Content-Length": str(size)}
+    r = await client.put(url, content=body(), headers=headers,
+                         extensions={"trace": _connection_tracer("overlay")})
+    if r.status_code in (200, 201):
+        OVERLAY_ASSETS.inc(outcome="uploaded")
+        UPSTREAM_BYTES_SENT.inc(size, upstream="overlay")
+        return True
+    if r.status_code == 400:
+        raise HTTPException(status_code=502, detail=f"Overlay rejected asset upload: {r.text}")
+    OVERLAY_ASSETS.inc(outcome="unsupported")
+    return False
+
+async def call_overlay(video_path: str, translated_srt_path: str, style_json: str,
+                       profile: Optional[str] = None, preview: Optional[Dict[str, Any]] = None,
+                       attempts: Optional[List[Dict[str, Any]]] = None,
+                       video_hash: Optional[str] = None, mode: Optional[str] = None,
+                       language: Optional[str] = None,
+                       on_chunk: Optional[Callable[[str, bytes, Optional[int]], None]] = None) -> str:
+    """
+    Overlay requires video + translated SRT + style JSON (+ optional encoding profile).
+    mode="soft" asks for a subtitle track muxed next to the copied video
+    (tagged with `language`) instead of a burn-in re-encode.
+    With `preview` (start/duration/cue form fields) the overlay service's fast
+    low-res /preview render is used instead of a full burn.
+    With `video_hash` the video is referenced through the overlay asset cache,
+    so style variants of one job upload it at most once.
+    `on_chunk` is passed to _post_to_file (a retry starts a new file).
+    """
     try:
         json.loads(style_json)
     except Exception:
@@ -134,30 +492,661 @@ async def call_overlay(video_path: str, translated_srt_path: str, style_json: st
 
     for attempt in range(MAX_RETRIES):
         try:
-            async with get_httpx_client() as client:
+            async with get_httpx_client("overlay") as client:
+                by_hash = bool(video_hash and OVERLAY_ASSET_UPLOADS) and \
+                    await _ensure_overlay_asset(client, video_path, video_hash)
                 with open(video_path, "rb") as vf, open(translated_srt_path, "rb") as sf:
-                    files = {
-                        "video": (os.path.basename(video_path), vf, "video/mp4"),
-                        "srt": (os.path.basename(translated_srt_path), sf, "text/plain"),
-                    }
+                    files = {"srt": (os.path.basename(translated_srt_path), sf, "text/plain")}
                     data = {"style_json": style_json}
-                    r = await client.post(OVERLAY_URL, files=files, data=data, headers=_headers())
-                if r.is_error:
-                    raise HTTPException(status_code=502, detail=f"Overlay error: {r.status_code} {r.text}")
-
-                return _save_temp_bytes(r.content, ".mp4")
+                    if by_hash:
+                        data["video_sha256"] = video_hash
+                    else:
+                        files["video"] = (os.path.basename(video_path), vf, "video/mp4")
+                    if profile:
+                        data["profile"] = profile
+                    if mode:
+                        data["mode"] = mode
+                        if language:
+                            data["language"] = language
+                    if preview is not None:
+                        data.update({k: str(v) for k, v in preview.items() if v is not None})
+                    url = OVERLAY_PREVIEW_URL if preview is not None else OVERLAY_URL
+                    return await _post_to_file(client, url, ".mp4", "Overlay", attempts,
+                                               on_chunk=on_chunk, files=files, data=data)
 
         except Exception as e:
             if attempt < MAX_RETRIES - 1:
+                UPSTREAM_RETRIES.inc(upstream="overlay")
                 await _sleep_backoff(attempt)
                 continue
             raise HTTPException(status_code=502, detail=f"Overlay call failed: {e}")
 
 
+class SegmentsUnsupported(Exception):
+    """The overlay service cannot render /segments (older version or no render cache)."""
+
+def _asset_missing(body: str) -> bool:
+    """Whether an overlay 404 reply is its asset_missing_response (the video left its asset cache)."""
+    try:
+        return json.loads(body).get("asset_missing") is True
+    except (ValueError, AttributeError):
+        return False
+
+async def call_overlay_segment(video_path: str, srt_path: str, style_json: str, profile: Optional[str],
+                               start: float, end: Optional[float], attempts: List[Dict[str, Any]],
+                               video_hash: str) -> Dict[str, Any]:
+    """
+    Burn one [start, end) window on the overlay service (video by hash only).
+    Returns {"key", "start", "end"} for call_overlay_join. A 404 means no
+    /segments route (or no render cache) unless the overlay says the asset is
+    missing; then the next attempt uploads the video again.
+    """
+    for attempt in range(MAX_RETRIES):
+        try:
+            async with get_httpx_client("overlay") as client:
+                if not (OVERLAY_ASSET_UPLOADS and await _ensure_overlay_asset(client, video_path, video_hash)):
+                    raise SegmentsUnsupported()
+                with open(srt_path, "rb") as sf:
+                    data = {"video_sha256": video_hash, "style_json": style_json, "start": str(start)}
+                    if end is not None:
+                        data["end"] = str(end)
+                    if profile:
+                        data["profile"] = profile
+                    path = await _post_to_file(client, OVERLAY_SEGMENTS_URL, ".json", "Overlay", attempts,
+                                               files={"srt": (os.path.basename(srt_path), sf, "text/plain")},
+                                               data=data)
+            try:
+                with open(path) as f:
+                    segment = json.load(f)
+            finally:
+                _remove_quietly(path)
+            return {k: segment[k] for k in ("key", "start", "end")}
+
+        except SegmentsUnsupported:
+            raise
+        except Exception as e:
+            if isinstance(e, UpstreamError) and e.status == 404 and not _asset_missing(e.body):
+                raise SegmentsUnsupported()
+            if attempt < MAX_RETRIES - 1:
+                UPSTREAM_RETRIES.inc(upstream="overlay")
+                await _sleep_backoff(attempt)
+                continue
+            raise HTTPException(status_code=502, detail=f"Overlay segment call failed: {e}")
+
+async def call_overlay_join(video_path: str, segments: List[Dict[str, Any]], profile: Optional[str],
+                            attempts: List[Dict[str, Any]], video_hash: str) -> str:
+    """Join rendered windows (in order) into the final video on the overlay service."""
+    for attempt in range(MAX_RETRIES):
+        try:
+            async with get_httpx_client("overlay") as client:
+                data = {"video_sha256": video_hash, "segments_json": json.dumps(segments)}
+                if profile:
+                    data["profile"] = profile
+                return await _post_to_file(client, OVERLAY_JOIN_URL, ".mp4", "Overlay", attempts, data=data)
+        except Exception as e:
+            if attempt < MAX_RETRIES - 1:
+                UPSTREAM_RETRIES.inc(upstream="overlay")
+                await _sleep_backoff(attempt)
+                continue
+            raise HTTPException(status_code=502, detail=f"Overlay join failed: {e}")
+
+async def translate_and_render(base_srt_path: str, base_txt_path: str, target_lang: str, video_path: str,
+                               video_hash: str, style_json: str, profile: Optional[str],
+                               calls: List[Dict[str, Any]], translate_slots: asyncio.Semaphore,
+                               on_progress: Callable[[float], None]) -> tuple:
+    """
+    Pipelined translate + overlay for one language. The transcript (and the
+    script, line for line) is split into windows that are translated
+    concurrently (sharing `translate_slots` with the job's other languages);
+    each translated window is rendered with /segments right
+    away, and the pieces are joined at the end. Returns (translated SRT,
+    final video or None, render info); a failed render is reported in the
+    render info and does not fail the translation.
+
+    When the overlay cannot render segments the translated windows are merged
+    and burned with one regular /overlay call instead.
+    """
+    cues = subtitles.read_srt(base_srt_path)
+    if not cues:
+        srt_path = await call_translator(base_srt_path, base_txt_path, target_lang, calls)
+        return (srt_path, *await _render_whole(video_path, srt_path, style_json, profile, calls, video_hash, 0))
+    with open(base_txt_path, "r", encoding="utf-8", errors="replace") as f:
+        script = [line for line in f.read().splitlines() if line.strip()]
+    windows = _plan_chunks(cues, PIPELINE_CHUNK_SECONDS)
+    render_slots = asyncio.Semaphore(max(1, PIPELINE_RENDER_CONCURRENCY))
+    translated: List[Optional[str]] = [None] * len(windows)
+    segments: List[Optional[Dict[str, Any]]] = [None] * len(windows)
+    state = {"segments_supported": True, "render_error": None, "done": 0}
+
+    async def window(n: int, first: int, last: int, start: float, end: Optional[float]) -> None:
+        srt_path = _save_temp_bytes(_srt_bytes(cues[first:last]), ".srt")
+        txt_path = _save_temp_bytes(("\n".join(script[first:last]) + "\n").encode(), ".txt")
+        try:
+            async with translate_slots:
+                translated[n] = await call_translator(srt_path, txt_path, target_lang, calls)
+        finally:
+            _remove_quietly(srt_path, txt_path)
+        if state["segments_supported"] and not state["render_error"]:
+            try:
+                async with render_slots:
+                    segments[n] = await call_overlay_segment(video_path, translated[n], style_json, profile,
+                                                             start, end, calls, video_hash)
+            except SegmentsUnsupported:
+                state["segments_supported"] = False
+            except HTTPException as e:
+                state["render_error"] = e.detail
+        state["done"] += 1
+        on_progress(state["done"] / len(windows))
+
+    tasks = [asyncio.ensure_future(window(n, *w)) for n, w in enumerate(windows)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _remove_quietly(*translated)
+        raise
+
+    fd, srt_path = _mkstemp(".srt")
+    with os.fdopen(fd, "wb") as out:
+        for n, path in enumerate(translated):
+            with open(path, "rb") as f:
+                out.write(f.read().strip() + b"\n\n")
+    _remove_quietly(*translated)
+
+    if not state["segments_supported"]:
+        return (srt_path, *await _render_whole(video_path, srt_path, style_json, profile, calls, video_hash,
+                                               len(windows)))
+    render = {"mode": "pipelined", "windows": len(windows), "status": "failed", "error": state["render_error"]}
+    if render["error"]:
+        return srt_path, None, render
+    try:
+        output_path = await call_overlay_join(video_path, segments, profile, calls, video_hash)
+    except HTTPException as e:
+        render["error"] = e.detail
+        return srt_path, None, render
+    render.update(status="done", error=None)
+    return srt_path, output_path, render
+
+async def _render_whole(video_path: str, srt_path: str, style_json: str, profile: Optional[str],
+                        calls: List[Dict[str, Any]], video_hash: str, windows: int) -> tuple:
+    """One regular /overlay burn of the whole SRT: (final video or None, render info)."""
+    render = {"mode": "sequential", "windows": windows, "status": "done", "error": None}
+    try:
+        return await call_overlay(video_path, srt_path, style_json, profile,
+                                  attempts=calls, video_hash=video_hash), render
+    except HTTPException as e:
+        render.update(status="failed", error=e.detail)
+        return None, render
+
+# =======================
+# Job Store
+# =======================
+JOB_TERMINAL = ("done", "failed")
+JOB_FILE_FIELDS = ("video", "srt", "output")
+
+def _job_files(job: Dict[str, Any]) -> List[str]:
+    paths = [job[k] for k in JOB_FILE_FIELDS if job.get(k)]
+    extra = list((job.get("srts") or {}).values()) + [r["path"] for r in (job.get("renders") or {}).values()]
+    return paths + [p for p in extra if p and p not in paths]
+
+# Job files a FileResponse is about to send (abspath -> responses). FileResponse
+# opens the file only after the handler returns, so deleting the job must not
+# unlink them before then: they go when their last response ends instead.
+_served_files: Dict[str, int] = {}
+_served_deleted: set = set()
+
+def _pin_served(path: str) -> None:
+    path = os.path.abspath(path)
+    _served_files[path] = _served_files.get(path, 0) + 1
+
+def _unpin_served(path: str) -> None:
+    path = os.path.abspath(path)
+    _served_files[path] -= 1
+    if not _served_files[path]:
+        del _served_files[path]
+        if path in _served_deleted:
+            _served_deleted.discard(path)
+            _remove_quietly(path)
+
+def _remove_job_files(job: Dict[str, Any]) -> None:
+    for path in _job_files(job):
+        if os.path.abspath(path) in _served_files:
+            _served_deleted.add(os.path.abspath(path))
+        else:
+            _remove_quietly(path)
+
+class JobStore(ABC):
+    """
+    Job records keyed by job_id. Reads return copies; change a job with update().
+    Finished jobs expire after `ttl` seconds without access and are evicted
+    least-recently-used first beyond `max_jobs`; eviction deletes the job's files.
+    Queued/running jobs are never evicted.
+    """
+    def __init__(self, max_jobs: int, ttl: float):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.evicted = 0
+
+    # --- backend primitives ---
+    @abstractmethod
+    def _load(self, job_id: str, touch: bool) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def _save(self, job_id: str, job: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def _remove(self, job_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def _entries(self) -> List[tuple]:
+        """[(job_id, job, last_used)]"""
+
+    # --- public API ---
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._load(job_id, touch=True)
+
+    def put(self, job_id: str, job: Dict[str, Any]) -> None:
+        self._save(job_id, job)
+        self.evict()
+
+    def update(self, job_id: str, **fields) -> Dict[str, Any]:
+        job = self._load(job_id, touch=True)
+        job.update(fields)
+        self._save(job_id, job)
+        return job
+
+    def delete(self, job_id: str) -> None:
+        job = self._load(job_id, touch=False)
+        if job is not None:
+            self._remove(job_id)
+            _remove_job_files(job)
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        return [job for _, job, _ in self._entries()]
+
+    def __contains__(self, job_id: str) -> bool:
+        return self._load(job_id, touch=False) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries())
+
+    def evict(self) -> int:
+        now = time.time()
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        finished = [(jid, lu) for jid, job, lu in entries if job["status"] in JOB_TERMINAL]
+        expired = [jid for jid, lu in finished if self.ttl > 0 and now - lu > self.ttl]
+        overflow = len(entries) - len(expired) - self.max_jobs
+        lru = [jid for jid, _ in finished if jid not in expired][:max(overflow, 0)]
+        for jid in expired + lru:
+            self.delete(jid)
+        self.evicted += len(expired) + len(lru)
+        return len(expired) + len(lru)
+
+
+class MemoryJobStore(JobStore):
+    def __init__(self, max_jobs: int, ttl: float):
+        super().__init__(max_jobs, ttl)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._last_used: Dict[str, float] = {}
+
+    def _load(self, job_id, touch):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if touch:
+            self._last_used[job_id] = time.time()
+        return json.loads(json.dumps(job))
+
+    def _save(self, job_id, job):
+        self._jobs[job_id] = json.loads(json.dumps(job))
+        self._last_used[job_id] = time.time()
+
+    def _remove(self, job_id):
+        self._jobs.pop(job_id, None)
+        self._last_used.pop(job_id, None)
+
+    def _entries(self):
+        return [(jid, job, self._last_used[jid]) for jid, job in self._jobs.items()]
+
+
+class SQLiteJobStore(JobStore):
+    """Persistent store; jobs interrupted by a restart are marked failed on startup."""
+    def __init__(self, path: str, max_jobs: int, ttl: float):
+        super().__init__(max_jobs, ttl)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+        for jid, job, _ in self._entries():
+            if job["status"] not in JOB_TERMINAL:
+                job.update(status="failed", error="Interrupted by orchestrator restart")
+                self._save(jid, job)
+
+    def _load(self, job_id, touch):
+        row = self._db.execute("SELECT data FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        if touch:
+            self._db.execute("UPDATE jobs SET last_used=? WHERE job_id=?", (time.time(), job_id))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def _save(self, job_id, job):
+        self._db.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)", (job_id, json.dumps(job), time.time()))
+        self._db.commit()
+
+    def _remove(self, job_id):
+        self._db.execute("DELETE FROM jobs WHERE job_id=?", (job_id,))
+        self._db.commit()
+
+    def _entries(self):
+        rows = self._db.execute("SELECT job_id, data, last_used FROM jobs").fetchall()
+        return [(jid, json.loads(data), lu) for jid, data, lu in rows]
+
+
+def _new_job_store() -> JobStore:
+    if JOB_STORE_BACKEND == "sqlite":
+        return SQLiteJobStore(JOB_STORE_PATH, JOB_STORE_MAX_JOBS, JOB_TTL)
+    return MemoryJobStore(JOB_STORE_MAX_JOBS, JOB_TTL)
+
+JOB_STORE: JobStore = _new_job_store()
+
+def collect_garbage() -> Dict[str, int]:
+    """
+    Evict expired jobs, delete JOB_DIR files no job references (e.g. left by a
+    crash) and trim the result cache. A running job's scratch files (transcript
+    copies, translations not yet recorded) are not on the job, so only files
+    older than the oldest unfinished job are candidates.
+    """
+    evicted = JOB_STORE.evict()
+    jobs = JOB_STORE.jobs()
+    referenced = {os.path.abspath(p) for job in jobs for p in _job_files(job)}
+    now = time.time()
+    cutoff = min([now - ORPHAN_FILE_GRACE] + [j["queued_at"] for j in jobs if j["status"] not in JOB_TERMINAL])
+    orphans = 0
+    for entry in os.scandir(JOB_DIR):
+        path = os.path.abspath(entry.path)
+        if entry.is_file() and path not in referenced and path not in _served_files and entry.stat().st_mtime < cutoff:
+            _remove_quietly(path)
+            orphans += 1
+    return {"jobs_evicted": evicted, "orphan_files_removed": orphans, "cache_entries_removed": _evict_cache()}
+
+async def _gc_loop() -> None:
+    while True:
+        await asyncio.sleep(JOB_SWEEP_INTERVAL)
+        try:
+            collect_garbage()
+        except Exception as e:
+            print(f"[warn] job garbage collection failed: {e}")
+
+def _process_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+# =======================
+# Job Queue
+# =======================
+class JobQueue(ABC):
+    """
+    Job backend interface. A backend runs `handler(job_id)` for every submitted
+    job with bounded concurrency; job state itself lives in JOB_STORE.
+    """
+    def __init__(self, handler: Callable[[str], Awaitable[None]], workers: int):
+        self.handler = handler
+        self.workers = max(1, workers)
+
+    @abstractmethod
+    async def start(self) -> None:
+        ...
+
+    @abstractmethod
+    async def stop(self) -> None:
+        ...
+
+    @abstractmethod
+    async def submit(self, job_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def depth(self) -> int:
+        """Jobs submitted but not yet picked up by a worker."""
+
+
+class InProcessJobQueue(JobQueue):
+    """asyncio.Queue + worker tasks inside the orchestrator process."""
+    def __init__(self, handler, workers):
+        super().__init__(handler, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, job_id: str) -> None:
+        if self._queue is None:
+            await self.start()
+        await self._queue.put(job_id)
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self.handler(job_id)
+            except Exception as e:
+                print(f"[warn] job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+JOB_QUEUE_BACKENDS = {"inprocess": InProcessJobQueue}
+
+# Progress subscribers (SSE streams / waiters) per job
+_job_watchers: Dict[str, List[asyncio.Queue]] = {}
+
+def _job_snapshot(job_id: str, job: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    job = job or JOB_STORE.get(job_id)
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "target_lang": job["target_lang"],
+        "target_langs": job.get("target_langs", [job["target_lang"]]),
+        "languages": job.get("languages", {}),
+        "render": {k: v for k, v in job["render"].items() if k != "style_json"} if job.get("render") else None,
+        "output_ready": bool(job.get("output")),
+        "cache": job.get("cache"),
+        "error": job.get("error"),
+        "timings": job["timings"],
+        "calls": job.get("calls", []),
+        "created_at": job["created_at"],
+    }
+
+def _job_update(job_id: str, **fields) -> None:
+    snap = _job_snapshot(job_id, JOB_STORE.update(job_id, **fields))
+    for q in _job_watchers.get(job_id, []):
+        q.put_nowait(snap)
+
+@asynccontextmanager
+async def _watch_job(job_id: str):
+    q: asyncio.Queue = asyncio.Queue()
+    _job_watchers.setdefault(job_id, []).append(q)
+    try:
+        yield q
+    finally:
+        _job_watchers[job_id].remove(q)
+        if not _job_watchers[job_id]:
+            del _job_watchers[job_id]
+
+async def _wait_for_job(job_id: str) -> Dict[str, Any]:
+    async with _watch_job(job_id) as q:
+        snap = _job_snapshot(job_id)
+        while snap["status"] not in JOB_TERMINAL:
+            snap = await q.get()
+        return snap
+
+async def run_pipeline(job_id: str) -> None:
+    """
+    Extractor + Translator for one queued job.
+    Results are cached by video content hash, so a repeat upload skips both
+    remote calls and a new language for a known video only calls the translator.
+    With several target languages the video is transcribed once and the
+    translations run concurrently (TRANSLATE_CONCURRENCY); a language whose
+    translation fails is reported in the job's "languages" without failing
+    the others. Jobs created with a style also render the final video for
+    their first language, overlapped with translation (translate_and_render).
+    """
+    job = JOB_STORE.get(job_id)
+    if job is None:
+        return
+    timings, calls = job["timings"], job.get("calls", [])
+    timings["queue_wait"] = round(time.time() - job["queued_at"], 3)
+    JOB_STAGE_SECONDS.observe(timings["queue_wait"], stage="queue_wait")
+    video_path, video_hash = job["video"], job["video_hash"]
+    target_langs = job.get("target_langs") or [job["target_lang"]]
+    render_req = job.get("render")
+    render_lang = target_langs[0] if render_req else None
+    output: Dict[str, Any] = {}
+    _job_update(job_id, status="running", timings=timings)
+
+    try:
+        srts: Dict[str, Optional[str]] = {}
+        languages: Dict[str, Dict[str, Any]] = {}
+        for lang in target_langs:
+            srts[lang] = _cache_get(video_hash, f"translated_{_lang_key(lang)}.srt", ".srt")
+            if srts[lang]:
+                languages[lang] = {"status": "done", "cache": "hit"}
+        missing = [lang for lang in target_langs if srts[lang] is None]
+        cache_status = "hit"
+
+        if missing:
+            # Extractor (skipped if this video was transcribed before)
+            _job_update(job_id, stage="extract", progress=0.1, timings=timings, languages=languages)
+            t0 = time.perf_counter()
+            base_srt_path = _cache_get(video_hash, "transcript.srt", ".srt")
+            base_txt_path = _cache_get(video_hash, "transcript.txt", ".txt")
+            cache_status = "transcript"
+            if not (base_srt_path and base_txt_path):
+                try:
+                    base_srt_path, base_txt_path = await call_extractor(video_path, calls)
+                finally:
+                    _job_update(job_id, calls=calls)
+                _cache_put(base_srt_path, video_hash, "transcript.srt")
+                _cache_put(base_txt_path, video_hash, "transcript.txt")
+                cache_status = "miss"
+            timings["extract"] = round(time.perf_counter() - t0, 3)
+            JOB_STAGE_SECONDS.observe(timings["extract"], stage="extract")
+
+            # Translator, once per missing language
+            _job_update(job_id, stage="translate", progress=0.6, timings=timings)
+            t0 = time.perf_counter()
+            slots = asyncio.Semaphore(max(1, TRANSLATE_CONCURRENCY))
+
+            partial: Dict[str, float] = {}
+
+            def report(lang: str, fraction: float) -> None:
+                partial[lang] = fraction
+                done = sum(1 if lg in languages else partial.get(lg, 0.0) for lg in missing)
+                _job_update(job_id, calls=calls, languages=languages,
+                            progress=round(0.6 + 0.4 * done / len(missing), 3))
+
+            async def translate(lang: str) -> None:
+                t_lang = time.perf_counter()
+                try:
+                    if lang == render_lang:
+                        path, output["video"], output["render"] = await translate_and_render(
+                            base_srt_path, base_txt_path, lang, video_path, video_hash,
+                            render_req["style_json"], render_req.get("profile"), calls, slots,
+                            lambda fraction: report(lang, fraction))
+                    else:
+                        async with slots:
+                            t_lang = time.perf_counter()
+                            path = await call_translator(base_srt_path, base_txt_path, lang, calls)
+                    _cache_put(path, video_hash, f"translated_{_lang_key(lang)}.srt")
+                    srts[lang] = path
+                    languages[lang] = {"status": "done", "cache": cache_status}
+                except Exception as e:
+                    languages[lang] = {"status": "failed", "error": str(getattr(e, "detail", e))}
+                languages[lang]["translate_s"] = round(time.perf_counter() - t_lang, 3)
+                report(lang, 1.0)
+
+            try:
+                await asyncio.gather(*(translate(lang) for lang in missing))
+            finally:
+                # Transcript copies are only needed for these calls (the cache keeps its own)
+                _remove_quietly(base_srt_path, base_txt_path)
+            timings["translate"] = round(time.perf_counter() - t0, 3)
+            JOB_STAGE_SECONDS.observe(timings["translate"], stage="translate")
+
+        ready = [lang for lang in target_langs if srts[lang]]
+        if not ready:
+            failures = "; ".join(f"{lang}: {languages[lang].get('error')}" for lang in target_langs)
+            raise HTTPException(status_code=502, detail=f"Translation failed for every language ({failures})")
+
+        if render_lang and srts[render_lang] and "render" not in output:
+            # Translation came from the cache: nothing to overlap with, burn it in one go
+            _job_update(job_id, stage="render", progress=0.9, timings=timings)
+            t0 = time.perf_counter()
+            output["video"], output["render"] = await _render_whole(
+                video_path, srts[render_lang], render_req["style_json"], render_req.get("profile"),
+                calls, video_hash, 0)
+            timings["render"] = round(time.perf_counter() - t0, 3)
+            JOB_STAGE_SECONDS.observe(timings["render"], stage="render")
+        if render_lang:
+            render_state = {**render_req, **output.get("render", {"status": "failed",
+                                                                  "error": languages[render_lang].get("error")})}
+            _job_update(job_id, output=output.get("video"), render=render_state, calls=calls)
+
+        _job_update(job_id, srt=srts[ready[0]], srts={lang: srts[lang] for lang in ready},
+                    languages={lang: languages[lang] for lang in target_langs}, cache=cache_status, timings=timings,
+                    status="done", stage="done", progress=1.0)
+        JOBS_FINISHED.inc(status="done", cache=cache_status)
+
+    except HTTPException as e:
+        _job_update(job_id, status="failed", error=e.detail)
+        JOBS_FINISHED.inc(status="failed", cache="none")
+    except Exception as e:
+        _job_update(job_id, status="failed", error=f"process_initial failed: {e}")
+        JOBS_FINISHED.inc(status="failed", cache="none")
+
+JOB_QUEUE: JobQueue = JOB_QUEUE_BACKENDS[JOB_QUEUE_BACKEND](run_pipeline, JOB_WORKERS)
+
 # =======================
 # FastAPI App
 # =======================
-app = FastAPI(title="Subtitle Pipeline", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for name in UPSTREAMS:
+        HTTP_CLIENTS[name] = _new_httpx_client(name)
+    await JOB_QUEUE.start()
+    gc_task = asyncio.create_task(_gc_loop())
+    yield
+    gc_task.cancel()
+    await JOB_QUEUE.stop()
+    await close_httpx_clients()
+
+app = FastAPI(title="Subtitle Pipeline", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS so frontend can call this service directly
 app.add_middleware(
@@ -171,34 +1160,70 @@ app.add_middleware(
 @app.post("/process_initial")
 async def process_initial(
     file: UploadFile = File(..., description="Source video file (mp4/mov/etc.)"),
-    target_lang: str = Form(..., description="Target language code (e.g., 'ja', 'Japanese')")
+    target_lang: Optional[str] = Form(None, description="Target language code (e.g., 'ja', 'Japanese')"),
+    target_langs: Optional[str] = Form(None, description="Several target languages, comma-separated (e.g. 'es,fr,de')"),
+    wait: bool = Form(False, description="Block until the job finishes (legacy synchronous behaviour)"),
+    style_json: Optional[str] = Form(None, description="Also render the final video with this overlay style (pipelined)"),
+    profile: Optional[str] = Form(None, description="Encoding profile for that render")
 ):
     """
-    Step 1: Extractor + Translator.
-    Stores video + translated SRT in JOB_STORE and returns job_id.
+    Step 1: Extractor + Translator, as a background job.
+    Saves the upload, queues the job and returns its job_id immediately;
+    poll GET /jobs/{job_id} (or stream /jobs/{job_id}/events) until status is "done".
+    With target_langs the job produces one SRT per language from a single
+    extraction; the first language is the job's default for overlay.
+    With style_json the job also renders that language's final video,
+    encoding window by window while the rest is still being translated;
+    fetch it from GET /jobs/{job_id}/output.
     """
+    langs = [lang.strip() for lang in (target_langs or target_lang or "").split(",") if lang.strip()]
+    langs = list(dict.fromkeys(langs))
+    if not langs:
+        raise HTTPException(status_code=422, detail="target_lang or target_langs is required")
+    if style_json is not None:
+        try:
+            json.loads(style_json)
+        except Exception:
+            raise HTTPException(status_code=422, detail="style_json must be valid JSON string")
     try:
-        # Save incoming video
+        # Save incoming video (hashed while streaming to disk)
+        t0 = time.perf_counter()
         video_suffix = os.path.splitext(file.filename or "")[1] or ".mp4"
-        video_path = tempfile.mkstemp(suffix=video_suffix)[1]
-        content = await file.read()
-        with open(video_path, "wb") as vf:
-            vf.write(content)
-
-        # Extractor
-        base_srt_path, base_txt_path = await call_extractor(video_path)
-
-        # Translator
-        translated_srt_path = await call_translator(base_srt_path, base_txt_path, target_lang)
+        video_path, video_hash = await _spool_upload(file, video_suffix)
+        upload_s = round(time.perf_counter() - t0, 3)
+        JOB_STAGE_SECONDS.observe(upload_s, stage="upload")
 
         # Register job
         job_id = uuid.uuid4().hex
-        JOB_STORE[job_id] = {
+        JOB_STORE.put(job_id, {
             "video": video_path,
-            "srt": translated_srt_path
-        }
+            "srt": None,
+            "srts": {},
+            "video_hash": video_hash,
+            "target_lang": langs[0],
+            "target_langs": langs,
+            "languages": {},
+            "render": {"style_json": style_json, "profile": profile, "status": "pending"} if style_json else None,
+            "output": None,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0.0,
+            "timings": {"upload": upload_s},
+            "calls": [],
+            "created_at": time.time(),
+            "queued_at": time.time(),
+        })
+        await JOB_QUEUE.submit(job_id)
+
+        if wait:
+            snap = await _wait_for_job(job_id)
+            if snap["status"] == "failed":
+                raise HTTPException(status_code=502, detail=snap["error"])
+            return {"job_id": job_id, "cache": snap["cache"], "languages": snap["languages"],
+                    "message": "Translation ready. Use this job_id for overlay."}
 
-        return {"job_id": job_id, "message": "Translation ready. Use this job_id for overlay."}
+        return {"job_id": job_id, "status": "queued",
+                "message": "Job queued. Poll /jobs/{job_id} until status is 'done', then use it for overlay."}
 
     except HTTPException:
         raise
@@ -206,39 +1231,318 @@ async def process_initial(
         raise HTTPException(status_code=500, detail=f"process_initial failed: {e}")
 
 
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Stage, progress, per-stage timings (seconds) and error, if any."""
+    job = JOB_STORE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Invalid job_id or expired job")
+    return {**_job_snapshot(job_id, job), "queue_depth": JOB_QUEUE.depth()}
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events: one `data: {job status}` message per change, until done/failed."""
+    if job_id not in JOB_STORE:
+        raise HTTPException(status_code=404, detail="Invalid job_id or expired job")
+
+    async def stream():
+        async with _watch_job(job_id) as q:
+            snap = _job_snapshot(job_id)
+            while True:
+                yield f"data: {json.dumps(snap)}\n\n"
+                if snap["status"] in JOB_TERMINAL:
+                    break
+                snap = await q.get()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/jobs/{job_id}/output")
+async def job_output(job_id: str):
+    """The final video of a job created with style_json, once its render is done."""
+    job = JOB_STORE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Invalid job_id or expired job")
+    if not job.get("output"):
+        render = job.get("render")
+        if render is None:
+            raise HTTPException(status_code=404, detail="Job was created without style_json, use /overlay")
+        if job["status"] != "done":
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}, render not finished")
+        raise HTTPException(status_code=409, detail=f"Render is {render['status']}: {render.get('error')}")
+    suffix = os.path.splitext(job["output"])[1]
+    return ServedFileResponse(job["output"], filename=f"final_{job_id}{suffix}",
+                              media_type=SUFFIX_MEDIA_TYPES.get(suffix, "video/mp4"))
+
+
+@app.get("/jobs/{job_id}/renders")
+async def job_renders(job_id: str):
+    """Render artifacts kept for a job by /overlay, keyed by render key."""
+    job = JOB_STORE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Invalid job_id or expired job")
+    return {key: {k: v for k, v in render.items() if k != "path"}
+            for key, render in (job.get("renders") or {}).items()}
+
+
+@app.get("/jobs/{job_id}/renders/{key}")
+async def job_render(job_id: str, key: str):
+    """
+    One render artifact, with Range/If-Range support for resumed and seeked
+    downloads. A render still in flight is waited for, never started again.
+    """
+    job = JOB_STORE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Invalid job_id or expired job")
+    download = _render_downloads.get((job_id, key))
+    if download is not None:
+        while not download.done:
+            await download.changed.wait()
+        if download.error:
+            raise HTTPException(status_code=502, detail=f"Render failed: {getattr(download.error, 'detail', download.error)}")
+        job = JOB_STORE.get(job_id) or job
+    render = (job.get("renders") or {}).get(key)
+    if render is None or not os.path.exists(render["path"]):
+        raise HTTPException(status_code=404, detail="Unknown render key, use /overlay")
+    return _render_file_response(job_id, key, render)
+
+
+def _ready_job(job_id: str) -> Dict[str, Any]:
+    job = JOB_STORE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Invalid job_id or expired job")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}, not ready for overlay")
+    return job
+
+def _job_srt(job: Dict[str, Any], lang: Optional[str]) -> tuple:
+    """(translated SRT path, language) of a finished job; `lang` picks one of its target_langs."""
+    if not lang:
+        return job["srt"], job["target_lang"]
+    srt_path = (job.get("srts") or {}).get(lang)
+    if srt_path is None:
+        state = (job.get("languages") or {}).get(lang)
+        if state is None:
+            raise HTTPException(status_code=404, detail=f"Language '{lang}' was not requested for this job")
+        raise HTTPException(status_code=409, detail=f"Translation to '{lang}' failed: {state.get('error')}")
+    return srt_path, lang
+
+@asynccontextmanager
+async def _timed_stage(job_id: str, stage: str):
+    """
+    Time a request-scoped stage of a finished job (overlay, preview): the
+    duration lands in the job's timings and stage metrics, and the upstream
+    attempts collected in the yielded list are appended to the job's calls.
+    """
+    attempts: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
+    try:
+        yield attempts
+    finally:
+        seconds = round(time.perf_counter() - t0, 3)
+        JOB_STAGE_SECONDS.observe(seconds, stage=stage)
+        job = JOB_STORE.get(job_id)
+        if job is not None:
+            _job_update(job_id, timings={**job["timings"], stage: seconds},
+                        calls=job.get("calls", []) + attempts)
+
+class ServedFileResponse(FileResponse):
+    """FileResponse for a job file, pinned (see _pin_served) until the response ends, however it ends."""
+    def __init__(self, path: str, **kwargs):
+        super().__init__(path, **kwargs)
+        _pin_served(path)
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _unpin_served(self.path)
+
+def _stream_and_delete(path: str, filename: str, disposition: str = "attachment") -> StreamingResponse:
+    def iterfile():
+        t0 = time.perf_counter()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+                yield chunk
+        JOB_STAGE_SECONDS.observe(time.perf_counter() - t0, stage="download")
+
+    suffix = os.path.splitext(path)[1]
+    return StreamingResponse(
+        iterfile(),
+        media_type=SUFFIX_MEDIA_TYPES.get(suffix, "video/mp4"),
+        headers={"Content-Disposition": f'{disposition}; filename="{filename}{suffix}"'},
+        background=BackgroundTask(lambda: _remove_quietly(path))
+    )
+
+# =======================
+# Render artifacts
+# =======================
+# Final /overlay renders are kept with the job, keyed by what went into them,
+# so a repeated, resumed or seeked download is a file read, not a re-render.
+class RenderDownload:
+    """
+    One render being streamed from the overlay service into a job artifact.
+    The download runs as its own task, so a client that disconnects does not
+    stop it; any number of responses follow the file as it grows.
+    """
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.total: Optional[int] = None
+        self.received = 0
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.started = asyncio.Event()   # set once the file exists (or the render failed)
+        self.changed = asyncio.Event()   # replaced after every notify; wait on the current one
+
+    def feed(self, path: str, chunk: bytes, total: Optional[int]) -> None:
+        if path != self.path:  # first chunk, or a retry started a new file
+            self.path, self.total, self.received = path, total, 0
+        self.received += len(chunk)
+        self.started.set()
+        self._notify()
+
+    def finish(self, error: Optional[Exception] = None) -> None:
+        self.done, self.error = True, error
+        self.started.set()
+        self._notify()
+
+    def _notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+_render_downloads: Dict[tuple, RenderDownload] = {}
+
+def _render_key(srt_path: str, style_json: str, profile: Optional[str], mode: Optional[str],
+                language: Optional[str]) -> str:
+    """Hash of the SRT bytes and every /overlay option that changes the output."""
+    h = hashlib.sha256()
+    with open(srt_path, "rb") as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+            h.update(chunk)
+    options = [json.loads(style_json), profile or "", mode or "burn", language or ""]
+    h.update(json.dumps(options, sort_keys=True).encode())
+    return h.hexdigest()[:32]
+
+def _render_headers(job_id: str, key: str) -> Dict[str, str]:
+    return {"X-Render-Key": key, "Content-Location": f"/jobs/{job_id}/renders/{key}"}
+
+def _render_file_response(job_id: str, key: str, render: Dict[str, Any]) -> FileResponse:
+    """
+    Finished artifact from disk. FileResponse answers Range/If-Range with 206
+    (ETag and Last-Modified from the file) and hands the path to the server
+    (http.response.pathsend) when it can send the file itself. The file is
+    pinned until then, so evicting the job cannot unlink it first.
+    """
+    suffix = os.path.splitext(render["path"])[1]
+    response = ServedFileResponse(render["path"], filename=f"final_{job_id}{suffix}",
+                                  media_type=SUFFIX_MEDIA_TYPES.get(suffix, "video/mp4"),
+                                  headers=_render_headers(job_id, key))
+    response.chunk_size = STREAM_CHUNK_SIZE
+    return response
+
+async def _download_render(job_id: str, key: str, download: RenderDownload, video_path: str,
+                           srt_path: str, style_json: str, profile: Optional[str],
+                           video_hash: Optional[str], mode: Optional[str], language: Optional[str]) -> None:
+    try:
+        async with _timed_stage(job_id, "overlay") as attempts:
+            path = await call_overlay(video_path, srt_path, style_json, profile, attempts=attempts,
+                                      video_hash=video_hash, mode=mode, language=language,
+                                      on_chunk=download.feed)
+        job = JOB_STORE.get(job_id)
+        if job is None:  # evicted while rendering; followers still read the open file
+            _remove_quietly(path)
+        else:
+            render = {"path": path, "size": os.path.getsize(path), "created_at": time.time(),
+                      "profile": profile, "mode": mode or "burn", "language": language}
+            _job_update(job_id, renders={**(job.get("renders") or {}), key: render})
+        download.finish()
+    except Exception as e:
+        download.finish(e)
+    finally:
+        _render_downloads.pop((job_id, key), None)
+
+async def _follow_render(download: RenderDownload):
+    """Yield the render file as the download task writes it."""
+    f, path, sent, t0 = None, None, 0, time.perf_counter()
+    try:
+        while True:
+            changed = download.changed
+            if download.path != path:
+                if sent:
+                    raise RuntimeError("overlay render restarted after bytes were sent")
+                if f:
+                    f.close()
+                path = download.path
+                f = open(path, "rb")
+            data = await asyncio.to_thread(f.read, STREAM_CHUNK_SIZE) if sent < download.received else b""
+            if data:
+                sent += len(data)
+                yield data
+            elif download.done:
+                if download.error:
+                    raise download.error
+                JOB_STAGE_SECONDS.observe(time.perf_counter() - t0, stage="download")
+                return
+            else:
+                await changed.wait()
+    finally:
+        if f:
+            f.close()
+
+
 @app.post("/overlay")
 async def overlay_endpoint(
     job_id: str = Form(..., description="Job ID from /process_initial"),
-    style_json: str = Form(..., description="Overlay style JSON as string (required)")
+    style_json: str = Form(..., description="Overlay style JSON as string (required)"),
+    profile: Optional[str] = Form(None, description="Encoding profile: fast-preview, balanced or archival"),
+    mode: Optional[str] = Form(None, description="burn (default) re-encodes with subtitles drawn in, soft muxes a subtitle track"),
+    lang: Optional[str] = Form(None, description="Which of the job's target_langs to use (default: the first)")
 ):
     """
     Step 2: Overlay.
     Uses stored video + translated SRT from JOB_STORE.
-    Returns final MP4 with burned-in subtitles.
+    Returns final MP4 with burned-in subtitles (or, with mode=soft, the
+    original streams plus a styled subtitle track; archival gives MKV).
+
+    The render is kept with the job (see Content-Location): the same request
+    again, or a Range request to /jobs/{job_id}/renders/{key}, reads it from
+    disk. A new render is streamed to the client while it is written to
+    disk, and finishes even if the client disconnects.
     """
     try:
-        if job_id not in JOB_STORE:
-            raise HTTPException(status_code=404, detail="Invalid job_id or expired job")
-
-        video_path = JOB_STORE[job_id]["video"]
-        srt_path = JOB_STORE[job_id]["srt"]
+        job = _ready_job(job_id)
+        srt_path, language = _job_srt(job, lang)
+        try:
+            key = _render_key(srt_path, style_json, profile, mode, language)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="style_json must be valid JSON string")
 
-        # Overlay
-        final_video_path = await call_overlay(video_path, srt_path, style_json)
+        render = (job.get("renders") or {}).get(key)
+        if render and os.path.exists(render["path"]):
+            RENDER_ARTIFACTS.inc(outcome="hit")
+            return _render_file_response(job_id, key, render)
 
-        # Stream final video
-        def iterfile():
-            with open(final_video_path, "rb") as f:
-                for chunk in iter(lambda: f.read(1024 * 1024), b""):
-                    yield chunk
+        download = _render_downloads.get((job_id, key))
+        if download is None:
+            RENDER_ARTIFACTS.inc(outcome="rendered")
+            download = _render_downloads[(job_id, key)] = RenderDownload()
+            asyncio.create_task(_download_render(job_id, key, download, job["video"], srt_path, style_json,
+                                                 profile, job.get("video_hash"), mode, language))
+        else:
+            RENDER_ARTIFACTS.inc(outcome="joined")
+        await download.started.wait()
+        if download.error:
+            raise download.error
 
-        filename = f"final_{uuid.uuid4().hex}.mp4"
-        return StreamingResponse(
-            iterfile(),
-            media_type="video/mp4",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-            background=BackgroundTask(lambda: os.remove(final_video_path))
-        )
+        suffix = os.path.splitext(download.path)[1]
+        headers = {**_render_headers(job_id, key),
+                   "Content-Disposition": f'attachment; filename="final_{job_id}{suffix}"'}
+        if download.total is not None:
+            headers["Content-Length"] = str(download.total)
+        return StreamingResponse(_follow_render(download), headers=headers,
+                                 media_type=SUFFIX_MEDIA_TYPES.get(suffix, "video/mp4"))
 
     except HTTPException:
         raise
@@ -246,6 +1550,70 @@ async def overlay_endpoint(
         raise HTTPException(status_code=500, detail=f"overlay failed: {e}")
 
 
+@app.post("/preview")
+async def preview_endpoint(
+    job_id: str = Form(..., description="Job ID from /process_initial"),
+    style_json: str = Form(..., description="Overlay style JSON as string (required)"),
+    start: float = Form(0.0, description="Preview window start in seconds"),
+    duration: Optional[float] = Form(None, description="Preview length in seconds (overlay default if omitted)"),
+    cue: Optional[int] = Form(None, description="SRT cue number to preview (overrides start)"),
+    lang: Optional[str] = Form(None, description="Which of the job's target_langs to use (default: the first)")
+):
+    """
+    Quick low-resolution render of a few seconds with the given style,
+    for iterating on styles without paying for a full /overlay encode.
+    """
+    try:
+        job = _ready_job(job_id)
+        srt_path, _ = _job_srt(job, lang)
+        async with _timed_stage(job_id, "preview") as attempts:
+            preview_path = await call_overlay(job["video"], srt_path, style_json,
+                                              preview={"start": start, "duration": duration, "cue": cue},
+                                              attempts=attempts, video_hash=job.get("video_hash"))
+        return _stream_and_delete(preview_path, f"preview_{job_id}", disposition="inline")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"preview failed: {e}")
+
+
+@app.get("/metrics")
+async def metrics():
+    jobs = JOB_STORE.jobs()
+    lines = [
+        *gauge("orchestrator_jobs_active", "Jobs queued or running", sum(1 for j in jobs if j["status"] not in JOB_TERMINAL)),
+        *gauge("orchestrator_jobs_stored", "Job records held by the job store", len(jobs)),
+        *gauge("orchestrator_job_queue_depth", "Jobs waiting for a pipeline worker", JOB_QUEUE.depth()),
+        *JOBS_FINISHED.render(),
+        *JOB_STAGE_SECONDS.render(),
+        *UPSTREAM_ATTEMPTS.render(),
+        *UPSTREAM_RETRIES.render(),
+        *UPSTREAM_SECONDS.render(),
+        *UPSTREAM_BYTES_SENT.render(),
+        *UPSTREAM_BYTES_RECEIVED.render(),
+        *OVERLAY_ASSETS.render(),
+        *RENDER_ARTIFACTS.render(),
+    ]
+    for field, help_text in (("requests", "Requests sent per upstream"),
+                             ("new_connections", "TCP connections opened per upstream")):
+        lines += [f"# HELP orchestrator_pool_{field}_total {help_text}",
+                  f"# TYPE orchestrator_pool_{field}_total counter",
+                  *(f'orchestrator_pool_{field}_total{{upstream="{name}"}} {st[field]}'
+                    for name, st in POOL_STATS.items())]
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+
 @app.get("/healthz")
 async def healthz():
-    return {"ok": True, "jobs_active": len(JOB_STORE)}
+    jobs = JOB_STORE.jobs()
+    active = sum(1 for j in jobs if j["status"] not in JOB_TERMINAL)
+    disk = sum(os.path.getsize(p) for j in jobs for p in _job_files(j) if os.path.exists(p))
+    return {"ok": True, "jobs_active": active, "jobs_total": len(jobs),
+            "queue_depth": JOB_QUEUE.depth(),
+            "job_store": {"backend": JOB_STORE_BACKEND, "max_jobs": JOB_STORE.max_jobs,
+                          "ttl_s": JOB_STORE.ttl, "evicted": JOB_STORE.evicted},
+            "jobs_disk_bytes": disk,
+            "jobs_record_bytes": sum(len(json.dumps(j)) for j in jobs),
+            "process_rss_bytes": _process_rss_bytes(),
+            "connection_pools": _pool_stats()}
@@ -1,15 +1,601 @@
 #overlay.py
 from fastapi import FastAPI
-from fastapi import APIRouter, File, UploadFile, Form
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, File, UploadFile, Form, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+from starlette.background import BackgroundTask, BackgroundTasks
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
 import subprocess
 import os
 import shutil
 import tempfile
 import json
+import re
+import time
+import uuid
+import hashlib
+import threading
+from functools import lru_cache
+
+import subtitles
+from service_metrics import Counter, Histogram, gauge
 
 app = FastAPI(title="Overlay API")
 
+# ================== Encoding Profiles ==================
+# Picked per request with the `profile` form field or style_json["encoding_profile"].
+ENCODING_PROFILES = {
+    "fast-preview": {"preset": "veryfast", "crf": 28, "tune": "fastdecode", "container": "mp4"},
+    "balanced":     {"preset": "fast",     "crf": 23, "tune": None,         "container": "mp4"},
+    "archival":     {"preset": "slow",     "crf": 18, "tune": "film",       "container": "mkv"},
+}
+DEFAULT_ENCODING_PROFILE = os.getenv("DEFAULT_ENCODING_PROFILE", "balanced")
+
+# Encoder threads per encode slot (0 = cores // MAX_CONCURRENT_ENCODES, so the
+# slots together use every core once; see ENCODE_THREADS)
+FFMPEG_THREADS = int(os.getenv("FFMPEG_THREADS", "0"))
+
+# "auto" uses the first hardware H.264 encoder this FFmpeg build offers, a name
+# (e.g. "h264_nvenc") forces one, empty keeps libx264.
+FFMPEG_HW_ENCODER = os.getenv("FFMPEG_HW_ENCODER", "")
+
+# Hardware encoders: how to map a profile's preset/CRF onto their own knobs
+HW_ENCODERS = {
+    "h264_nvenc": lambda prof: ["-preset", {"veryfast": "p2", "fast": "p4", "slow": "p7"}.get(prof["preset"], "p4"),
+                                "-rc", "vbr", "-cq", str(prof["crf"]), "-b:v", "0"],
+    "h264_qsv":   lambda prof: ["-preset", prof["preset"], "-global_quality", str(prof["crf"])],
+}
+
+CONTAINER_MEDIA_TYPES = {"mp4": "video/mp4", "mkv": "video/x-matroska"}
+
+# ================== Soft Subtitles ==================
+# mode="soft" muxes the subtitles as a text track next to the untouched video
+# and audio instead of burning them in. MKV carries the styled ASS as-is; MP4
+# can only hold mov_text, which keeps colour/bold/italic but not outline/position.
+SOFT_SUBTITLE_CODECS = {"mkv": "ass", "mp4": "mov_text"}
+ASS_PLAY_RES = (384, 288)  # what FFmpeg's SRT decoder uses, so FontSize/MarginV match a burn
+
+# Track language metadata must be ISO 639-2 (MP4 drops anything else); the
+# two-letter codes the frontend offers are mapped, other tags pass through.
+ISO639_2 = {"en": "eng", "es": "spa", "fr": "fre", "de": "ger", "it": "ita", "pt": "por",
+            "ru": "rus", "ja": "jpn", "ko": "kor", "zh": "chi", "ar": "ara", "hi": "hin"}
+
+# ================== Encode Admission ==================
+# FFmpeg runs as asyncio subprocesses; at most MAX_CONCURRENT_ENCODES run at
+# once (default: one per core, or cores // FFMPEG_THREADS), up to
+# MAX_QUEUED_ENCODES more wait for a slot and anything beyond that gets 503.
+MAX_CONCURRENT_ENCODES = int(os.getenv("OVERLAY_MAX_CONCURRENT_ENCODES", "0")) or \
+    max(1, (os.cpu_count() or 1) // max(FFMPEG_THREADS, 1))
+MAX_QUEUED_ENCODES = int(os.getenv("OVERLAY_MAX_QUEUED_ENCODES", str(2 * MAX_CONCURRENT_ENCODES)))
+BUSY_RETRY_AFTER = int(os.getenv("OVERLAY_BUSY_RETRY_AFTER", "10"))          # seconds, sent with 503
+DISCONNECT_POLL_INTERVAL = float(os.getenv("OVERLAY_DISCONNECT_POLL", "0.5"))  # seconds
+
+# Threads (cores) one slot stands for, passed to every encode as -threads so
+# the slots match CPU capacity; a segment-parallel burn takes a slot per piece
+# and splits the threads of the slots it holds between its FFmpeg processes.
+ENCODE_THREADS = FFMPEG_THREADS or max(1, (os.cpu_count() or 1) // MAX_CONCURRENT_ENCODES)
+
+_encodes_waiting = 0
+_encodes_active = 0
+
+# Live -progress figures of queued/running encodes, by encode_id (GET /encodes)
+ACTIVE_ENCODES: dict = {}
+
+# ================== Segment-parallel Burns ==================
+# Long videos are cut at keyframes into N pieces that are burned by N FFmpeg
+# processes at once. BURN_SEGMENTS: "0"/"1" = single process, "auto" = one per core.
+# Each piece takes an encode slot, so N is capped at MAX_CONCURRENT_ENCODES.
+BURN_SEGMENTS = os.getenv("BURN_SEGMENTS", "0")
+PARALLEL_MIN_DURATION = float(os.getenv("PARALLEL_MIN_DURATION", "60"))  # seconds; shorter videos stay single-process
+PARALLEL_MAX_PREROLL = float(os.getenv("PARALLEL_MAX_PREROLL", "30"))    # seconds re-rendered before a cut to match cue stacking
+
+# ================== Preview Renders ==================
+# Short, low-res, low-fps, ultrafast, silent clips for style iteration.
+PREVIEW_HEIGHT = int(os.getenv("PREVIEW_HEIGHT", "360"))
+PREVIEW_FPS = int(os.getenv("PREVIEW_FPS", "12"))
+PREVIEW_DEFAULT_DURATION = float(os.getenv("PREVIEW_DEFAULT_DURATION", "4"))
+PREVIEW_MAX_DURATION = float(os.getenv("PREVIEW_MAX_DURATION", "15"))
+PREVIEW_CUE_LEAD_IN = 0.5  # seconds shown before the chosen cue starts
+
+# ================== Asset Cache ==================
+# Source videos are kept by sha256 so clients upload once (PUT /assets/{sha256})
+# and then send `video_sha256` instead of the file. ASSET_CACHE_MAX_BYTES=0
+# disables the cache (every request must upload the video).
+ASSET_DIR = os.getenv("ASSET_DIR", os.path.join(tempfile.gettempdir(), "overlay_assets"))
+ASSET_CACHE_MAX_BYTES = int(os.getenv("ASSET_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# ================== Render Cache ==================
+# Finished /overlay outputs keyed by (video sha256, SRT sha256, canonical style,
+# encoding profile, encoder); a repeat request streams the stored file without
+# encoding. RENDER_CACHE_MAX_BYTES=0 disables it.
+RENDER_DIR = os.getenv("RENDER_DIR", os.path.join(tempfile.gettempdir(), "overlay_renders"))
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+
+# ================== Metrics ==================
+# Prometheus text exposition for GET /metrics (shared service_metrics module).
+ENCODES_TOTAL = Counter("overlay_encodes_total", "Encode requests by kind and outcome (ok/error/disconnected/rejected)")
+ENCODE_SECONDS = Histogram("overlay_encode_seconds", "Wall time of successful encodes, excluding queue wait")
+QUEUE_WAIT_SECONDS = Histogram("overlay_queue_wait_seconds", "Time spent waiting for an encode slot")
+ENCODED_FRAMES = Counter("overlay_encoded_frames_total", "Frames written by successful encodes")
+RENDER_REQUESTS = Counter("overlay_render_requests_total", "/overlay requests by render cache result (hit/miss)")
+ENCODED_MEDIA_SECONDS = Counter("overlay_encoded_media_seconds_total", "Seconds of video written by successful encodes")
+
+class EncodeProgress:
+    """
+    Live figures for one request, parsed from FFmpeg's `-progress` output.
+    A segment-parallel burn reports one `part` per FFmpeg process; frames,
+    fps and output time are summed across parts.
+    """
+
+    def __init__(self, encode_id: str, kind: str, duration: float = 0.0):
+        self.encode_id, self.kind, self.duration = encode_id, kind, duration
+        self.status = "queued"
+        self.queue_position = 0    # live place in the wait queue (1 = next), 0 once running
+        self.arrival_position = 0  # place on arrival, sent back as X-Queue-Position
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.parts = {}
+
+    def queued(self, position: int) -> None:
+        if self.status == "queued":
+            self.queue_position = position
+
+    def start(self, arrival_position: int) -> None:
+        self.status, self.queue_position, self.started = "running", 0, time.time()
+        self.arrival_position = arrival_position
+
+    def update(self, part: int, key: str, value: str) -> None:
+        p = self.parts.setdefault(part, {"frame": 0, "fps": 0.0, "out_time": 0.0})
+        try:
+            if key == "frame":
+                p["frame"] = int(value)
+            elif key == "fps":
+                p["fps"] = float(value)
+            elif key == "out_time_us":
+                p["out_time"] = max(int(value), 0) / 1e6
+        except ValueError:
+            pass  # "N/A" until the first frame is out
+
+    @property
+    def queue_wait(self) -> float:
+        return (self.started or time.time()) - self.created
+
+    @property
+    def elapsed(self) -> float:
+        return ((self.finished or time.time()) - self.started) if self.started else 0.0
+
+    def snapshot(self) -> dict:
+        frames = sum(p["frame"] for p in self.parts.values())
+        out_time = sum(p["out_time"] for p in self.parts.values())
+        speed = out_time / self.elapsed if self.elapsed > 0 else 0.0
+        eta = max(self.duration - out_time, 0.0) / speed if speed > 0 and self.duration else None
+        return {
+            "encode_id": self.encode_id,
+            "kind": self.kind,
+            "status": self.status,
+            "queue_position": self.queue_position,
+            "queue_wait_s": round(self.queue_wait, 3),
+            "elapsed_s": round(self.elapsed, 3),
+            "frames": frames,
+            "fps": round(sum(p["fps"] for p in self.parts.values()), 2),
+            "out_time_s": round(out_time, 3),
+            "duration_s": round(self.duration, 3),
+            "progress": round(min(out_time / self.duration, 1.0), 4) if self.duration else None,
+            "speed": round(speed, 3),
+            "eta_s": round(eta, 1) if eta is not None else None,
+        }
+
+    def headers(self) -> dict:
+        snap = self.snapshot()
+        return {"X-Encode-Id": self.encode_id, "X-Queue-Position": str(self.arrival_position),
+                "X-Queue-Wait-Seconds": str(snap["queue_wait_s"]), "X-Encode-Seconds": str(snap["elapsed_s"]),
+                "X-Encode-Frames": str(snap["frames"]), "X-Encode-Speed": str(snap["speed"])}
+
+class AssetMissing(Exception):
+    """A request referenced a video_sha256 the cache does not hold (never uploaded, or evicted)."""
+
+class DiskCache:
+    """
+    Content-addressed file store (<root>/<sha256>[.ext]), used for source
+    videos (ASSETS) and finished renders (RENDERS). Files are written under a
+    temp name and renamed into place, so readers never see partial files; the
+    least recently used are evicted past max_bytes, except pinned ones.
+    Handlers add files from worker threads, so pins and evictions share a lock.
+    """
+    _name = re.compile(r"[0-9a-f]{64}(\.[a-z0-9]+)?")
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root, self.max_bytes = root, max_bytes
+        self.pins = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evicted = 0
+        if self.enabled:
+            os.makedirs(root, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def valid(self, name: str) -> bool:
+        return bool(self._name.fullmatch(name))
+
+    def path(self, name: str) -> str:
+        if not self.valid(name):
+            raise ValueError("Cache key must be a lowercase hex sha256")
+        return os.path.join(self.root, name)
+
+    def lookup(self, name: str) -> str | None:
+        """Path of a cached file (refreshing its LRU stamp), or None."""
+        path = self.path(name)
+        if self.enabled and os.path.exists(path):
+            os.utime(path)
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def temp_file(self, fallback_dir: str):
+        """(fd, path) to spool an upload into; inside the cache dir so add() is a rename."""
+        return tempfile.mkstemp(suffix=".part", dir=self.root if self.enabled else fallback_dir)
+
+    def add(self, tmp_path: str, name: str) -> str:
+        path = self.path(name)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def add_copy(self, src_path: str, name: str) -> str:
+        """Store a copy of src_path (a hard link when on the same filesystem)."""
+        fd, tmp_path = self.temp_file(self.root)
+        os.close(fd)
+        try:
+            os.remove(tmp_path)
+            os.link(src_path, tmp_path)
+        except OSError:
+            shutil.copyfile(src_path, tmp_path)
+        return self.add(tmp_path, name)
+
+    def pin(self, name: str) -> None:
+        with self._lock:
+            self.pins[name] = self.pins.get(name, 0) + 1
+
+    def unpin(self, name: str) -> None:
+        with self._lock:
+            self.pins[name] -= 1
+            if not self.pins[name]:
+                del self.pins[name]
+
+    @contextmanager
+    def pinned(self, name: str):
+        self.pin(name)
+        try:
+            yield
+        finally:
+            self.unpin(name)
+
+    def _entries(self) -> list:
+        entries = []
+        for name in os.listdir(self.root):
+            if self.valid(name):
+                try:
+                    st = os.stat(os.path.join(self.root, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name))
+        return entries
+
+    def evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            with self._lock:
+                if name in self.pins:
+                    continue
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except FileNotFoundError:
+                    pass
+            total -= size
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        entries = self._entries() if self.enabled else []
+        return {"enabled": self.enabled, "files": len(entries), "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses, "evicted": self.evicted}
+
+ASSETS = DiskCache(ASSET_DIR, ASSET_CACHE_MAX_BYTES)
+RENDERS = DiskCache(RENDER_DIR, RENDER_CACHE_MAX_BYTES)
+
+def spool_video(video: UploadFile, tmpdir: str) -> tuple:
+    """
+    Copy an uploaded video to disk, hashing on the way; cached when the cache
+    is on. Returns (path, sha256), the sha256 pinned in ASSETS.
+    """
+    digest = hashlib.sha256()
+    fd, tmp_path = ASSETS.temp_file(tmpdir)
+    with os.fdopen(fd, "wb") as out:
+        for chunk in iter(lambda: video.file.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            out.write(chunk)
+    sha = digest.hexdigest()
+    ASSETS.pin(sha)  # held by the caller until its encode is done
+    if ASSETS.enabled:
+        return ASSETS.add(tmp_path, sha), sha
+    path = os.path.join(tmpdir, os.path.basename(video.filename or "input.mp4"))
+    os.replace(tmp_path, path)
+    return path, sha
+
+def resolve_video(video: UploadFile | None, video_sha256: str | None, tmpdir: str) -> tuple:
+    """
+    Source video for a request: the cached asset named by video_sha256, or the
+    uploaded file. Returns (path, sha256); the sha256 is pinned and must be
+    unpinned by the caller.
+    """
+    if video_sha256:
+        sha = video_sha256.strip().lower()
+        ASSETS.pin(sha)
+        path = ASSETS.lookup(sha) if ASSETS.valid(sha) else None
+        if path is None:
+            ASSETS.unpin(sha)
+            raise AssetMissing(sha)
+        return path, sha
+    if video is None:
+        raise ValueError("Send either a video file or video_sha256")
+    return spool_video(video, tmpdir)
+
+def pin_render(key: str) -> str | None:
+    """
+    Path of a cached render, pinned so eviction leaves it alone; None (and
+    nothing pinned) on a miss. FileResponse opens the file only after the
+    handler returns, so release the pin in the response's background task.
+    """
+    RENDERS.pin(key)
+    path = RENDERS.lookup(key)
+    if path is None:
+        RENDERS.unpin(key)
+    return path
+
+def save_hashed(upload: UploadFile, path: str) -> str:
+    """Write an upload to `path`, returning its sha256."""
+    digest = hashlib.sha256()
+    with open(path, "wb") as out:
+        for chunk in iter(lambda: upload.file.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+def asset_missing_response(sha: str) -> JSONResponse:
+    return JSONResponse({"error": f"Unknown asset {sha}; PUT /assets/{{sha256}} or upload the video",
+                         "asset_missing": True}, status_code=404)
+
+class OverlayBusy(Exception):
+    """All encode slots are taken and the wait queue is full."""
+
+class ClientDisconnected(Exception):
+    """The client went away while its request was queued or encoding."""
+
+class EncodeSlots:
+    """
+    The MAX_CONCURRENT_ENCODES encode slots. Unlike a semaphore a request can
+    take several at once (a segment-parallel burn holds one per FFmpeg process),
+    and waiters are served strictly in arrival order so a wide request is not
+    starved by narrow ones that come after it.
+    """
+
+    def __init__(self, total: int):
+        self.total = self.free = total
+        self._waiters = []  # [slots, future, on_position], oldest first
+
+    def locked(self, n: int = 1) -> bool:
+        return bool(self._waiters) or self.free < n
+
+    async def acquire(self, n: int = 1, on_position=None) -> None:
+        """
+        Take n (<= total) slots, waiting behind earlier requests if needed.
+        While waiting, on_position(place) is called on arrival and whenever
+        the queue moves (1 = next in line).
+        """
+        if not self.locked(n):
+            self.free -= n
+            return
+        waiter = [n, asyncio.get_running_loop().create_future(), on_position]
+        self._waiters.append(waiter)
+        self._report()
+        try:
+            await waiter[1]
+        except BaseException:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._wake()
+            elif not waiter[1].cancelled():
+                self.release(n)  # granted just as the waiter was cancelled
+            raise
+
+    def release(self, n: int = 1) -> None:
+        self.free += n
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and (self._waiters[0][1].done() or self._waiters[0][0] <= self.free):
+            n, fut, _ = self._waiters.pop(0)
+            if not fut.done():
+                self.free -= n
+                fut.set_result(None)
+        self._report()
+
+    def _report(self) -> None:
+        for place, (_, _, on_position) in enumerate(self._waiters, 1):
+            if on_position:
+                on_position(place)
+
+_encode_slots = EncodeSlots(MAX_CONCURRENT_ENCODES)
+
+@asynccontextmanager
+async def encode_slot(request: Request | None = None, slots: int = 1, on_position=None):
+    """
+    Hold `slots` of the MAX_CONCURRENT_ENCODES slots (capped at all of them)
+    for the body of the block. Yields the queue position the request got on
+    arrival (0 = started at once); on_position(place) follows it while waiting.
+    Raises OverlayBusy when the queue is full and ClientDisconnected if the
+    client leaves while waiting.
+    """
+    global _encodes_waiting, _encodes_active
+    slots = max(1, min(slots, MAX_CONCURRENT_ENCODES))
+    if _encode_slots.locked(slots) and _encodes_waiting >= MAX_QUEUED_ENCODES:
+        raise OverlayBusy()
+
+    position = _encodes_waiting + 1 if _encode_slots.locked(slots) else 0
+    if position and on_position:
+        on_position(position)
+    _encodes_waiting += 1
+    try:
+        await _until_done(asyncio.ensure_future(_encode_slots.acquire(slots, on_position)), request,
+                          on_abort=lambda: _encode_slots.release(slots))
+    finally:
+        _encodes_waiting -= 1
+    _encodes_active += 1
+    try:
+        yield position
+    finally:
+        _encodes_active -= 1
+        _encode_slots.release(slots)
+
+async def _until_done(fut: asyncio.Future, request: Request | None, on_abort=None):
+    """
+    Await `fut`, checking for a client disconnect every DISCONNECT_POLL_INTERVAL.
+    On disconnect or cancellation `fut` is cancelled (on_abort runs if it had
+    already completed) and the exception propagates.
+    """
+    try:
+        while True:
+            done, _ = await asyncio.wait({fut}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return fut.result()
+            if request is not None and await request.is_disconnected():
+                raise ClientDisconnected()
+    except BaseException:
+        if fut.done() and not fut.cancelled() and fut.exception() is None and on_abort:
+            on_abort()
+        fut.cancel()
+        raise
+
+@asynccontextmanager
+async def tracked_encode(kind: str, request: Request | None = None, encode_id: str | None = None,
+                         duration: float = 0.0, slots: int = 1):
+    """
+    encode_slot plus bookkeeping: the yielded EncodeProgress is listed under
+    GET /encodes while queued (with its live queue position) and running, and
+    feeds the /metrics counters when done.
+    """
+    progress = EncodeProgress(encode_id or uuid.uuid4().hex, kind, duration)
+    ACTIVE_ENCODES[progress.encode_id] = progress
+    outcome = "error"
+    try:
+        async with encode_slot(request, slots, on_position=progress.queued) as arrival_position:
+            progress.start(arrival_position)
+            QUEUE_WAIT_SECONDS.observe(progress.queue_wait, kind=kind)
+            yield progress
+            outcome = "ok"
+    except OverlayBusy:
+        outcome = "rejected"
+        raise
+    except ClientDisconnected:
+        outcome = "disconnected"
+        raise
+    finally:
+        ACTIVE_ENCODES.pop(progress.encode_id, None)
+        progress.status, progress.finished = outcome, time.time()
+        ENCODES_TOTAL.inc(kind=kind, outcome=outcome)
+        if outcome == "ok":
+            snap = progress.snapshot()
+            ENCODE_SECONDS.observe(snap["elapsed_s"], kind=kind)
+            ENCODED_FRAMES.inc(snap["frames"], kind=kind)
+            ENCODED_MEDIA_SECONDS.inc(snap["out_time_s"], kind=kind)
+            print(f"[debug] {kind} {progress.encode_id}: {snap['frames']} frames in {snap['elapsed_s']}s "
+                  f"({snap['speed']}x, waited {snap['queue_wait_s']}s)")
+
+async def _pump_progress(stream, progress: EncodeProgress, part: int) -> None:
+    async for line in stream:
+        key, _, value = line.decode("utf-8", "replace").strip().partition("=")
+        progress.update(part, key, value)
+
+async def _communicate(proc, progress: EncodeProgress | None, part: int):
+    if progress is None:
+        return await proc.communicate()
+    _, stderr, _ = await asyncio.gather(_pump_progress(proc.stdout, progress, part),
+                                        proc.stderr.read(), proc.wait())
+    return None, stderr
+
+async def run_ffmpeg(cmd: list, request: Request | None = None, capture_stdout: bool = False,
+                     progress: EncodeProgress | None = None, part: int = 0) -> bytes:
+    """
+    Run FFmpeg without blocking the event loop. If the client disconnects (or
+    the request task is cancelled) the process is killed. Non-zero exit raises
+    CalledProcessError like subprocess.run(check=True). With `progress`,
+    FFmpeg's `-progress` key=value stream (on stdout) is fed into it live.
+    """
+    if progress is not None:
+        cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE if capture_stdout or progress is not None else asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await _until_done(asyncio.ensure_future(_communicate(proc, progress, part)), request)
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+    return stdout
+
+def ffmpeg_error(e: subprocess.CalledProcessError) -> str:
+    tail = (e.stderr or b"").decode("utf-8", "replace").strip().splitlines()[-3:]
+    return f"FFmpeg failed (exit {e.returncode})" + (": " + " | ".join(tail) if tail else "")
+
+@lru_cache(maxsize=1)
+def available_hw_encoders() -> tuple:
+    try:
+        out = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"],
+                             capture_output=True, text=True, timeout=10).stdout
+    except Exception:
+        return ()
+    return tuple(name for name in HW_ENCODERS if f" {name} " in out)
+
+def select_video_encoder() -> str:
+    if FFMPEG_HW_ENCODER == "auto":
+        found = available_hw_encoders()
+        return found[0] if found else "libx264"
+    return FFMPEG_HW_ENCODER or "libx264"
+
+def resolve_profile(name: str | None) -> dict:
+    name = name or DEFAULT_ENCODING_PROFILE
+    if name not in ENCODING_PROFILES:
+        raise ValueError(f"Unknown encoding profile '{name}' (choose from {', '.join(ENCODING_PROFILES)})")
+    return {"name": name, **ENCODING_PROFILES[name]}
+
+def encoding_args(profile: dict, threads: int | None = None, faststart: bool = True) -> list:
+    """FFmpeg output options for a resolved profile (video codec, quality, threads, container flags)."""
+    encoder = select_video_encoder()
+    if encoder in HW_ENCODERS:
+        args = ["-c:v", encoder, *HW_ENCODERS[encoder](profile)]
+    else:
+        args = ["-c:v", "libx264", "-preset", profile["preset"], "-crf", str(profile["crf"])]
+        if profile.get("tune"):
+            args += ["-tune", profile["tune"]]
+    args += ["-pix_fmt", "yuv420p", "-threads", str(ENCODE_THREADS if threads is None else threads)]
+    if faststart and profile["container"] == "mp4":
+        args += ["-movflags", "+faststart"]
+    return args
+
 def hex_to_ass_color(hex_color: str) -> str:
     hex_color = hex_color.lstrip('#')
     r = hex_color[0:2]
@@ -20,69 +606,785 @@ def hex_to_ass_color(hex_color: str) -> str:
 def escape_path_for_ffmpeg(path: str) -> str:
     return path.replace("\\", "/").replace(":", "\\:")
 
+def _style_number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return int(number) if number.is_integer() else number
+
+def canonical_style(style_data: dict) -> dict:
+    """
+    The part of style_json that reaches the renderer, with the defaults every
+    overlay uses filled in, numbers and colour case normalised and unknown keys
+    dropped, so equivalent styles compare (and cache) equal.
+    """
+    return {
+        # Font & Text Style
+        "font": str(style_data.get("font", "Arial")),
+        "font_size": _style_number(style_data.get("font_size", 28)),
+        "bold": 1 if style_data.get("bold", False) else 0,
+        "italic": 1 if style_data.get("italic", False) else 0,
+        # Colors
+        "font_color": str(style_data.get("font_color", "#FFFFFF")).upper(),
+        "outline_color": str(style_data.get("outline_color", "#000000")).upper(),
+        # Outline & Shadow
+        "outline_thickness": _style_number(style_data.get("outline_thickness", 2)),  # Keep small for speed
+        "shadow_offset": _style_number(style_data.get("shadow_offset", 0)),  # Keep small for speed
+        # Position & Margins
+        "alignment": _style_number(style_data.get("alignment", 2)),  # 1=bottom-left, 2=bottom-center, 3=bottom-right, etc.
+        "margin_v": _style_number(style_data.get("margin_v", 30)),  # vertical offset
+    }
+
+def build_style_string(style_data: dict) -> str:
+    """force_style for the subtitles filter, with the defaults every overlay uses."""
+    style = canonical_style(style_data)
+    font_name, font_size = style["font"], style["font_size"]
+    bold, italic = style["bold"], style["italic"]
+    primary_color = hex_to_ass_color(style["font_color"])
+    outline_color = hex_to_ass_color(style["outline_color"])
+    outline_thickness, shadow_offset = style["outline_thickness"], style["shadow_offset"]
+    alignment, margin_v = style["alignment"], style["margin_v"]
+
+    # Build FFmpeg style string (minimal + fast)
+    return (
+        f"FontName={font_name},FontSize={font_size},Bold={bold},Italic={italic},"
+        f"PrimaryColour={primary_color},OutlineColour={outline_color},"
+        f"Outline={outline_thickness},Shadow={shadow_offset},"
+        f"Alignment={alignment},MarginV={margin_v}"
+    )
+
+def render_cache_key(video_sha: str, srt_sha: str, style_data: dict, profile: dict,
+                     window: tuple | None = None) -> str:
+    """
+    File name of an /overlay render in RENDERS. Segment count is left out: split
+    and single burns match. With `window` (start, end) it names a /segments piece.
+    """
+    key = {
+        "video": video_sha,
+        "srt": srt_sha,
+        "style": canonical_style(style_data),
+        "profile": {k: profile[k] for k in ("preset", "crf", "tune", "container")},
+        "encoder": select_video_encoder(),
+    }
+    if window is not None:
+        key["window"] = list(window)
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+    return f"{digest}.{'nut' if window is not None else profile['container']}"
+
+def build_burn_cmd(video_path: str, srt_path: str, output_path: str, style_data: dict, profile: dict) -> list:
+    srt_escaped = escape_path_for_ffmpeg(srt_path)
+    vf_filter = f"subtitles='{srt_escaped}':force_style='{build_style_string(style_data)}'"
+    return [
+        "ffmpeg",
+        "-y",
+        "-i", video_path,
+        "-vf", vf_filter,
+        *encoding_args(profile),
+        "-c:a", "copy",
+        output_path
+    ]
+
+def srt_cue_start(srt_path: str, cue_index: int) -> float | None:
+    """Start time (seconds) of the SRT cue numbered `cue_index`, or None if absent."""
+    cue = subtitles.read_srt(srt_path).find(cue_index)
+    return cue.start / 1000 if cue else None
+
+def build_ass_header(style_data: dict) -> str:
+    """[Script Info] and [V4+ Styles] of an ASS script with style_json as its Default style (same fields as force_style)."""
+    style = canonical_style(style_data)
+    primary_color = hex_to_ass_color(style["font_color"]).rstrip("&")
+    outline_color = hex_to_ass_color(style["outline_color"]).rstrip("&")
+    play_x, play_y = ASS_PLAY_RES
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {play_x}",
+        f"PlayResY: {play_y}",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{style['font']},{style['font_size']},{primary_color},{primary_color},{outline_color},"
+        f"&H00000000,{-style['bold']},{-style['italic']},0,0,100,100,0,0,1,"
+        f"{style['outline_thickness']},{style['shadow_offset']},{style['alignment']},10,10,{style['margin_v']},1",
+    ]
+    return "\n".join(lines) + "\n"
+
+def build_mux_cmd(video_path: str, tracks: list, output_path: str, container: str) -> list:
+    """
+    Stream-copy video and audio and add one subtitle stream per (ass_path,
+    language) in `tracks`; the first track is marked default.
+    """
+    cmd = ["ffmpeg", "-y", "-i", video_path]
+    for ass_path, _ in tracks:
+        cmd += ["-i", ass_path]
+    cmd += ["-map", "0:v", "-map", "0:a?"]
+    for n in range(len(tracks)):
+        cmd += ["-map", f"{n + 1}:0"]
+    cmd += ["-c:v", "copy", "-c:a", "copy", "-c:s", SOFT_SUBTITLE_CODECS[container]]
+    for n, (_, language) in enumerate(tracks):
+        if language:
+            cmd += [f"-metadata:s:s:{n}", f"language={ISO639_2.get(language.lower(), language)}",
+                    f"-metadata:s:s:{n}", f"title={language}"]
+        cmd += [f"-disposition:s:{n}", "default" if n == 0 else "0"]
+    if container == "mp4":
+        cmd += ["-movflags", "+faststart"]
+    return cmd + [output_path]
+
+async def soft_mux(video_path: str, tracks: list, output_path: str, style_data: dict, container: str,
+                   request: Request | None = None) -> None:
+    """
+    Write each (srt_path, language) in `tracks` as a styled ASS file and mux
+    them all into `output_path` in one stream-copy pass. No re-encode, so this
+    does not take an encode slot.
+    """
+    ass_tracks = []
+    for srt_path, language in tracks:
+        ass_path = os.path.splitext(srt_path)[0] + ".ass"
+        with subtitles.open_text(srt_path) as f:
+            subtitles.write_ass(subtitles.iter_srt(f), ass_path, build_ass_header(style_data))
+        ass_tracks.append((ass_path, language))
+    outcome = "error"
+    try:
+        await run_ffmpeg(build_mux_cmd(video_path, ass_tracks, output_path, container), request)
+        outcome = "ok"
+    except ClientDisconnected:
+        outcome = "disconnected"
+        raise
+    finally:
+        ENCODES_TOTAL.inc(kind="mux", outcome=outcome)
+
+def probe_duration(video_path: str) -> float:
+    """Container duration in seconds, read from FFmpeg's input banner (no ffprobe needed)."""
+    out = subprocess.run(["ffmpeg", "-hide_banner", "-i", video_path], capture_output=True, text=True).stderr
+    m = re.search(r"Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)", out)
+    if not m:
+        raise ValueError("Could not read video duration")
+    h, mnt, sec = m.groups()
+    return int(h) * 3600 + int(mnt) * 60 + float(sec)
+
+def requested_segments(requested: int | None) -> int:
+    if requested is not None:
+        return requested
+    if BURN_SEGMENTS == "auto":
+        return os.cpu_count() or 1
+    return int(BURN_SEGMENTS or 0)
+
+async def keyframe_times(video_path: str, request: Request | None = None) -> list:
+    """Presentation times (seconds) of the video keyframes, read from the packets without decoding."""
+    out = (await run_ffmpeg(["ffmpeg", "-hide_banner", "-i", video_path, "-map", "0:v:0", "-c", "copy",
+                             "-f", "framecrc", "-"], request, capture_stdout=True)).decode()
+    tb = re.search(r"^#tb 0: (\d+)/(\d+)", out, re.M)
+    num, den = (int(tb.group(1)), int(tb.group(2))) if tb else (1, 1000)
+    times = []
+    for line in out.splitlines():
+        if line.startswith("#"):
+            continue
+        fields = [f.strip() for f in line.split(",")]
+        flags = next((int(f[2:], 16) for f in fields[6:] if f.startswith("F=")), 1)  # omitted = keyframe
+        if len(fields) >= 6 and flags & 1:
+            times.append(int(fields[2]) * num / den)
+    return sorted(times)
+
+def plan_segments(keyframes: list, segments: int, duration: float) -> list:
+    """
+    ~Equal [(start, end)] pieces cut on the first keyframe at or after each
+    equal split point; the last piece has end=None (runs to the end of the input).
+    """
+    cuts = [0.0]
+    for k in range(1, segments):
+        target = duration * k / segments
+        cut = next((t for t in keyframes if t >= target and t > cuts[-1]), None)
+        if cut is None:
+            break
+        cuts.append(cut)
+    return list(zip(cuts, cuts[1:] + [None]))
+
+def layout_preroll(cues, cut_ms: int) -> int:
+    """
+    Earliest start (ms) of the chain of overlapping cues still on screen at
+    cut_ms. libass fixes a cue's position the first time it is drawn, avoiding
+    whatever is on screen then, so a piece has to be rendered from there on to
+    stack its first cues the way a single-process burn does.
+    """
+    start = cut_ms
+    while True:
+        earlier = min((s for s, e in zip(cues.starts, cues.ends) if s < start < e), default=start)
+        if earlier == start or cut_ms - earlier > PARALLEL_MAX_PREROLL * 1000:
+            return start
+        start = earlier
+
+async def burn_segments_parallel(video_path: str, srt_path: str, output_path: str, style_data: dict,
+                                 profile: dict, segments: int, duration: float,
+                                 request: Request | None = None, progress: EncodeProgress | None = None) -> None:
+    """
+    Segment-parallel version of build_burn_cmd: cut at keyframes, burn each
+    piece with its own slice of the SRT in concurrent FFmpeg processes, then join
+    the pieces with the concat demuxer and copy the source audio once. The
+    caller must hold `segments` encode slots; their cores are split between
+    the pieces.
+
+    Every piece is decoded straight from the source with input seeking and
+    rendered in source time (setpts shift around the subtitles filter), so
+    libass sees exactly the timestamps of a single-process burn. Pieces start a
+    little early when cues stack across the cut (see layout_preroll), and trim
+    drops the pre-roll frames again.
+    """
+    workdir = tempfile.mkdtemp(dir=os.path.dirname(output_path))
+    try:
+        await _burn_and_join(workdir, video_path, srt_path, output_path, style_data,
+                             profile, segments, duration, request, progress)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def build_piece_cmd(video_path: str, cues, piece_srt: str, output_path: str, style_data: dict, profile: dict,
+                    start: float, end: float | None, threads: int | None = None) -> list:
+    """
+    Burn [start, end) of the source (end=None: to the end) into a video-only
+    piece that the concat demuxer can join with its neighbours. `cues` are in
+    source time; the ones the piece needs are written to `piece_srt`.
+    """
+    start_ms = int(round(start * 1000))
+    # Seek to just before the first frame that must be drawn, and trim a hair
+    # early so frames sitting exactly on a cut are never lost to rounding.
+    seek = max(layout_preroll(cues, start_ms) / 1000 - 0.05, 0.0) if start > 0 else 0.0
+    end_ms = int(end * 1000) + 1 if end is not None else 1 << 62
+    subtitles.write_srt(cues.window(int(seek * 1000), end_ms), piece_srt)
+    trim = f"trim=start={start - 0.0005:.6f}" + (f":end={end - 0.0005:.6f}" if end is not None else "")
+    vf_filter = (
+        f"setpts=round(PTS+{seek:.6f}/TB),"
+        f"subtitles='{escape_path_for_ffmpeg(piece_srt)}':force_style='{build_style_string(style_data)}',"
+        f"{trim},setpts=PTS-STARTPTS"
+    )
+    limit = ["-t", f"{end - seek + 1:.6f}"] if end is not None else []
+    return ["ffmpeg", "-y", "-ss", f"{seek:.6f}", *limit, "-i", video_path,
+            "-map", "0:v:0", "-vf", vf_filter,
+            *encoding_args(profile, threads=threads, faststart=False), output_path]
+
+def build_join_cmd(pieces: list, concat_list: str, video_path: str, output_path: str, profile: dict) -> list:
+    """
+    Concatenate burned pieces [(path, start, end)] and copy the source audio
+    once. Writes the concat demuxer list to `concat_list`.
+    """
+    # Explicit durations: containers report piece length without the last frame's
+    # duration, which would make the concat demuxer overlap and drop a frame per cut.
+    with open(concat_list, "w") as f:
+        for path, start, end in pieces:
+            f.write(f"file '{path}'\n")
+            if end is not None:
+                f.write(f"duration {end - start:.6f}\n")
+    return [
+        "ffmpeg", "-y",
+        "-f", "concat", "-safe", "0", "-i", concat_list,
+        "-i", video_path,
+        "-map", "0:v:0", "-map", "1:a?",
+        "-c", "copy",
+        *(["-movflags", "+faststart"] if profile["container"] == "mp4" else []),
+        output_path
+    ]
+
+async def _burn_and_join(workdir, video_path, srt_path, output_path, style_data, profile,
+                         segments, duration, request, progress):
+    pieces = plan_segments(await keyframe_times(video_path, request), segments, duration)
+    cues = subtitles.read_srt(srt_path)
+    threads = max(1, segments * ENCODE_THREADS // len(pieces))
+
+    async def burn(i, start, end):
+        out = os.path.join(workdir, f"burned_{i:04d}.nut")
+        cmd = build_piece_cmd(video_path, cues, os.path.join(workdir, f"subs_{i:04d}.srt"), out,
+                              style_data, profile, start, end, threads)
+        await run_ffmpeg(cmd, request, progress=progress, part=i)
+        return out
+
+    tasks = [asyncio.ensure_future(burn(i, start, end)) for i, (start, end) in enumerate(pieces)]
+    try:
+        burned = await asyncio.gather(*tasks)
+    except BaseException:
+        # One piece failed (or the client left): stop the others instead of letting them run on
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    cmd = build_join_cmd([(path, start, end) for path, (start, end) in zip(burned, pieces)],
+                         os.path.join(workdir, "concat.txt"), video_path, output_path, profile)
+    await run_ffmpeg(cmd, request)
+
+def build_preview_cmd(video_path: str, srt_path: str, output_path: str, style_data: dict,
+                      start: float, duration: float, height: int, fps: int) -> list:
+    """
+    Render [start, start+duration) only. Input seeking resets timestamps to 0,
+    so PTS is shifted back to source time for the subtitles filter and then
+    restarted at 0 for the output clip.
+    """
+    srt_escaped = escape_path_for_ffmpeg(srt_path)
+    vf_filter = (
+        f"fps={fps},scale=-2:{height},setpts=round(PTS+{start:.3f}/TB),"
+        f"subtitles='{srt_escaped}':force_style='{build_style_string(style_data)}',"
+        f"setpts=PTS-STARTPTS"
+    )
+    return [
+        "ffmpeg",
+        "-y",
+        "-ss", f"{start:.3f}",
+        "-t", f"{duration:.3f}",
+        "-i", video_path,
+        "-vf", vf_filter,
+        "-an",
+        "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency", "-crf", "30",
+        "-pix_fmt", "yuv420p", "-threads", str(ENCODE_THREADS),
+        "-movflags", "+faststart",
+        output_path
+    ]
+
+def busy_response() -> JSONResponse:
+    return JSONResponse({"error": "Overlay busy, retry later", "max_concurrent": MAX_CONCURRENT_ENCODES,
+                         "queued": _encodes_waiting},
+                        status_code=503, headers={"Retry-After": str(BUSY_RETRY_AFTER)})
+
 @app.post("/overlay")
 async def burn_subtitles(
-    video: UploadFile = File(...),
+    request: Request,
+    video: UploadFile | None = File(None),    # the source video, or...
+    video_sha256: str | None = Form(None),    # ...the hash of one already PUT to /assets
     srt: UploadFile = File(...),
-    style_json: str = Form(...)
+    style_json: str = Form(...),
+    profile: str | None = Form(None),    # optional: encoding profile, overrides style_json["encoding_profile"]
+    segments: int | None = Form(None),   # optional: parallel segment count (default BURN_SEGMENTS; <=1 = single process)
+    encode_id: str | None = Form(None),  # optional: id to follow the encode under GET /encodes/{encode_id}
+    mode: str = Form("burn"),            # "burn" re-encodes with the subtitles drawn in, "soft" muxes a text track
+    language: str | None = Form(None)    # optional: language tag for the soft subtitle track
 ):
+    asset = tmpdir = None
     try:
         style_data = json.loads(style_json)
+        try:
+            encoding = resolve_profile(profile or style_data.get("encoding_profile"))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=422)
 
-        # Font & Text Style
-        font_name = style_data.get("font", "Arial")
-        font_size = style_data.get("font_size", 28)
-        bold = 1 if style_data.get("bold", False) else 0
-        italic = 1 if style_data.get("italic", False) else 0
+        tmpdir = tempfile.mkdtemp()
+        srt_path = os.path.join(tmpdir, srt.filename)
+        output_name = f"output_with_subs.{encoding['container']}"
+        output_path = os.path.join(tmpdir, output_name)
 
-        # Colors
-        primary_color = hex_to_ass_color(style_data.get("font_color", "#FFFFFF"))
-        outline_color = hex_to_ass_color(style_data.get("outline_color", "#000000"))
+        video_path, asset = await asyncio.to_thread(resolve_video, video, video_sha256, tmpdir)
+        srt_sha = await asyncio.to_thread(save_hashed, srt, srt_path)
+        media_type = CONTAINER_MEDIA_TYPES[encoding["container"]]
 
-        # Outline & Shadow
-        outline_thickness = style_data.get("outline_thickness", 2)  # Keep small for speed
-        shadow_offset = style_data.get("shadow_offset", 0)  # Keep small for speed
+        if mode == "soft":
+            await soft_mux(video_path, [(srt_path, language)], output_path, style_data, encoding["container"], request)
+            return FileResponse(output_path, filename=output_name, media_type=media_type,
+                                headers={"X-Subtitle-Mode": "soft"},
+                                background=BackgroundTask(shutil.rmtree, tmpdir, ignore_errors=True))
+        if mode != "burn":
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            return JSONResponse({"error": f"Unknown mode '{mode}' (choose from burn, soft)"}, status_code=422)
 
-        # Position & Margins
-        alignment = style_data.get("alignment", 2)  # 1=bottom-left, 2=bottom-center, 3=bottom-right, etc.
-        margin_v = style_data.get("margin_v", 30)  # vertical offset
+        render_key = render_cache_key(asset, srt_sha, style_data, encoding)
+        cached = pin_render(render_key)
+        if cached:
+            RENDER_REQUESTS.inc(cache="hit")
+            cleanup = BackgroundTasks()
+            cleanup.add_task(RENDERS.unpin, render_key)
+            cleanup.add_task(shutil.rmtree, tmpdir, ignore_errors=True)
+            return FileResponse(cached, filename=output_name, media_type=media_type,
+                                headers={"X-Render-Cache": "hit", "X-Render-Key": render_key}, background=cleanup)
+        RENDER_REQUESTS.inc(cache="miss")
+
+        # Probed before queueing: a segment-parallel burn waits for one slot per piece
+        try:
+            duration = await asyncio.to_thread(probe_duration, video_path)
+        except ValueError:
+            duration = 0.0  # unknown: no ETA and no segment split
+        n_segments = min(requested_segments(segments), MAX_CONCURRENT_ENCODES)
+        parallel = n_segments > 1 and duration >= PARALLEL_MIN_DURATION
+
+        async with tracked_encode("overlay", request, encode_id, duration,
+                                  slots=n_segments if parallel else 1) as progress:
+            if parallel:
+                await burn_segments_parallel(video_path, srt_path, output_path, style_data, encoding,
+                                             n_segments, duration, request, progress)
+            else:
+                cmd = build_burn_cmd(video_path, srt_path, output_path, style_data, encoding)
+                await run_ffmpeg(cmd, request, progress=progress)
+
+        headers = {**progress.headers(), "X-Render-Cache": "miss"}
+        if RENDERS.enabled:
+            await asyncio.to_thread(RENDERS.add_copy, output_path, render_key)
+            headers["X-Render-Key"] = render_key
+        return FileResponse(output_path, filename=output_name, media_type=media_type, headers=headers,
+                            background=BackgroundTask(shutil.rmtree, tmpdir, ignore_errors=True))
+
+    except AssetMissing as e:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return asset_missing_response(str(e))
+    except OverlayBusy:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return busy_response()
+    except ClientDisconnected:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        print("[warn] overlay client disconnected, encode cancelled")
+        return JSONResponse({"error": "Client disconnected"}, status_code=499)
+    except subprocess.CalledProcessError as e:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return JSONResponse({"error": ffmpeg_error(e)}, status_code=500)
+    except Exception as e:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        if asset:
+            ASSETS.unpin(asset)
+
+@app.post("/preview")
+async def preview_subtitles(
+    request: Request,
+    video: UploadFile | None = File(None),
+    video_sha256: str | None = Form(None),
+    srt: UploadFile = File(...),
+    style_json: str = Form(...),
+    start: float = Form(0.0),            # window start (seconds)
+    duration: float = Form(PREVIEW_DEFAULT_DURATION),
+    cue: int | None = Form(None),        # optional: SRT cue number to centre on (overrides start)
+    height: int = Form(PREVIEW_HEIGHT),
+    fps: int = Form(PREVIEW_FPS),
+    encode_id: str | None = Form(None)
+):
+    """Fast low-resolution render of a short window, for trying styles without a full encode."""
+    asset = tmpdir = None
+    try:
+        style_data = json.loads(style_json)
 
         tmpdir = tempfile.mkdtemp()
-        video_path = os.path.join(tmpdir, video.filename)
         srt_path = os.path.join(tmpdir, srt.filename)
-        output_path = os.path.join(tmpdir, "output_with_subs.mp4")
+        output_path = os.path.join(tmpdir, "preview.mp4")
 
-        with open(video_path, "wb") as f:
-            shutil.copyfileobj(video.file, f)
+        video_path, asset = await asyncio.to_thread(resolve_video, video, video_sha256, tmpdir)
         with open(srt_path, "wb") as f:
             shutil.copyfileobj(srt.file, f)
 
-        srt_escaped = escape_path_for_ffmpeg(srt_path)
+        if cue is not None:
+            cue_start = srt_cue_start(srt_path, cue)
+            if cue_start is None:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+                return JSONResponse({"error": f"Cue {cue} not found in SRT"}, status_code=422)
+            start = max(cue_start - PREVIEW_CUE_LEAD_IN, 0.0)
 
-        # Build FFmpeg style string (minimal + fast)
-        style_str = (
-            f"FontName={font_name},FontSize={font_size},Bold={bold},Italic={italic},"
-            f"PrimaryColour={primary_color},OutlineColour={outline_color},"
-            f"Outline={outline_thickness},Shadow={shadow_offset},"
-            f"Alignment={alignment},MarginV={margin_v}"
-        )
+        duration = min(max(duration, 0.1), PREVIEW_MAX_DURATION)
+        height = min(max(height, 90), PREVIEW_HEIGHT * 2)
+        fps = min(max(fps, 1), 30)
 
-        vf_filter = f"subtitles='{srt_escaped}':force_style='{style_str}'"
+        cmd = build_preview_cmd(video_path, srt_path, output_path, style_data,
+                                max(start, 0.0), duration, height, fps)
+        async with tracked_encode("preview", request, encode_id, duration) as progress:
+            await run_ffmpeg(cmd, request, progress=progress)
 
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-i", video_path,
-            "-vf", vf_filter,
-            "-c:a", "copy",
-            output_path
-        ]
+        return FileResponse(output_path, filename="preview.mp4", media_type="video/mp4",
+                            headers=progress.headers(),
+                            background=BackgroundTask(shutil.rmtree, tmpdir, ignore_errors=True))
 
-        subprocess.run(cmd, check=True)
+    except AssetMissing as e:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return asset_missing_response(str(e))
+    except OverlayBusy:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return busy_response()
+    except ClientDisconnected:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return JSONResponse({"error": "Client disconnected"}, status_code=499)
+    except subprocess.CalledProcessError as e:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return JSONResponse({"error": ffmpeg_error(e)}, status_code=500)
+    except Exception as e:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        if asset:
+            ASSETS.unpin(asset)
+
+@app.post("/mux")
+async def mux_subtitles(
+    request: Request,
+    video: UploadFile | None = File(None),
+    video_sha256: str | None = Form(None),
+    srts: list[UploadFile] = File(...),  # one SRT per language, first one is the default track
+    languages: str = Form(""),           # comma-separated language tags, same order as srts
+    style_json: str = Form("{}"),
+    container: str = Form("mkv")
+):
+    """Soft subtitles for several languages at once: every SRT becomes a styled track, muxed in one copy pass."""
+    asset = tmpdir = None
+    try:
+        if container not in SOFT_SUBTITLE_CODECS:
+            return JSONResponse({"error": f"Unknown container '{container}' (choose from {', '.join(SOFT_SUBTITLE_CODECS)})"},
+                                status_code=422)
+        style_data = json.loads(style_json)
+        tags = [tag.strip() for tag in languages.split(",")] if languages else []
+        if len(tags) > len(srts):
+            return JSONResponse({"error": f"{len(tags)} languages given for {len(srts)} subtitle files"}, status_code=422)
+
+        tmpdir = tempfile.mkdtemp()
+        output_name = f"output_with_subs.{container}"
+        output_path = os.path.join(tmpdir, output_name)
+        video_path, asset = await asyncio.to_thread(resolve_video, video, video_sha256, tmpdir)
+
+        tracks = []
+        for n, srt in enumerate(srts):
+            srt_path = os.path.join(tmpdir, f"track{n}.srt")
+            with open(srt_path, "wb") as f:
+                shutil.copyfileobj(srt.file, f)
+            tracks.append((srt_path, tags[n] if n < len(tags) else None))
+
+        await soft_mux(video_path, tracks, output_path, style_data, container, request)
+        return FileResponse(output_path, filename=output_name, media_type=CONTAINER_MEDIA_TYPES[container],
+                            headers={"X-Subtitle-Mode": "soft", "X-Subtitle-Tracks": str(len(tracks))},
+                            background=BackgroundTask(shutil.rmtree, tmpdir, ignore_errors=True))
+
+    except AssetMissing as e:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return asset_missing_response(str(e))
+    except ClientDisconnected:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return JSONResponse({"error": "Client disconnected"}, status_code=499)
+    except subprocess.CalledProcessError as e:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return JSONResponse({"error": ffmpeg_error(e)}, status_code=500)
+    except Exception as e:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        if asset:
+            ASSETS.unpin(asset)
+
+@app.post("/segments")
+async def burn_segment(
+    request: Request,
+    video: UploadFile | None = File(None),
+    video_sha256: str | None = Form(None),
+    srt: UploadFile = File(...),         # cues for this window, in source time
+    style_json: str = Form(...),
+    start: float = Form(...),            # window start (seconds)
+    end: float | None = Form(None),      # window end (seconds); omitted for the last piece
+    profile: str | None = Form(None),
+    encode_id: str | None = Form(None)
+):
+    """
+    Burn one [start, end) piece of an /overlay render and keep it in RENDERS,
+    so a caller can render a video window by window as its subtitles become
+    available and /join the pieces at the end. Returns the piece's key.
+    """
+    if not RENDERS.enabled:
+        return JSONResponse({"error": "Segment renders need the render cache (RENDER_CACHE_MAX_BYTES > 0)"},
+                            status_code=404)
+    asset = tmpdir = None
+    try:
+        style_data = json.loads(style_json)
+        try:
+            encoding = resolve_profile(profile or style_data.get("encoding_profile"))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=422)
+        if start < 0 or (end is not None and end <= start):
+            return JSONResponse({"error": "Need 0 <= start < end"}, status_code=422)
+
+        tmpdir = tempfile.mkdtemp()
+        srt_path = os.path.join(tmpdir, "window.srt")
+        video_path, asset = await asyncio.to_thread(resolve_video, video, video_sha256, tmpdir)
+        srt_sha = await asyncio.to_thread(save_hashed, srt, srt_path)
+
+        key = render_cache_key(asset, srt_sha, style_data, encoding, window=(start, end))
+        result = {"key": key, "start": start, "end": end}
+        if RENDERS.lookup(key):
+            RENDER_REQUESTS.inc(cache="hit")
+            return JSONResponse({**result, "cache": "hit"}, headers={"X-Render-Cache": "hit"})
+        RENDER_REQUESTS.inc(cache="miss")
 
-        return FileResponse(output_path, filename="output_with_subs.mp4", media_type="video/mp4")
+        output_path = os.path.join(tmpdir, "piece.nut")
+        async with tracked_encode("segment", request, encode_id) as progress:
+            if end is not None:
+                progress.duration = end - start
+            cmd = build_piece_cmd(video_path, subtitles.read_srt(srt_path), os.path.join(tmpdir, "piece.srt"),
+                                  output_path, style_data, encoding, start, end)
+            await run_ffmpeg(cmd, request, progress=progress)
+        await asyncio.to_thread(RENDERS.add_copy, output_path, key)
+        return JSONResponse({**result, "cache": "miss"}, headers={**progress.headers(), "X-Render-Cache": "miss"})
 
+    except AssetMissing as e:
+        return asset_missing_response(str(e))
+    except OverlayBusy:
+        return busy_response()
+    except ClientDisconnected:
+        return JSONResponse({"error": "Client disconnected"}, status_code=499)
     except subprocess.CalledProcessError as e:
-        return JSONResponse({"error": f"FFmpeg failed: {e}"}, status_code=500)
+        return JSONResponse({"error": ffmpeg_error(e)}, status_code=500)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        if asset:
+            ASSETS.unpin(asset)
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+@app.post("/join")
+async def join_segments(
+    request: Request,
+    video: UploadFile | None = File(None),
+    video_sha256: str | None = Form(None),
+    segments_json: str = Form(...),      # [{"key", "start", "end"}] from /segments, in playback order
+    profile: str | None = Form(None)
+):
+    """Concatenate /segments pieces into the final video and add the source audio. Stream copy only."""
+    asset = None
+    keys = []
+    try:
+        try:
+            encoding = resolve_profile(profile)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=422)
+        segments = json.loads(segments_json)
+        if not segments:
+            return JSONResponse({"error": "No segments to join"}, status_code=422)
+
+        for seg in segments:
+            RENDERS.pin(seg["key"])
+            keys.append(seg["key"])
+        missing = [key for key in keys if not (RENDERS.valid(key) and RENDERS.lookup(key))]
+        if missing:
+            return JSONResponse({"error": "Unknown or evicted segments", "missing": missing}, status_code=404)
+
+        tmpdir = tempfile.mkdtemp()
+        output_name = f"output_with_subs.{encoding['container']}"
+        output_path = os.path.join(tmpdir, output_name)
+        video_path, asset = await asyncio.to_thread(resolve_video, video, video_sha256, tmpdir)
+
+        pieces = [(RENDERS.path(seg["key"]), float(seg["start"]), seg.get("end")) for seg in segments]
+        pieces = [(path, start, float(end) if end is not None else None) for path, start, end in pieces]
+        outcome = "error"
+        try:
+            await run_ffmpeg(build_join_cmd(pieces, os.path.join(tmpdir, "concat.txt"),
+                                            video_path, output_path, encoding), request)
+            outcome = "ok"
+        except ClientDisconnected:
+            outcome = "disconnected"
+            raise
+        finally:
+            ENCODES_TOTAL.inc(kind="join", outcome=outcome)
+        return FileResponse(output_path, filename=output_name, media_type=CONTAINER_MEDIA_TYPES[encoding["container"]],
+                            headers={"X-Joined-Segments": str(len(pieces))},
+                            background=BackgroundTask(shutil.rmtree, tmpdir, ignore_errors=True))
+
+    except AssetMissing as e:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return asset_missing_response(str(e))
+    except ClientDisconnected:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return JSONResponse({"error": "Client disconnected"}, status_code=499)
+    except subprocess.CalledProcessError as e:
+        return JSONResponse({"error": ffmpeg_error(e)}, status_code=500)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        for key in keys:
+            RENDERS.unpin(key)
+        if asset:
+            ASSETS.unpin(asset)
+
+@app.get("/renders/{render_key}")
+async def get_render(render_key: str):
+    """
+    A cached /overlay render by the X-Render-Key it was returned with.
+    Supports Range requests, so players can seek without fetching the whole file.
+    """
+    path = pin_render(render_key) if RENDERS.valid(render_key) else None
+    if path is None:
+        return JSONResponse({"error": "Unknown or evicted render"}, status_code=404)
+    container = render_key.rsplit(".", 1)[-1]
+    return FileResponse(path, filename=f"output_with_subs.{container}",
+                        media_type=CONTAINER_MEDIA_TYPES.get(container, "application/octet-stream"),
+                        background=BackgroundTask(RENDERS.unpin, render_key))
+
+@app.head("/assets/{sha256}")
+async def asset_exists(sha256: str):
+    """200 (with Content-Length) if the video is cached, else 404."""
+    try:
+        path = ASSETS.lookup(sha256)
+    except ValueError:
+        path = None
+    if path is None:
+        return Response(status_code=404)
+    return Response(status_code=200, headers={"Content-Length": str(os.path.getsize(path))})
+
+@app.put("/assets/{sha256}")
+async def asset_upload(sha256: str, request: Request):
+    """
+    Upload a source video (raw request body) under its sha256. The hash is
+    verified before the file becomes visible; 201 when stored, 200 if it
+    already was, 400 on a mismatch, 404 when the cache is disabled.
+    """
+    if not ASSETS.enabled:
+        return JSONResponse({"error": "Asset cache disabled"}, status_code=404)
+    try:
+        if ASSETS.lookup(sha256):
+            return JSONResponse({"ok": True, "sha256": sha256, "stored": False}, status_code=200)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    digest = hashlib.sha256()
+    fd, tmp_path = ASSETS.temp_file(ASSET_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in request.stream():
+                digest.update(chunk)
+                out.write(chunk)
+        if digest.hexdigest() != sha256:
+            os.remove(tmp_path)
+            return JSONResponse({"error": f"Body hashes to {digest.hexdigest()}, not {sha256}"}, status_code=400)
+        await asyncio.to_thread(ASSETS.add, tmp_path, sha256)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return JSONResponse({"ok": True, "sha256": sha256, "stored": True}, status_code=201)
+@app.get("/encodes")
+async def list_encodes():
+    """Queued and running encodes with live frames/fps/speed/ETA."""
+    return {"encodes": [p.snapshot() for p in ACTIVE_ENCODES.values()]}
+
+@app.get("/encodes/{encode_id}")
+async def encode_status(encode_id: str):
+    progress = ACTIVE_ENCODES.get(encode_id)
+    if progress is None:
+        return JSONResponse({"error": "Unknown or finished encode"}, status_code=404)
+    return progress.snapshot()
+
+@app.get("/metrics")
+async def metrics():
+    lines = [
+        *gauge("overlay_encodes_active", "Encodes holding a slot", _encodes_active),
+        *gauge("overlay_encodes_waiting", "Encodes waiting for a slot", _encodes_waiting),
+        *gauge("overlay_max_concurrent_encodes", "Encode slots", MAX_CONCURRENT_ENCODES),
+        *ENCODES_TOTAL.render(),
+        *ENCODE_SECONDS.render(),
+        *QUEUE_WAIT_SECONDS.render(),
+        *ENCODED_FRAMES.render(),
+        *ENCODED_MEDIA_SECONDS.render(),
+        *gauge("overlay_asset_cache_bytes", "Bytes held by the asset cache", ASSETS.stats()["bytes"]),
+        *gauge("overlay_asset_cache_hits_total", "video_sha256/HEAD lookups that found the asset", ASSETS.hits, "counter"),
+        *gauge("overlay_asset_cache_misses_total", "video_sha256/HEAD lookups that did not", ASSETS.misses, "counter"),
+        *gauge("overlay_asset_cache_evictions_total", "Assets evicted to stay under ASSET_CACHE_MAX_BYTES", ASSETS.evicted, "counter"),
+        *RENDER_REQUESTS.render(),
+        *gauge("overlay_render_cache_bytes", "Bytes held by the render cache", RENDERS.stats()["bytes"]),
+        *gauge("overlay_render_cache_evictions_total", "Renders evicted to stay under RENDER_CACHE_MAX_BYTES", RENDERS.evicted, "counter"),
+    ]
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@app.get("/healthz")
+async def healthz():
+    return {"ok": True, "encodes_active": _encodes_active,
+            "encodes_waiting": _encodes_waiting, "max_concurrent_encodes": MAX_CONCURRENT_ENCODES,
+            "max_queued_encodes": MAX_QUEUED_ENCODES, "assets": ASSETS.stats(), "renders": RENDERS.stats()}
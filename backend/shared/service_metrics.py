@@ -0,0 +1,62 @@
+# service_metrics.py
+"""
+Prometheus text exposition for the services' GET /metrics (no client library
+needed): labelled counters and histograms, plus single gauge samples read
+from existing state. Counters and histograms are updated from worker
+threads (model calls, to_thread file work), hence the locks.
+"""
+import threading
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def _labels(key: tuple) -> str:
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}" if key else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name, self.help, self.values = name, help_text, {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter",
+                    *(f"{self.name}{_labels(k)} {v}" for k, v in self.values.items())]
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.buckets, self.series = name, help_text, buckets, {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            s = self.series.setdefault(key, {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    s["buckets"][i] += 1
+            s["count"] += 1
+            s["sum"] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, s in self.series.items():
+                for bound, n in zip(self.buckets, s["buckets"]):
+                    lines.append(f"{self.name}_bucket{_labels(key + (('le', bound),))} {n}")
+                lines.append(f"{self.name}_bucket{_labels(key + (('le', '+Inf'),))} {s['count']}")
+                lines.append(f"{self.name}_sum{_labels(key)} {round(s['sum'], 6)}")
+                lines.append(f"{self.name}_count{_labels(key)} {s['count']}")
+        return lines
+
+
+def gauge(name: str, help_text: str, value: float, kind: str = "gauge") -> list:
+    """A single unlabelled sample read from existing state (kind="counter" for running totals)."""
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
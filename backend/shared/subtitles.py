@@ -0,0 +1,291 @@
+# subtitles.py
+"""
+Subtitle cues shared by the overlay and translation services: a streaming SRT
+parser, a compact cue list with integer millisecond times, and buffered SRT,
+WebVTT and ASS writers.
+
+A small package of its own (backend/shared) that the overlay, translation
+and orchestrator services all install, so none of them imports another's
+source tree.
+"""
+import io
+import re
+from array import array
+
+WRITE_BUFFER = 1 << 16   # bytes buffered by the writers before hitting the file
+WRITE_BATCH = 512        # cues formatted per writelines() call
+READ_CHUNK = 1 << 16     # characters read per step by the parser
+
+_time = r"(?:(\d+):)?(\d{1,2}):(\d{1,2})[,.](\d{1,3})"
+_time_re = re.compile(_time)
+_timing_re = re.compile(_time + r"[^>]*-->\s*" + _time)
+_gap = re.compile(r"\n(?:[ \t]*\n)+")
+
+
+class Cue:
+    """One cue; times in ms. `index` is the SRT number (or position if the file had none)."""
+    __slots__ = ("index", "start", "end", "text")
+
+    def __init__(self, index: int, start: int, end: int, text: str):
+        self.index, self.start, self.end, self.text = index, start, end, text
+
+    def __repr__(self) -> str:
+        return f"Cue({self.index}, {self.start}, {self.end}, {self.text!r})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Cue) and (self.index, self.start, self.end, self.text) == \
+            (other.index, other.start, other.end, other.text)
+
+
+class CueList:
+    """
+    Cues in file order, stored column-wise: index/start/end in int arrays and
+    the texts in a list, so a long file costs a few bytes per cue plus its text.
+    Indexing and iteration hand out Cue objects on demand.
+    """
+    __slots__ = ("indices", "starts", "ends", "texts", "skipped")
+
+    def __init__(self, cues=()):
+        self.indices, self.starts, self.ends = array("q"), array("q"), array("q")
+        self.texts = []
+        self.skipped = 0  # malformed blocks the parser dropped
+        for cue in cues:
+            self.append(cue)
+
+    def append(self, cue: Cue) -> None:
+        self.indices.append(cue.index)
+        self.starts.append(cue.start)
+        self.ends.append(cue.end)
+        self.texts.append(cue.text)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return CueList(self[j] for j in range(*i.indices(len(self))))
+        return Cue(self.indices[i], self.starts[i], self.ends[i], self.texts[i])
+
+    def __iter__(self):
+        for i in range(len(self.texts)):
+            yield Cue(self.indices[i], self.starts[i], self.ends[i], self.texts[i])
+
+    def find(self, index: int) -> Cue | None:
+        """The cue numbered `index`, or None."""
+        try:
+            return self[self.indices.index(index)]
+        except ValueError:
+            return None
+
+    def window(self, start_ms: int, end_ms: int, shift: bool = False) -> "CueList":
+        """
+        Cues visible in [start_ms, end_ms) (cues crossing a boundary are kept),
+        re-timed relative to start_ms when shift=True.
+        """
+        offset = start_ms if shift else 0
+        out = CueList()
+        for i, (s, e) in enumerate(zip(self.starts, self.ends)):
+            if s < end_ms and e > start_ms:
+                out.append(Cue(self.indices[i], max(s - offset, 0), e - offset, self.texts[i]))
+        return out
+
+
+# ================== Parsing ==================
+def parse_time(value: str) -> int | None:
+    """'HH:MM:SS,mmm' (also '.', no hours, or fewer ms digits) → ms, or None."""
+    m = _time_re.search(value)
+    return _ms(*m.groups()) if m else None
+
+
+def _ms(h, mnt, sec, frac) -> int:
+    return ((int(h or 0) * 60 + int(mnt)) * 60 + int(sec)) * 1000 + int(frac.ljust(3, "0"))
+
+
+def _parse_block(lines: list, position: int):
+    """Cue from one block's lines, or an error message."""
+    for i, line in enumerate(lines[:2]):
+        if "-->" not in line:
+            continue
+        m = _timing_re.search(line)
+        if not m:
+            return "unreadable timing line"
+        g = m.groups()
+        start, end = _ms(*g[:4]), _ms(*g[4:])
+        head = lines[0].strip() if i == 1 else ""
+        index = int(head) if head.isdigit() else position
+        return Cue(index, start, max(end, start), "\n".join(lines[i + 1:]).strip())
+    return "no timing line"
+
+
+def _blocks(f):
+    """
+    (first line number, lines) of each blank-line separated block, read
+    READ_CHUNK chars at a time. CRLF and lone CR line ends become LF first.
+    """
+    buf, line, first, cr = "", 1, True, ""
+    while True:
+        chunk = f.read(READ_CHUNK)
+        eof = not chunk
+        if first:
+            chunk, first = chunk.lstrip("\ufeff"), False
+        chunk, cr = cr + chunk, ""
+        if chunk.endswith("\r") and not eof:
+            chunk, cr = chunk[:-1], "\r"  # its LF may open the next chunk
+        buf += chunk.replace("\r\n", "\n").replace("\r", "\n")
+        pos = 0
+        for m in _gap.finditer(buf) if not eof else ():
+            if m.end() == len(buf):
+                break  # more blank lines may follow in the next chunk
+            yield from _block(buf[pos:m.start()], line)
+            line += buf.count("\n", pos, m.end())
+            pos = m.end()
+        if eof:
+            yield from _block(buf, line)
+            return
+        buf = buf[pos:]
+
+
+def _block(text: str, line: int):
+    """
+    The cues of one block. A block normally holds one cue, but when the blank
+    line between two cues is missing a later timing line starts a new one
+    (taking the line before it as its index if that is a number).
+    """
+    lines = text.split("\n")
+    while lines and not lines[0].strip():
+        lines.pop(0)
+        line += 1
+    while lines and not lines[-1].strip():
+        lines.pop()
+    cuts, timed = [0], False
+    for i, ln in enumerate(lines):
+        if "-->" in ln and _timing_re.search(ln):
+            if timed:
+                cuts.append(i - 1 if i - 1 > cuts[-1] and lines[i - 1].strip().isdigit() else i)
+            timed = True
+    if lines:
+        for a, b in zip(cuts, cuts[1:] + [len(lines)]):
+            yield line + a, lines[a:b]
+
+
+def iter_srt(f, on_error=None):
+    """
+    Yield Cues from an SRT text stream one block at a time (memory does not
+    grow with the file). Handles a BOM, CRLF/CR line ends, missing or
+    non-numeric indices, runs of blank lines and cues run together without
+    a blank line between them; blocks without a readable timing line are
+    skipped and reported as on_error(line_number, message).
+    """
+    for position, (line, lines) in enumerate(_blocks(f), 1):
+        cue = _parse_block(lines, position)
+        if isinstance(cue, Cue):
+            yield cue
+        elif on_error:
+            on_error(line, cue)
+
+
+def open_text(path: str):
+    """Text reader for subtitle files: UTF-8 with optional BOM, undecodable bytes replaced."""
+    return open(path, "r", encoding="utf-8-sig", errors="replace", newline=None)
+
+
+def read_srt(path: str, on_error=None) -> CueList:
+    """Whole SRT file as a CueList; `skipped` counts the malformed blocks."""
+    cues = CueList()
+
+    def count(line, message):
+        cues.skipped += 1
+        if on_error:
+            on_error(line, message)
+
+    with open_text(path) as f:
+        for cue in iter_srt(f, count):
+            cues.append(cue)
+    return cues
+
+
+def parse_srt(text: str, on_error=None) -> CueList:
+    cues = CueList()
+
+    def count(line, message):
+        cues.skipped += 1
+        if on_error:
+            on_error(line, message)
+
+    for cue in iter_srt(io.StringIO(text), count):
+        cues.append(cue)
+    return cues
+
+
+# ================== Writing ==================
+def format_srt_time(ms: int) -> str:
+    h, rem = divmod(max(ms, 0), 3600000)
+    m, rem = divmod(rem, 60000)
+    sec, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{sec:02d},{ms:03d}"
+
+
+def format_vtt_time(ms: int) -> str:
+    return format_srt_time(ms).replace(",", ".")
+
+
+def format_ass_time(ms: int) -> str:
+    h, rem = divmod(max(ms, 0), 3600000)
+    m, rem = divmod(rem, 60000)
+    sec, ms = divmod(rem, 1000)
+    return f"{h:d}:{m:02d}:{sec:02d}.{ms // 10:02d}"
+
+
+_srt_tags = re.compile(r"<(/?)([biu])>|<[^>]*>", re.IGNORECASE)
+
+
+def srt_text_to_ass(text: str) -> str:
+    """SRT cue text as an ASS Dialogue text field: <b>/<i>/<u> become override tags, other tags are dropped."""
+    def tag(m):
+        if not m.group(2):
+            return ""
+        return "{\\%s%d}" % (m.group(2).lower(), 0 if m.group(1) else 1)
+    return _srt_tags.sub(tag, text).replace("\r", "").replace("\n", "\\N")
+
+
+def _write(cues, dest, head: str, fmt, renumber: bool) -> int:
+    """Format cues in batches and write them through one buffered text stream; returns the cue count."""
+    own = isinstance(dest, str)
+    f = open(dest, "w", encoding="utf-8", newline="\n", buffering=WRITE_BUFFER) if own else dest
+    count = 0
+    try:
+        if head:
+            f.write(head)
+        batch = []
+        for count, cue in enumerate(cues, 1):
+            batch.append(fmt(count if renumber else cue.index, cue))
+            if len(batch) >= WRITE_BATCH:
+                f.writelines(batch)
+                batch.clear()
+        f.writelines(batch)
+    finally:
+        if own:
+            f.close()
+    return count
+
+
+def write_srt(cues, dest, renumber: bool = True) -> int:
+    """Write cues (any iterable, e.g. iter_srt output) as SRT to a path or text stream."""
+    return _write(cues, dest, "", lambda n, c: f"{n}\n{format_srt_time(c.start)} --> {format_srt_time(c.end)}\n"
+                                               f"{c.text}\n\n", renumber)
+
+
+def write_vtt(cues, dest, renumber: bool = True) -> int:
+    return _write(cues, dest, "WEBVTT\n\n", lambda n, c: f"{n}\n{format_vtt_time(c.start)} --> "
+                                                         f"{format_vtt_time(c.end)}\n{c.text}\n\n", renumber)
+
+
+def write_ass(cues, dest, header: str, style: str = "Default") -> int:
+    """
+    Write an ASS script: `header` ([Script Info] and [V4+ Styles] sections)
+    followed by one Dialogue event per cue in `style`.
+    """
+    events = "[Events]\nFormat: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    return _write(cues, dest, header.rstrip("\n") + "\n\n" + events,
+                  lambda n, c: f"Dialogue: 0,{format_ass_time(c.start)},{format_ass_time(c.end)},{style},,0,0,0,,"
+                               f"{srt_text_to_ass(c.text)}\n", False)
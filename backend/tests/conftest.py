@@ -0,0 +1,37 @@
+# conftest.py
+"""
+The services are single-file apps in sibling directories (and share the
+subtitles package in shared/); put them on sys.path and point their config
+at throwaway locations before any import.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for name in ("shared", "translation", "overlay", "orchestrator"):
+    sys.path.insert(0, os.path.join(BACKEND, name))
+
+_scratch = tempfile.mkdtemp(prefix="backend_tests_")
+os.environ.update({
+    "TM_PATH": "",
+    "TRANSLATION_BACKEND": "deterministic",
+    "TRANSLATION_WARMUP": "false",
+    "JOB_STORE_PATH": os.path.join(_scratch, "jobs.sqlite3"),
+    "JOB_DIR": os.path.join(_scratch, "jobs"),
+    "CACHE_DIR": os.path.join(_scratch, "cache"),
+    "ASSET_DIR": os.path.join(_scratch, "assets"),
+    "RENDER_DIR": os.path.join(_scratch, "renders"),
+})
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def translation():
+    """translation module on a fresh deterministic model, without a TM."""
+    import translation
+    translation.use_backend("deterministic")
+    translation.TM = None
+    yield translation
+    translation.TM = None
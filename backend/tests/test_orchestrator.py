@@ -0,0 +1,260 @@
+# test_orchestrator.py
+"""Orchestrator job store, garbage collection, caches and overlay calls (upstreams stubbed)."""
+import asyncio
+import hashlib
+import os
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import orchestrator
+import overlay
+import subtitles
+
+
+def _file(path: str, size: int = 10, age: float = 0.0) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    if age:
+        os.utime(path, (time.time() - age, time.time() - age))
+    return path
+
+
+def _overlay_upstream(monkeypatch, transport) -> None:
+    """Send the orchestrator's overlay calls through `transport`; retries do not sleep."""
+    async def no_sleep(attempt):
+        pass
+    monkeypatch.setitem(orchestrator.HTTP_CLIENTS, "overlay", httpx.AsyncClient(transport=transport))
+    monkeypatch.setattr(orchestrator, "_sleep_backoff", no_sleep)
+
+
+def _done_job(monkeypatch, renders=None) -> str:
+    """A finished job in a fresh store, with a source video and a translated SRT."""
+    store = orchestrator.MemoryJobStore(10, 0)
+    monkeypatch.setattr(orchestrator, "JOB_STORE", store)
+    now = time.time()
+    store.put("j1", {"status": "done", "stage": "done", "progress": 1.0, "target_lang": "fr", "timings": {},
+                     "created_at": now, "queued_at": now, "renders": renders or {},
+                     "video": _file(os.path.join(orchestrator.JOB_DIR, "j1_video.mp4")),
+                     "srt": _file(os.path.join(orchestrator.JOB_DIR, "j1_fr.srt"))})
+    return "j1"
+
+
+async def _send(response) -> tuple:
+    """Run an ASGI response on its own: (status, body)."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+    await response({"type": "http", "method": "GET", "headers": [], "asgi": {"spec_version": "2.4"}}, receive, send)
+    return messages[0]["status"], b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def test_backends_must_implement_the_interfaces():
+    class Partial(orchestrator.JobStore):
+        def _load(self, job_id, touch):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial(10, 0)
+    with pytest.raises(TypeError):
+        orchestrator.JobQueue(lambda job_id: None, 1)
+
+
+def test_gc_keeps_scratch_files_of_running_jobs(monkeypatch):
+    store = orchestrator.MemoryJobStore(10, 0)
+    monkeypatch.setattr(orchestrator, "JOB_STORE", store)
+    monkeypatch.setattr(orchestrator, "ORPHAN_FILE_GRACE", 60)
+    crash_leftover = _file(os.path.join(orchestrator.JOB_DIR, "leftover.srt"), age=7200)
+    scratch = _file(os.path.join(orchestrator.JOB_DIR, "transcript_copy.srt"), age=3000)
+    store.put("j1", {"status": "running", "queued_at": time.time() - 3600, "timings": {}})
+
+    orchestrator.collect_garbage()
+    assert not os.path.exists(crash_leftover) and os.path.exists(scratch)
+
+    store.update("j1", status="done")
+    orchestrator.collect_garbage()
+    assert not os.path.exists(scratch)
+
+
+def test_cache_is_trimmed_by_age_then_size(monkeypatch, tmp_path):
+    monkeypatch.setattr(orchestrator, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(orchestrator, "CACHE_TTL", 3600)
+    monkeypatch.setattr(orchestrator, "CACHE_MAX_BYTES", 250)
+    _file(str(tmp_path / "stale" / "transcript.srt"), 100, age=7200)
+    _file(str(tmp_path / "old" / "transcript.srt"), 100, age=600)
+    _file(str(tmp_path / "mid" / "transcript.srt"), 100, age=300)
+    _file(str(tmp_path / "new" / "transcript.srt"), 100)
+
+    assert orchestrator._cache_get("old", "transcript.srt", ".srt")  # a hit refreshes its entry
+    assert orchestrator._evict_cache() == 2
+    assert sorted(os.listdir(tmp_path)) == ["new", "old"]
+
+
+def test_pipeline_windows_cut_in_gaps_and_keep_cue_numbers():
+    cues = subtitles.parse_srt("".join(f"{n}\n00:00:{2 * n:02d},000 --> 00:00:{2 * n + 1:02d},500\ncue {n}\n"
+                                       for n in range(1, 10)))  # no blank lines between cues
+    windows = orchestrator._plan_chunks(cues, 6)
+    assert windows == [(0, 3, 0.0, 7.75), (3, 6, 7.75, 13.75), (6, 9, 13.75, None)]
+    first, last = windows[1][:2]
+    assert [c.index for c in subtitles.parse_srt(orchestrator._srt_bytes(cues[first:last]).decode())] == [4, 5, 6]
+
+
+def test_overlay_asset_is_put_once_then_found(monkeypatch, tmp_path):
+    monkeypatch.setattr(overlay, "ASSETS", overlay.DiskCache(str(tmp_path / "assets"), 10 ** 6))
+    video = _file(str(tmp_path / "in.mp4"), 1000)
+    with open(video, "rb") as f:
+        sha = hashlib.sha256(f.read()).hexdigest()
+    outcomes = orchestrator.OVERLAY_ASSETS.values
+    before = {k: outcomes.get((("outcome", k),), 0) for k in ("uploaded", "hit", "unsupported")}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=overlay.app)) as client:
+            first = await orchestrator._ensure_overlay_asset(client, video, sha)
+            second = await orchestrator._ensure_overlay_asset(client, video, sha)
+            with pytest.raises(HTTPException):  # the body does not hash to the name
+                await orchestrator._ensure_overlay_asset(client, video, "0" * 64)
+            monkeypatch.setattr(overlay, "ASSETS", overlay.DiskCache(str(tmp_path / "off"), 0))
+            disabled = await orchestrator._ensure_overlay_asset(client, video, sha)
+            return first, second, disabled
+
+    assert asyncio.run(run()) == (True, True, False)
+    assert {k: outcomes.get((("outcome", k),), 0) - n for k, n in before.items()} == \
+        {"uploaded": 1, "hit": 1, "unsupported": 1}
+    assert sorted(os.listdir(tmp_path / "assets")) == [sha]
+
+
+def _segments_overlay(state: dict, requests: list) -> httpx.MockTransport:
+    """An overlay with an asset cache that may lose the video, and maybe no /segments route."""
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(f"{request.method} {request.url.path.split('/')[1]}")
+        if request.url.path.startswith("/assets/"):
+            if request.method == "PUT":
+                state["stored"] = True
+                return httpx.Response(201, json={"ok": True})
+            return httpx.Response(200 if state["stored"] else 404)
+        if not state["route"]:
+            return httpx.Response(404, json={"detail": "Not Found"})
+        if state.pop("evict", False):
+            state["stored"] = False
+            return httpx.Response(404, json={"error": "Unknown asset", "asset_missing": True})
+        return httpx.Response(200, json={"key": "k" * 64, "start": 0.0, "end": 5.0, "cache": "miss"})
+    return httpx.MockTransport(handle)
+
+
+def test_segment_404_reuploads_an_evicted_asset_but_falls_back_without_the_route(monkeypatch, tmp_path):
+    video, srt = _file(str(tmp_path / "in.mp4")), _file(str(tmp_path / "w.srt"))
+
+    def segment(state):
+        requests = []
+        _overlay_upstream(monkeypatch, _segments_overlay(state, requests))
+        try:
+            return asyncio.run(orchestrator.call_overlay_segment(video, srt, "{}", None, 0.0, 5.0, [], "a" * 64)), \
+                requests
+        except orchestrator.SegmentsUnsupported:
+            return None, requests
+
+    # Evicted between the HEAD and the render: PUT again and retry
+    result, requests = segment({"stored": True, "route": True, "evict": True})
+    assert result == {"key": "k" * 64, "start": 0.0, "end": 5.0}
+    assert requests == ["HEAD assets", "POST segments", "HEAD assets", "PUT assets", "POST segments"]
+
+    # An overlay without /segments: fall back at once
+    result, requests = segment({"stored": True, "route": False})
+    assert result is None and requests == ["HEAD assets", "POST segments"]
+
+
+def test_overlay_render_outlives_its_client_and_is_joined_in_flight(monkeypatch):
+    job_id = _done_job(monkeypatch)
+    monkeypatch.setattr(orchestrator, "STREAM_CHUNK_SIZE", 1000)
+    outcomes = orchestrator.RENDER_ARTIFACTS.values
+    before = {k: outcomes.get((("outcome", k),), 0) for k in ("rendered", "joined")}
+    upstream = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def body():
+            yield b"a" * 1000
+            await release.wait()
+            yield b"b" * 1000
+
+        def handle(request):
+            upstream.append(request.url.path)
+            return httpx.Response(200, headers={"Content-Type": "video/mp4", "Content-Length": "2000"},
+                                  content=body())
+        _overlay_upstream(monkeypatch, httpx.MockTransport(handle))
+
+        first = await orchestrator.overlay_endpoint(job_id=job_id, style_json="{}", profile=None, mode=None, lang=None)
+        assert first.headers["content-length"] == "2000"
+        assert await first.body_iterator.__anext__() == b"a" * 1000
+        await first.body_iterator.aclose()  # the client went away mid-render
+
+        second = await orchestrator.overlay_endpoint(job_id=job_id, style_json="{}", profile=None, mode=None,
+                                                     lang=None)
+        release.set()
+        return first.headers["x-render-key"], b"".join([chunk async for chunk in second.body_iterator])
+
+    key, received = asyncio.run(run())
+    assert received == b"a" * 1000 + b"b" * 1000 and upstream == ["/overlay"]
+    assert {k: outcomes.get((("outcome", k),), 0) - n for k, n in before.items()} == {"rendered": 1, "joined": 1}
+    with open(orchestrator.JOB_STORE.get(job_id)["renders"][key]["path"], "rb") as f:
+        assert f.read() == received
+
+
+def test_render_artifacts_answer_ranges_and_outlive_their_job_while_served(monkeypatch):
+    path = _file(os.path.join(orchestrator.JOB_DIR, "j1_render.mp4"))
+    with open(path, "wb") as f:
+        f.write(b"0123456789")
+    job_id = _done_job(monkeypatch, {"k1": {"path": path, "size": 10}})
+
+    async def get(headers):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=orchestrator.app),
+                                     base_url="http://test") as client:
+            return await client.get(f"/jobs/{job_id}/renders/k1", headers=headers)
+
+    partial = asyncio.run(get({"Range": "bytes=2-5"}))
+    assert partial.status_code == 206 and partial.content == b"2345"
+    stale = asyncio.run(get({"Range": "bytes=2-5", "If-Range": '"not-the-etag"'}))
+    assert stale.status_code == 200 and stale.content == b"0123456789"
+    resumed = asyncio.run(get({"Range": "bytes=8-", "If-Range": partial.headers["etag"]}))
+    assert resumed.status_code == 206 and resumed.content == b"89"
+
+    # Evicted between choosing the file and sending it
+    response = orchestrator._render_file_response(job_id, "k1", orchestrator.JOB_STORE.get(job_id)["renders"]["k1"])
+    orchestrator.JOB_STORE.delete(job_id)
+    monkeypatch.setattr(orchestrator, "ORPHAN_FILE_GRACE", -60)
+    orchestrator.collect_garbage()
+    assert os.path.exists(path)
+    assert asyncio.run(_send(response)) == (200, b"0123456789")
+    assert not os.path.exists(path) and not orchestrator._served_files
+
+
+def test_render_followers_fail_if_the_download_restarts_after_bytes_were_sent(tmp_path):
+    first, second = _file(str(tmp_path / "1.mp4")), _file(str(tmp_path / "2.mp4"))
+
+    async def run():
+        download = orchestrator.RenderDownload()
+        download.feed(first, b"x" * 10, None)
+        follower = orchestrator._follow_render(download)
+        assert await follower.__anext__() == b"x" * 10
+        download.feed(second, b"", None)  # a retry began a new file
+        with pytest.raises(RuntimeError, match="restarted after bytes were sent"):
+            await follower.__anext__()
+
+        retried_early = orchestrator.RenderDownload()
+        retried_early.feed(first, b"", None)
+        follower = orchestrator._follow_render(retried_early)
+        pending = asyncio.ensure_future(follower.__anext__())
+        await asyncio.sleep(0)
+        retried_early.feed(second, b"x" * 10, None)
+        retried_early.finish()
+        return await pending, [chunk async for chunk in follower]
+
+    assert asyncio.run(run()) == (b"x" * 10, [])
@@ -0,0 +1,286 @@
+# test_overlay.py
+"""Overlay encode admission and segment-parallel burns."""
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+import httpx
+import pytest
+
+import overlay
+import subtitles
+
+LOSSLESS = {"name": "lossless", "preset": "ultrafast", "crf": 0, "tune": None, "container": "mkv"}
+STYLE = {"font": "Arial", "font_size": 18, "font_color": "#ffffff", "outline_color": "#000000"}
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not on PATH")
+
+
+def test_plan_segments_cuts_on_the_next_keyframe():
+    keyframes = [0, 2, 4, 6, 8, 10, 12, 14, 16, 18]
+    assert overlay.plan_segments(keyframes, 3, 20.0) == [(0.0, 8), (8, 14), (14, None)]
+    # Fewer keyframes than split points: fewer, longer pieces
+    assert overlay.plan_segments([0, 15], 4, 20.0) == [(0.0, 15), (15, None)]
+    assert overlay.plan_segments(keyframes, 1, 20.0) == [(0.0, None)]
+
+
+def test_piece_cmd_rerenders_stacked_cues_before_the_cut(tmp_path):
+    cues = subtitles.parse_srt("1\n00:00:08,000 --> 00:00:12,000\nstays over the cut\n\n"
+                               "2\n00:00:10,500 --> 00:00:11,000\nstacked\n\n"
+                               "3\n00:00:30,000 --> 00:00:31,000\nlater piece\n")
+    piece_srt = str(tmp_path / "piece.srt")
+    cmd = overlay.build_piece_cmd("in.mp4", cues, piece_srt, "out.nut", STYLE, LOSSLESS, 10.0, 20.0, threads=3)
+
+    assert cmd[cmd.index("-ss") + 1] == "7.950000"        # from the start of the cue still on screen
+    assert cmd[cmd.index("-t") + 1] == "13.050000"        # up to one second past the end
+    assert "trim=start=9.999500:end=19.999500" in cmd[cmd.index("-vf") + 1]
+    assert cmd[cmd.index("-threads") + 1] == "3"
+    assert [c.index for c in subtitles.read_srt(piece_srt)] == [1, 2]
+
+    last = overlay.build_piece_cmd("in.mp4", cues, piece_srt, "out.nut", STYLE, LOSSLESS, 20.0, None)
+    assert "-t" not in last and ":end=" not in last[last.index("-vf") + 1]
+    assert [c.text for c in subtitles.read_srt(piece_srt)] == ["later piece"]
+
+
+def test_wide_requests_wait_their_turn_and_hold_every_slot():
+    async def run():
+        slots = overlay.EncodeSlots(4)
+        order = []
+
+        async def take(name, n, hold):
+            await slots.acquire(n)
+            order.append((name, slots.free))
+            await asyncio.sleep(hold)
+            slots.release(n)
+
+        first = asyncio.create_task(take("narrow", 1, 0.05))
+        await asyncio.sleep(0)
+        wide = asyncio.create_task(take("wide", 4, 0.05))
+        await asyncio.sleep(0)
+        late = asyncio.create_task(take("late", 1, 0))  # would fit now, but arrived after the wide one
+        await asyncio.gather(first, wide, late)
+        return order, slots.free
+
+    order, free = asyncio.run(run())
+    assert order == [("narrow", 3), ("wide", 0), ("late", 3)]
+    assert free == 4
+
+
+def test_cancelled_waiter_gives_its_place_back():
+    async def run():
+        slots = overlay.EncodeSlots(2)
+        await slots.acquire(2)
+        waiter = asyncio.create_task(slots.acquire(2))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        slots.release(2)
+        await asyncio.wait_for(slots.acquire(1), 1)
+        return slots.free
+
+    assert asyncio.run(run()) == 1
+
+
+def test_parallel_burn_holds_a_slot_per_piece(monkeypatch):
+    monkeypatch.setattr(overlay, "MAX_CONCURRENT_ENCODES", 4)
+    monkeypatch.setattr(overlay, "_encode_slots", overlay.EncodeSlots(4))
+
+    async def run():
+        async with overlay.encode_slot(None, slots=3):
+            busy = overlay._encode_slots.free
+            async with overlay.encode_slot(None, slots=1) as position:
+                assert position == 0
+            blocked = overlay._encode_slots.locked(2)
+        async with overlay.encode_slot(None, slots=16):  # capped at all of them
+            everything = overlay._encode_slots.free
+        return busy, blocked, everything, overlay._encode_slots.free
+
+    assert asyncio.run(run()) == (1, True, 0, 4)
+
+
+def test_slots_split_the_cores_between_encodes():
+    assert overlay.ENCODE_THREADS * overlay.MAX_CONCURRENT_ENCODES <= max(os.cpu_count() or 1,
+                                                                         overlay.MAX_CONCURRENT_ENCODES)
+    cmd = overlay.build_burn_cmd("in.mp4", "in.srt", "out.mp4", STYLE, LOSSLESS)
+    assert cmd[cmd.index("-threads") + 1] == str(overlay.ENCODE_THREADS)
+    preview = overlay.build_preview_cmd("in.mp4", "in.srt", "out.mp4", STYLE, 0.0, 4.0, 360, 12)
+    assert preview[preview.index("-threads") + 1] == str(overlay.ENCODE_THREADS)
+
+
+def _video(path: str, seconds: int = 12) -> str:
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", f"testsrc=size=160x120:rate=10:duration={seconds}",
+                    "-c:v", "libx264", "-g", "20", "-pix_fmt", "yuv420p", path], check=True)
+    return path
+
+
+def _post(path: str, files: list, data: dict) -> httpx.Response:
+    async def run():
+        transport = httpx.ASGITransport(app=overlay.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, files=files, data=data)
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def request_dirs(monkeypatch):
+    """Scratch dirs the handlers create; each must be gone once its response is sent."""
+    made, mkdtemp = [], tempfile.mkdtemp
+
+    def record(*args, **kwargs):
+        made.append(mkdtemp(*args, **kwargs))
+        return made[-1]
+    monkeypatch.setattr(overlay.tempfile, "mkdtemp", record)
+    return made
+
+
+def _framemd5(path: str) -> list:
+    out = subprocess.run(["ffmpeg", "-v", "error", "-i", path, "-map", "0:v:0", "-f", "framemd5", "-"],
+                         capture_output=True, text=True, check=True).stdout
+    return [line.rsplit(",", 1)[1].strip() for line in out.splitlines() if not line.startswith("#")]
+
+
+@needs_ffmpeg
+def test_parallel_burn_matches_single_process(tmp_path):
+    video = _video(str(tmp_path / "in.mp4"))
+    srt = str(tmp_path / "in.srt")
+    with open(srt, "w") as f:
+        f.write("1\n00:00:01,000 --> 00:00:05,000\nacross the first cut\n\n"
+                "2\n00:00:03,500 --> 00:00:04,500\nstacked\n\n"
+                "3\n00:00:07,000 --> 00:00:09,200\nacross the second cut\n")
+
+    single, parallel = str(tmp_path / "single.mkv"), str(tmp_path / "parallel.mkv")
+    subprocess.run(overlay.build_burn_cmd(video, srt, single, STYLE, LOSSLESS), capture_output=True, check=True)
+    asyncio.run(overlay.burn_segments_parallel(video, srt, parallel, STYLE, LOSSLESS, 3, 12.0))
+
+    expected = _framemd5(single)
+    assert len(expected) == 120
+    assert _framemd5(parallel) == expected
+
+
+def test_encodes_list_follows_the_queue_position(monkeypatch):
+    monkeypatch.setattr(overlay, "MAX_CONCURRENT_ENCODES", 1)
+    monkeypatch.setattr(overlay, "_encode_slots", overlay.EncodeSlots(1))
+
+    async def positions():
+        return {e["encode_id"]: (e["status"], e["queue_position"]) for e in (await overlay.list_encodes())["encodes"]}
+
+    async def run():
+        done = {name: asyncio.Event() for name in "abc"}
+        headers = {}
+
+        async def encode(name):
+            async with overlay.tracked_encode("overlay", None, name) as progress:
+                await done[name].wait()
+            headers[name] = progress.headers()["X-Queue-Position"]
+
+        tasks = []
+        for name in "abc":
+            tasks.append(asyncio.create_task(encode(name)))
+            await asyncio.sleep(0.01)
+        seen = [await positions()]
+        done["a"].set()
+        await asyncio.sleep(0.01)
+        seen.append(await positions())
+        done["b"].set()
+        done["c"].set()
+        await asyncio.gather(*tasks)
+        return seen, headers
+
+    seen, headers = asyncio.run(run())
+    assert seen[0] == {"a": ("running", 0), "b": ("queued", 1), "c": ("queued", 2)}
+    assert seen[1] == {"b": ("running", 0), "c": ("queued", 1)}
+    assert headers == {"a": "0", "b": "1", "c": "2"}
+
+
+def test_served_renders_stay_pinned_until_the_response_is_sent(monkeypatch, tmp_path):
+    renders = overlay.DiskCache(str(tmp_path / "renders"), 1)
+    monkeypatch.setattr(overlay, "RENDERS", renders)
+    key = "ab" * 32 + ".mp4"
+    with open(renders.path(key), "wb") as f:
+        f.write(b"rendered")
+
+    response = asyncio.run(overlay.get_render(key))
+    renders.evict()  # over max_bytes, but in use
+    assert os.path.exists(renders.path(key)) and renders.pins == {key: 1}
+
+    asyncio.run(response.background())
+    assert renders.pins == {}
+    renders.evict()
+    assert not os.path.exists(renders.path(key))
+    assert asyncio.run(overlay.get_render(key)).status_code == 404
+    assert renders.pins == {}
+
+
+@needs_ffmpeg
+def test_overlay_removes_its_scratch_dir_on_every_path(tmp_path, request_dirs):
+    with open(_video(str(tmp_path / "in.mp4"), 2), "rb") as f:
+        video = f.read()
+    srt = b"1\n00:00:00,500 --> 00:00:01,500\nHello\n"
+    data = {"style_json": json.dumps(STYLE), "profile": "fast-preview"}
+
+    def burn(video_bytes):
+        return _post("/overlay", [("video", ("in.mp4", video_bytes)), ("srt", ("in.srt", srt))], data)
+
+    miss, hit, broken = burn(video), burn(video), burn(b"not a video")
+    assert (miss.status_code, miss.headers["x-render-cache"]) == (200, "miss")
+    assert (hit.status_code, hit.headers["x-render-cache"], hit.content) == (200, "hit", miss.content)
+    assert broken.status_code == 500
+    assert len(request_dirs) == 3 and not any(os.path.exists(d) for d in request_dirs)
+
+
+@needs_ffmpeg
+def test_preview_removes_its_scratch_dir(tmp_path, request_dirs, monkeypatch):
+    monkeypatch.setattr(overlay, "ASSETS", overlay.DiskCache(str(tmp_path / "assets"), 0))  # video lands in tmpdir
+    with open(_video(str(tmp_path / "in.mp4"), 2), "rb") as f:
+        video = f.read()
+    srt = b"1\n00:00:00,500 --> 00:00:01,500\nHello\n"
+
+    def preview(video_bytes=video, **form):
+        return _post("/preview", [("video", ("in.mp4", video_bytes)), ("srt", ("in.srt", srt))],
+                     {"style_json": json.dumps(STYLE), "duration": "1", **form})
+
+    ok, unknown_cue, broken = preview(), preview(cue="7"), preview(b"not a video")
+    assert ok.status_code == 200 and ok.headers["content-type"] == "video/mp4"
+    assert unknown_cue.status_code == 422 and broken.status_code == 500
+    assert len(request_dirs) == 3 and not any(os.path.exists(d) for d in request_dirs)
+
+
+def _streams(path: str) -> list:
+    """'Stream #0:n(lang): Type: codec ... (default)' lines from FFmpeg's input banner."""
+    out = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True).stderr
+    return [line.strip() for line in out.splitlines() if line.strip().startswith("Stream #")]
+
+
+@needs_ffmpeg
+def test_soft_subtitles_are_muxed_as_tagged_tracks(tmp_path, request_dirs):
+    with open(_video(str(tmp_path / "in.mp4"), 2), "rb") as f:
+        video = f.read()
+    es = b"1\n00:00:00,500 --> 00:00:01,500\n<i>Hola</i>\nmundo\n"
+    ja = b"1\n00:00:00,500 --> 00:00:01,500\nkonnichiwa\n"
+
+    muxed = _post("/mux", [("video", ("in.mp4", video)), ("srts", ("es.srt", es)), ("srts", ("ja.srt", ja))],
+                  {"languages": "es,ja", "style_json": json.dumps(STYLE), "container": "mkv"})
+    assert muxed.status_code == 200 and muxed.headers["x-subtitle-tracks"] == "2"
+    mkv = str(tmp_path / "muxed.mkv")
+    with open(mkv, "wb") as f:
+        f.write(muxed.content)
+    subs = [s for s in _streams(mkv) if "Subtitle:" in s]
+    assert len(subs) == 2
+    assert "(spa)" in subs[0] and "Subtitle: ass" in subs[0] and "(default)" in subs[0]
+    assert "(jpn)" in subs[1] and "(default)" not in subs[1]
+    ass = subprocess.run(["ffmpeg", "-v", "error", "-i", mkv, "-map", "0:s:0", "-c:s", "copy", "-f", "ass", "-"],
+                         capture_output=True, text=True, check=True).stdout
+    assert "Style: Default,Arial,18," in ass
+    assert r"{\i1}Hola{\i0}\Nmundo" in ass
+
+    soft = _post("/overlay", [("video", ("in.mp4", video)), ("srt", ("in.srt", es))],
+                 {"style_json": json.dumps(STYLE), "mode": "soft", "language": "fr", "profile": "balanced"})
+    assert soft.status_code == 200 and soft.headers["x-subtitle-mode"] == "soft"
+    mp4 = str(tmp_path / "soft.mp4")
+    with open(mp4, "wb") as f:
+        f.write(soft.content)
+    assert any("(fre)" in s and "mov_text" in s for s in _streams(mp4))
+
+    assert len(request_dirs) == 2 and not any(os.path.exists(d) for d in request_dirs)
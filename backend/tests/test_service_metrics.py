@@ -0,0 +1,40 @@
+# test_service_metrics.py
+"""The /metrics helpers every service imports from the shared package."""
+import threading
+
+import service_metrics
+from service_metrics import Counter, Histogram, gauge
+
+
+def test_every_service_uses_the_shared_helpers():
+    import orchestrator
+    import overlay
+    import translation
+    for service in (orchestrator, overlay, translation):
+        assert (service.Counter, service.Histogram, service.gauge) == (Counter, Histogram, gauge)
+
+
+def test_updates_from_many_threads_are_not_lost():
+    hits, seconds = Counter("hits_total", "Hits"), Histogram("wait_seconds", "Wait", buckets=(1, 10))
+
+    def work():
+        for _ in range(2000):
+            hits.inc(kind="a")
+            seconds.observe(5, kind="a")
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert 'hits_total{kind="a"} 16000' in hits.render()
+    lines = seconds.render()
+    assert 'wait_seconds_bucket{kind="a",le="1"} 0' in lines
+    assert 'wait_seconds_bucket{kind="a",le="10"} 16000' in lines
+    assert 'wait_seconds_bucket{kind="a",le="+Inf"} 16000' in lines
+    assert 'wait_seconds_sum{kind="a"} 80000.0' in lines
+
+
+def test_gauge():
+    assert gauge("queued", "Queued jobs", 3) == ["# HELP queued Queued jobs", "# TYPE queued gauge", "queued 3"]
+    assert service_metrics.LATENCY_BUCKETS[-1] == 1800
@@ -0,0 +1,56 @@
+# test_subtitles.py
+"""Edge cases of the shared SRT parser."""
+import io
+
+import pytest
+
+import subtitles
+
+CUES = [(1, 1000, 2500, "Hello"), (2, 3000, 4000, "Two\nlines"), (3, 5000, 6000, "Bye")]
+SRT = ("1\n00:00:01,000 --> 00:00:02,500\nHello\n\n"
+       "2\n00:00:03,000 --> 00:00:04,000\nTwo\nlines\n\n"
+       "3\n00:00:05,000 --> 00:00:06,000\nBye\n")
+
+
+def _cues(text: str) -> list:
+    return [(c.index, c.start, c.end, c.text) for c in subtitles.parse_srt(text)]
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n", "\r"])
+def test_line_ends(newline):
+    assert _cues(SRT.replace("\n", newline)) == CUES
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 7, 64])
+def test_chunk_boundaries_do_not_matter(monkeypatch, chunk):
+    monkeypatch.setattr(subtitles, "READ_CHUNK", chunk)
+    for newline in ("\n", "\r\n", "\r"):
+        assert _cues("\ufeff" + SRT.replace("\n", newline) + newline * 3) == CUES
+
+
+def test_bom_and_runs_of_blank_lines():
+    assert _cues("\ufeff\n\n" + SRT.replace("\n\n", "\n \n\t\n\n")) == CUES
+
+
+def test_cues_without_a_blank_line_between_them_are_split():
+    merged = SRT.replace("Hello\n\n2", "Hello\n2").replace("lines\n\n3\n", "lines\n")
+    assert _cues(merged) == [CUES[0], CUES[1], (3, 5000, 6000, "Bye")]
+    # The line before a timing line is only taken as its index when it is a number
+    assert _cues("00:00:01,000 --> 00:00:02,000\nA\n00:00:03,000 --> 00:00:04,000\nB\n") == \
+        [(1, 1000, 2000, "A"), (2, 3000, 4000, "B")]
+
+
+def test_malformed_blocks_are_skipped_with_their_line_number():
+    errors = []
+    cues = subtitles.parse_srt("1\nno timing here\n\n" + SRT.replace("00:00:03,000 -->", "00:00:xx -->"),
+                               lambda line, message: errors.append((line, message)))
+    assert [c.index for c in cues] == [1, 3] and cues.skipped == 2
+    assert errors == [(1, "no timing line"), (8, "unreadable timing line")]
+
+
+def test_write_then_read_round_trips(tmp_path):
+    path = str(tmp_path / "out.srt")
+    subtitles.write_srt(subtitles.parse_srt(SRT), path)
+    with open(path) as f:
+        assert f.read() == SRT + "\n"
+    assert [(c.index, c.start, c.end, c.text) for c in subtitles.iter_srt(io.StringIO(SRT))] == CUES
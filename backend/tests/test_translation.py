@@ -0,0 +1,249 @@
+# test_translation.py
+"""Translation service logic against the deterministic model (no network, no key)."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from deterministic_model import DeterministicModel, deterministic_translate
+
+
+def _subs(texts):
+    return [{"index": i + 1, "start": i * 2000, "end": i * 2000 + 1500, "text": t} for i, t in enumerate(texts)]
+
+
+def test_batches_answer_their_own_cues(translation, monkeypatch):
+    monkeypatch.setattr(translation, "BATCH_SIZE", 4)
+    lines = {k: f"line {k}" for k in range(10, 31)}
+    report = {}
+    out = translation.translate_lines_batched(lines, "fr", report)
+    assert out == {k: deterministic_translate(v) for k, v in lines.items()}
+    assert report["batch_calls"] == 6 and report["line_fallbacks"] == 0
+
+
+def test_lines_missing_from_a_batch_fall_back_per_line(translation, monkeypatch):
+    monkeypatch.setattr(translation, "BATCH_SIZE", 5)
+    model = DeterministicModel(drop_every=2)
+    translation.use_backend("deterministic", model)
+    lines = {k: f"line {k}" for k in range(12)}
+    report = {}
+    out = translation.translate_lines_batched(lines, "fr", report)
+    assert out == {k: deterministic_translate(v) for k, v in lines.items()}
+    assert report["line_fallbacks"] == 5           # every 2nd line of batches of 5, 5, 2
+    assert model.calls == report["batch_calls"] + report["line_fallbacks"]
+
+
+def test_align_without_script_translates_every_cue_in_place(translation, monkeypatch):
+    monkeypatch.setattr(translation, "BATCH_SIZE", 3)
+    subs = _subs([f"cue {n}" for n in range(8)])
+    aligned = translation.align_translations_to_srt(subs, {2: "from scene"}, "fr")
+    assert [a["index"] for a in aligned] == [s["index"] for s in subs]
+    assert aligned[2]["translated_text"] == "from scene"
+    assert all(a["translated_text"] == deterministic_translate(s["text"])
+               for a, s in zip(aligned, subs) if s["index"] != 3)
+
+
+def test_echo_backend_returns_the_source(translation):
+    translation.use_backend("echo")
+    assert translation.translate_lines_batched({0: "hello", 1: "world"}, "fr") == {0: "hello", 1: "world"}
+
+
+SRT = b"1\n00:00:01,000 --> 00:00:02,000\nhello there\n"
+
+
+async def _post_translate(client):
+    return await client.post("/translate", files={"srt": ("in.srt", SRT, "text/plain")}, data={"target_lang": "fr"})
+
+
+def test_concurrent_requests_overlap(translation, monkeypatch):
+    translation.use_backend("deterministic", DeterministicModel(latency=0.3))
+    monkeypatch.setattr(translation, "_job_slots", asyncio.Semaphore(translation.MAX_ACTIVE_JOBS))
+
+    async def run():
+        transport = httpx.ASGITransport(app=translation.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            t0 = time.perf_counter()
+            responses = await asyncio.gather(*(_post_translate(client) for _ in range(4)))
+            return responses, time.perf_counter() - t0
+
+    responses, wall = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200] * 4
+    assert "«hello there»" in responses[0].text
+    assert wall < 4 * 0.3 * 0.75  # serialised would be >= 1.2 s
+
+
+def test_full_queue_is_rejected_with_retry_after(translation, monkeypatch):
+    translation.use_backend("deterministic", DeterministicModel(latency=0.3))
+    monkeypatch.setattr(translation, "MAX_QUEUED_JOBS", 0)
+
+    async def run():
+        monkeypatch.setattr(translation, "_job_slots", asyncio.Semaphore(1))
+        transport = httpx.ASGITransport(app=translation.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.create_task(_post_translate(client))
+            await asyncio.sleep(0.1)
+            second = await _post_translate(client)
+            return await first, second
+
+    first, second = asyncio.run(run())
+    assert first.status_code == 200
+    assert second.status_code == 503 and second.headers["retry-after"] == str(translation.BUSY_RETRY_AFTER)
+
+
+def test_tm_hits_and_misses_each_keep_their_own_translation(translation, monkeypatch, tmp_path):
+    tm = translation.TranslationMemory(str(tmp_path / "tm.sqlite3"), 1000, 0)
+    monkeypatch.setattr(translation, "TM", tm)
+    monkeypatch.setattr(translation, "BATCH_SIZE", 3)
+    tm.put_many([(f"line {k}", f"remembered {k}") for k in (1, 4, 5, 9)], "fr")
+
+    lines = {k: f"line {k}" for k in range(10)}
+    report = {}
+    out = translation.translate_lines_batched(lines, "fr", report)
+    assert out == {k: f"remembered {k}" if k in (1, 4, 5, 9) else deterministic_translate(f"line {k}")
+                   for k in lines}
+    assert report["tm_lines"] == 4
+    assert tm.get("line 7", "fr") == deterministic_translate("line 7")  # misses are stored
+
+
+def test_scene_answers_are_remembered_per_line(translation, monkeypatch, tmp_path):
+    monkeypatch.setattr(translation, "TM", translation.TranslationMemory(str(tmp_path / "tm.sqlite3"), 1000, 0))
+    model = DeterministicModel()
+    translation.use_backend("deterministic", model)
+    texts = ["Welcome back.", "Let's begin.", "See you next time."]
+    dialogue = [{"speaker": "Host", "text": t} for t in texts]
+    scene = translation.translate_scene(dialogue, "fr")
+    translation.align_translations_to_srt(_subs(texts), scene, "fr")
+    calls = model.calls
+
+    # Same lines in another cut, no script: all from the TM
+    report = {}
+    aligned = translation.align_translations_to_srt(_subs(texts[1:]), {}, "fr", report)
+    assert [a["translated_text"] for a in aligned] == [deterministic_translate(t) for t in texts[1:]]
+    assert report["tm_lines"] == 2 and model.calls == calls
+
+
+def test_cached_scene_window_only_answers_its_own_lines(translation, monkeypatch, tmp_path):
+    tm = translation.TranslationMemory(str(tmp_path / "tm.sqlite3"), 1000, 0)
+    monkeypatch.setattr(translation, "TM", tm)
+    dialogue = [{"speaker": "A", "text": f"line {k}"} for k in range(4)]
+    prompt = translation.generate_translation_prompt(dialogue, "fr", (1, 3), (0, 4))
+    # A remembered answer that also tagged the context lines
+    tm.put_scene(prompt.split("\n\n", 1)[-1], "fr", "[0] stray\n[1] un\n[2] deux\n[3] stray")
+
+    out, cached = translation._translate_scene_window(dialogue, "fr", (1, 3), (0, 4))
+    assert cached and out == {1: "un", 2: "deux"}
+    assert tm.export_entries() == [] and tm.stats()["entries"] == 0 and tm.stats()["scene_entries"] == 1
+
+
+def test_diff_cues_carries_unchanged_text_and_flags_the_rest(translation):
+    old = _subs(["one", "two", "three", "four"])
+    new = _subs(["one", "two  ", "2.5", "three!", "four"])
+    carried, changed = translation.diff_cues(old, new)
+    assert carried == {0: 0, 1: 1, 4: 3}
+    assert changed == [2, 3]
+
+
+def test_incremental_retranslates_long_runs_in_batches(translation, monkeypatch):
+    monkeypatch.setattr(translation, "BATCH_SIZE", 4)
+    model = DeterministicModel()
+    translation.use_backend("deterministic", model)
+    old = _subs([f"cue {n}" for n in range(20)])
+    old_translations = [f"old {n}" for n in range(20)]
+    new = _subs([f"cue {n}" if n < 5 or n >= 15 else f"edited {n}" for n in range(20)] + ["added"])
+    old_translations[17] = None  # never translated: redone on its own
+
+    report = {}
+    aligned = translation.retranslate_incremental(new, old, old_translations, "fr", report)
+    assert [a["translated_text"] for a in aligned] == (
+        [f"old {n}" for n in range(5)] + [deterministic_translate(f"edited {n}") for n in range(5, 15)]
+        + ["old 15", "old 16", deterministic_translate("cue 17"), "old 18", "old 19", deterministic_translate("added")])
+    assert [a["start"] for a in aligned] == [s["start"] for s in new]
+    assert report["changed_lines"] == 12 and report["carried_lines"] == 9
+    assert report["context_calls"] == 5 == model.calls    # 10 edited cues in 4 + 4 + 2, then [17], [20]
+    assert report["line_fallbacks"] == 0
+
+
+class _StubModel:
+    """Records prompts in call order; `gate` holds calls until set, `error` is raised instead of answering."""
+    def __init__(self, error=None):
+        self.prompts, self.error = [], error
+        self.gate, self.started = threading.Event(), threading.Event()
+        self.gate.set()
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        self.started.set()
+        self.gate.wait(5)
+        if self.error:
+            raise self.error
+
+        class Response:
+            text = f"answer to {prompt}"
+        return Response()
+
+
+def _scheduler(translation, max_in_flight=1):
+    """A scheduler of its own (no quota), so tests do not share the module's queue."""
+    return translation.ModelScheduler(ThreadPoolExecutor(max_workers=max_in_flight), max_in_flight, 0, 0)
+
+
+def test_scheduler_runs_scene_calls_before_queued_line_calls(translation):
+    model = _StubModel()
+    translation.use_backend("deterministic", model)
+    scheduler = _scheduler(translation)
+    model.gate.clear()
+    first = scheduler.submit("busy", "line")
+    assert model.started.wait(5)
+    queued = [scheduler.submit(p, lane) for p, lane in (("l1", "line"), ("b1", "batch"), ("l2", "line"),
+                                                         ("s1", "scene"))]
+    model.gate.set()
+    assert [f.result(5) for f in (first, *queued)] == [f"answer to {p}" for p in ("busy", "l1", "b1", "l2", "s1")]
+    assert model.prompts == ["busy", "s1", "b1", "l1", "l2"]
+
+
+def test_identical_prompts_in_flight_share_one_call(translation):
+    model = _StubModel()
+    translation.use_backend("deterministic", model)
+    scheduler = _scheduler(translation, max_in_flight=4)
+    model.gate.clear()
+    futures = [scheduler.submit("same prompt", "batch") for _ in range(3)]
+    assert model.started.wait(5)
+    model.gate.set()
+    assert {f.result(5) for f in futures} == {"answer to same prompt"}
+    assert len({id(f) for f in futures}) == 1 and model.prompts == ["same prompt"]
+    assert scheduler.submit("same prompt").result(5) and len(model.prompts) == 2  # finished calls are not reused
+
+
+def test_rate_limited_calls_are_retried_then_raise(translation, monkeypatch):
+    class ResourceExhausted(Exception):
+        code = 429
+
+    model = _StubModel(error=ResourceExhausted("quota"))
+    translation.use_backend("deterministic", model)
+    monkeypatch.setattr(translation, "MODEL_MAX_RETRIES", 2)
+    monkeypatch.setattr(translation, "MODEL_BACKOFF_BASE", 0.01)
+    with pytest.raises(ResourceExhausted):
+        _scheduler(translation).submit("limited", "line").result(5)
+    assert model.prompts == ["limited"] * 3
+
+    other = _StubModel(error=ValueError("bad prompt"))  # not a rate limit: no retry
+    translation.use_backend("deterministic", other)
+    with pytest.raises(ValueError):
+        _scheduler(translation).submit("broken").result(5)
+    assert other.prompts == ["broken"]
+
+
+def test_token_bucket(translation):
+    bucket = translation.TokenBucket(60, burst_seconds=2)   # 1 a second, up to 2 at once
+    assert bucket.wait_time(2) == 0.0
+    bucket.take(2)
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+    assert bucket.wait_time(50) == pytest.approx(2.0, abs=0.05)  # never asks for more than it can hold
+    bucket.stamp -= 0.5                                          # half a second later
+    assert bucket.wait_time(1) == pytest.approx(0.5, abs=0.05)
+    bucket.take(3)                                               # a call that used more than estimated
+    assert bucket.level < 0 and bucket.wait_time(1) == pytest.approx(3.5, abs=0.05)
+    assert translation.TokenBucket(0).wait_time(10 ** 6) == 0.0
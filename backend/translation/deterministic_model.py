@@ -0,0 +1,75 @@
+# deterministic_model.py
+"""
+Deterministic stand-in for gemini's GenerativeModel: the "deterministic"
+translation backend, for tests and benchmarks. Understands the prompts built
+in translation.py and answers them with a marked-up "translation" (text
+wrapped in «»), after an optional injected latency. No network, no key.
+"""
+import re
+import threading
+import time
+
+_tagged = re.compile(r'^\s*\[(\d+)\]\s*(.*)$')
+_original = re.compile(r'Original: "(.*)"')
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def deterministic_translate(text: str) -> str:
+    return f"«{text}»"
+
+
+class DeterministicModel:
+    def __init__(self, latency: float = 0.0, drop_every: int = 0, merge_every: int = 0):
+        self.latency = latency
+        self.drop_every = drop_every      # drop every Nth line of batch answers (exercise fallback)
+        self.merge_every = merge_every    # merge lines tagged with a multiple of N into the one before
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+        lines = prompt.split("\n")
+        tagged = [m for m in (_tagged.match(l) for l in lines) if m]
+        if tagged:
+            scene = "Scene lines:" in prompt
+            out = []
+            for n, m in enumerate(tagged, 1):
+                text = m.group(2).split(":", 1)[-1].strip() if scene else m.group(2)
+                if self.drop_every and n % self.drop_every == 0:
+                    continue
+                if self.merge_every and int(m.group(1)) % self.merge_every == 0 and out:
+                    out[-1] = out[-1][:-1] + f" {text}»"  # glued onto the previous line, tag lost
+                    continue
+                out.append(f"[{m.group(1)}] {deterministic_translate(text)}")
+            return _Response("\n".join(out))
+
+        m = _original.search(prompt)
+        if m:
+            return _Response(deterministic_translate(m.group(1)))
+
+        if "Options:" in prompt:
+            first = next(l for l in lines if l.startswith("- "))
+            return _Response(first[2:])
+
+        # Scene prompt: dialogue follows the first blank line after the instructions
+        body = prompt.strip().split("\n\n", 1)[-1]
+        out = []
+        for l in body.split("\n"):
+            if ":" in l:
+                speaker, text = l.split(":", 1)
+                out.append(f"{speaker}: {deterministic_translate(text.strip())}")
+        return _Response("\n".join(out))
+
+
+def install(translation_module, **kwargs) -> DeterministicModel:
+    """Select the deterministic backend in an imported translation module, built with these settings."""
+    model = DeterministicModel(**kwargs)
+    translation_module.use_backend("deterministic", model)
+    return model
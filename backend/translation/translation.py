@@ -1,26 +1,323 @@
 # translation.py
 from fastapi import FastAPI
 from fastapi import APIRouter, File, UploadFile, Form
-from fastapi.responses import FileResponse, JSONResponse
-import os, shutil, tempfile, re, json
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+import os, shutil, tempfile, re, json, asyncio, sqlite3, threading, time, heapq, itertools, random, difflib
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-# ================== Google AI (Gemini) Setup ==================
+import subtitles
+from service_metrics import Counter, Histogram, gauge
+
+# ================== Translation Backends ==================
 load_dotenv()
+# gemini (GOOGLE_API_KEY), deterministic (local, for tests/benchmarks) or echo
+# (returns the source text). Built on first use, or right after startup when
+# TRANSLATION_WARMUP is on; /readyz reports when it is usable.
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "gemini").strip().lower()
+TRANSLATION_WARMUP = os.getenv("TRANSLATION_WARMUP", "true").lower() in ("1", "true", "yes")
+BACKEND_RETRY_SECONDS = float(os.getenv("TRANSLATION_BACKEND_RETRY_SECONDS", "30"))  # after a failed init
 GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+DETERMINISTIC_LATENCY = float(os.getenv("DETERMINISTIC_MODEL_LATENCY", "0"))
+
+# Batched per-line fallback: cues packed per prompt, and batches in flight at once
+BATCH_SIZE = int(os.getenv("TRANSLATE_BATCH_SIZE", "40"))
+BATCH_CONCURRENCY = int(os.getenv("TRANSLATE_BATCH_CONCURRENCY", "4"))
+
+# Scene translation: script lines per prompt, untagged context lines shown
+# around each window, and windows in flight at once
+SCENE_WINDOW_LINES = int(os.getenv("SCENE_WINDOW_LINES", "60"))
+SCENE_CONTEXT_LINES = int(os.getenv("SCENE_CONTEXT_LINES", "8"))
+SCENE_CONCURRENCY = int(os.getenv("SCENE_CONCURRENCY", "4"))
+
+# Incremental re-translation: unchanged neighbours (with their translations)
+# shown on each side of a run of edited cues
+RETRANSLATE_CONTEXT_CUES = int(os.getenv("RETRANSLATE_CONTEXT_CUES", "3"))
+
+# Model calls run on a bounded thread pool (gemini's client is blocking), and
+# whole translation jobs run off the event loop behind an admission limit.
+MODEL_MAX_WORKERS = int(os.getenv("MODEL_MAX_WORKERS", "8"))
+MAX_ACTIVE_JOBS = int(os.getenv("TRANSLATE_MAX_ACTIVE_JOBS", "4"))
+MAX_QUEUED_JOBS = int(os.getenv("TRANSLATE_MAX_QUEUED_JOBS", "16"))
+BUSY_RETRY_AFTER = int(os.getenv("TRANSLATE_BUSY_RETRY_AFTER", "5"))
+
+# Provider quota: requests and estimated tokens per minute (0 = unlimited), and
+# how rate-limited (429/503) calls are retried: jittered exponential backoff.
+MODEL_RPM = float(os.getenv("MODEL_RPM", "0"))
+MODEL_TPM = float(os.getenv("MODEL_TPM", "0"))
+MODEL_BURST_SECONDS = float(os.getenv("MODEL_BURST_SECONDS", "60"))  # bucket size, in seconds of quota
+MODEL_MAX_RETRIES = int(os.getenv("MODEL_MAX_RETRIES", "5"))
+MODEL_BACKOFF_BASE = float(os.getenv("MODEL_BACKOFF_BASE", "1"))    # seconds
+MODEL_BACKOFF_MAX = float(os.getenv("MODEL_BACKOFF_MAX", "60"))     # seconds
 
-GOOGLE_AI_AVAILABLE = False
-model = None
-try:
+MODEL_EXECUTOR = ThreadPoolExecutor(max_workers=MODEL_MAX_WORKERS, thread_name_prefix="model")
+JOB_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_ACTIVE_JOBS, thread_name_prefix="translate-job")
+
+# Translation memory (SQLite). TM_PATH="" disables it; TM_TTL_SECONDS=0 never expires.
+TM_PATH = os.getenv("TM_PATH", "translation_memory.sqlite3")
+TM_MAX_ENTRIES = int(os.getenv("TM_MAX_ENTRIES", "200000"))
+TM_TTL_SECONDS = float(os.getenv("TM_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# ================== Metrics ==================
+# Prometheus text exposition for GET /metrics (shared service_metrics module).
+MODEL_CALLS = Counter("translate_model_calls_total", "Model calls by lane and outcome (ok/error/rate_limited)")
+MODEL_CALL_SECONDS = Histogram("translate_model_call_seconds", "Model call latency by lane, excluding queue wait")
+MODEL_QUEUE_WAIT_SECONDS = Histogram("translate_model_queue_wait_seconds", "Time a model call waited in the scheduler (rate limit, priority, free worker) by lane")
+MODEL_RETRIES = Counter("translate_model_retries_total", "Rate-limited model calls re-queued with backoff, by lane")
+MODEL_COALESCED = Counter("translate_model_coalesced_total", "Model calls answered by an identical prompt already in flight, by lane")
+JOBS_TOTAL = Counter("translate_jobs_total", "/translate requests by outcome (ok/error/rejected/unavailable)")
+JOB_SECONDS = Histogram("translate_job_seconds", "/translate processing time by stage (parse/scene/align/incremental/write/total)")
+JOB_QUEUE_WAIT_SECONDS = Histogram("translate_job_queue_wait_seconds", "Time a /translate request waited for a job slot")
+
+# ================== Backend Registry ==================
+# name → factory building a model with gemini's interface (generate_content(prompt)
+# → .text); None means echo. Factories import their own dependencies, so a
+# provider that is not selected costs nothing at startup.
+def _gemini_model():
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GOOGLE_API_KEY not set")
     import google.generativeai as genai
-    if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        GOOGLE_AI_AVAILABLE = True
-    else:
-        print("⚠️ GOOGLE_API_KEY not set — translation will use fallback (echo).")
-except Exception as e:
-    print(f"⚠️ google generative ai not available — fallback (echo). Details: {e}")
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+def _deterministic_model():
+    import deterministic_model
+    return deterministic_model.DeterministicModel(latency=DETERMINISTIC_LATENCY)
+
+BACKENDS = {"gemini": _gemini_model, "deterministic": _deterministic_model, "echo": None}
+
+class BackendUnavailable(RuntimeError):
+    """The selected backend could not be initialised."""
+
+class Backend:
+    """
+    The selected backend's model, built once on first get() (thread-safe).
+    A failed init raises BackendUnavailable, and is tried again on use after
+    BACKEND_RETRY_SECONDS; it never falls back to echo by itself.
+    """
+    def __init__(self, name: str, factory):
+        self.name, self.factory = name, factory
+        self.model = None
+        self.ready = factory is None  # echo has nothing to build
+        self.error = None
+        self.failed_at = 0.0
+        self.init_seconds = 0.0 if factory is None else None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The model (None for echo); raises BackendUnavailable."""
+        if self.ready:
+            return self.model
+        with self._lock:
+            if not self.ready and (self.error is None or time.monotonic() - self.failed_at >= BACKEND_RETRY_SECONDS):
+                t0 = time.perf_counter()
+                try:
+                    self.model = self.factory()
+                    self.ready, self.error = True, None
+                except Exception as e:
+                    self.error, self.failed_at = f"{type(e).__name__}: {e}", time.monotonic()
+                    print(f"⚠️ translation backend '{self.name}' unavailable: {self.error}")
+                self.init_seconds = round(time.perf_counter() - t0, 3)
+            if not self.ready:
+                raise BackendUnavailable(f"Translation backend '{self.name}' unavailable: {self.error}")
+            return self.model
+
+    def state(self) -> str:
+        if self.ready:
+            return "ready"
+        if self._lock.locked():
+            return "initialising"
+        return "failed" if self.error else "cold"
+
+    def stats(self) -> dict:
+        return {"name": self.name, "state": self.state(), "init_seconds": self.init_seconds, "error": self.error}
+
+def _new_backend(name: str, model=None) -> Backend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown TRANSLATION_BACKEND '{name}' (one of: {', '.join(BACKENDS)})")
+    return Backend(name, (lambda: model) if model is not None else BACKENDS[name])
+
+BACKEND = _new_backend(TRANSLATION_BACKEND)
+
+def use_backend(name: str, model=None) -> Backend:
+    """Switch backends at runtime (tests, benchmarks); `model` is used instead of building one."""
+    global BACKEND
+    BACKEND = _new_backend(name, model)
+    return BACKEND
+
+def echo_mode() -> bool:
+    """True with the echo backend (translations return the source text). Initialises the backend on first use."""
+    return BACKEND.get() is None
+
+def warm_up() -> None:
+    """Build the backend now instead of on the first request; a failure stays visible in /readyz."""
+    try:
+        BACKEND.get()
+    except BackendUnavailable:
+        pass
+
+# ================== Model Call Scheduler ==================
+# Priority lanes: lower goes first. Scene windows carry the most lines per
+# call, per-line fallbacks the fewest.
+LANES = {"scene": 0, "batch": 1, "line": 2}
+
+class TokenBucket:
+    """`per_minute` units a minute, bursting up to `burst_seconds` worth; <= 0 means unlimited. Not locked."""
+    def __init__(self, per_minute: float, burst_seconds: float = 60.0):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.stamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, amount: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        if self.rate > 0:
+            self._refill()
+            self.level -= amount  # may go negative when a call used more than estimated
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough token cost of a call: ~4 chars per token, prompt plus an answer of similar size."""
+    return max(1, len(prompt) // 4) * 2
+
+def is_rate_limited(e: Exception) -> bool:
+    """429/503-style errors from the provider (google.api_core ResourceExhausted etc.)."""
+    code = getattr(e, "code", None)
+    code = getattr(code, "value", code)
+    if code in (429, 503):
+        return True
+    return type(e).__name__ in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable") or "429" in str(e)
+
+class _Call:
+    __slots__ = ("prompt", "lane", "future", "tokens", "queued", "attempt")
+
+    def __init__(self, prompt: str, lane: str, future: Future):
+        self.prompt, self.lane, self.future = prompt, lane, future
+        self.tokens = estimate_tokens(prompt)
+        self.queued = time.perf_counter()
+        self.attempt = 0
+
+class ModelScheduler:
+    """
+    Every model call goes through here. Calls wait in one priority queue (see
+    LANES) until the request and token buckets allow them and a worker is
+    free, then run on `executor`. Identical prompts already queued or running
+    share one call. Rate-limited calls are re-queued after a jittered
+    exponential backoff, and the whole queue pauses for that long too so the
+    other calls do not hit the same quota.
+    """
+    def __init__(self, executor: ThreadPoolExecutor, max_in_flight: int, rpm: float, tpm: float,
+                 burst_seconds: float = 60.0):
+        self.executor, self.max_in_flight = executor, max(1, max_in_flight)
+        self.requests, self.tokens = TokenBucket(rpm, burst_seconds), TokenBucket(tpm, burst_seconds)
+        self._cv = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._inflight = {}  # prompt -> Future
+        self._running = 0
+        self._paused_until = 0.0
+        threading.Thread(target=self._dispatch, name="model-scheduler", daemon=True).start()
+
+    def submit(self, prompt: str, lane: str = "line") -> Future:
+        with self._cv:
+            future = self._inflight.get(prompt)
+            if future is not None:
+                MODEL_COALESCED.inc(lane=lane)
+                return future
+            future = Future()
+            self._inflight[prompt] = future
+            self._push(_Call(prompt, lane, future))
+        return future
+
+    def _push(self, call: _Call) -> None:
+        heapq.heappush(self._queue, (LANES.get(call.lane, len(LANES)), next(self._seq), call))
+        self._cv.notify()
+
+    def _dispatch(self):
+        while True:
+            with self._cv:
+                if not self._queue or self._running >= self.max_in_flight:
+                    self._cv.wait()
+                    continue
+                call = self._queue[0][2]
+                wait = max(self._paused_until - time.monotonic(),
+                           self.requests.wait_time(1), self.tokens.wait_time(call.tokens))
+                if wait > 0:
+                    self._cv.wait(wait)  # woken early if something more urgent arrives
+                    continue
+                heapq.heappop(self._queue)
+                self.requests.take(1)
+                self.tokens.take(call.tokens)
+                self._running += 1
+            MODEL_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - call.queued, lane=call.lane)
+            self.executor.submit(self._run, call)
+
+    def _run(self, call: _Call):
+        started = time.perf_counter()
+        outcome, result, error = "error", None, None
+        try:
+            resp = BACKEND.get().generate_content(call.prompt)
+            result, outcome = (resp.text or "").strip(), "ok"
+            used = getattr(getattr(resp, "usage_metadata", None), "total_token_count", None)
+            if used:
+                with self._cv:
+                    self.tokens.take(used - call.tokens)
+        except Exception as e:
+            error = e
+            if is_rate_limited(e):
+                outcome = "rate_limited"
+        finally:
+            MODEL_CALLS.inc(lane=call.lane, outcome=outcome)
+            MODEL_CALL_SECONDS.observe(time.perf_counter() - started, lane=call.lane)
+
+        with self._cv:
+            self._running -= 1
+            if outcome == "rate_limited" and call.attempt < MODEL_MAX_RETRIES:
+                call.attempt += 1
+                delay = min(MODEL_BACKOFF_MAX, MODEL_BACKOFF_BASE * 2 ** (call.attempt - 1)) * random.uniform(0.5, 1.0)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                MODEL_RETRIES.inc(lane=call.lane)
+                print(f"[warn] model rate-limited ({error}); retry {call.attempt}/{MODEL_MAX_RETRIES} in {delay:.1f}s")
+                call.queued = time.perf_counter()
+                self._push(call)
+                return
+            del self._inflight[call.prompt]
+            self._cv.notify()
+        if error is not None:
+            call.future.set_exception(error)
+        else:
+            call.future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._cv:
+            lanes = {}
+            for _, _, call in self._queue:
+                lanes[call.lane] = lanes.get(call.lane, 0) + 1
+            return {
+                "queued": len(self._queue),
+                "queued_by_lane": lanes,
+                "running": self._running,
+                "paused_s": round(max(0.0, self._paused_until - time.monotonic()), 1),
+                "rpm_limit": round(self.requests.rate * 60) or None,
+                "tpm_limit": round(self.tokens.rate * 60) or None,
+            }
+
+SCHEDULER = ModelScheduler(MODEL_EXECUTOR, MODEL_MAX_WORKERS, MODEL_RPM, MODEL_TPM, MODEL_BURST_SECONDS)
+
+def generate_text(prompt: str, lane: str = "line") -> str:
+    """Single entry point for model calls; blocks the calling thread, never the event loop."""
+    return SCHEDULER.submit(prompt, lane).result()
 
 # ================== FastAPI Router ==================
 router = APIRouter()
@@ -43,67 +340,92 @@ def parse_script_file(script_path: str):
     return dialogue
 
 def parse_srt_file(srt_path: str):
-    """Parse .srt to [{'index','start','end','text'}]"""
-    subs = []
-    with open(srt_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    blocks = re.split(r'\n\s*\n', content.strip())
-    for block in blocks:
-        lines = block.split('\n')
-        if len(lines) >= 3:
-            idx = lines[0].strip()
-            times = lines[1].strip()
-            text = ' '.join(lines[2:]).strip()
-            if ' --> ' in times:
-                start, end = times.split(' --> ')
-                try:
-                    subs.append({
-                        'index': int(idx),
-                        'start': start,
-                        'end': end,
-                        'text': text
-                    })
-                except:
-                    # Skip malformed block
-                    pass
-    return subs
-
-def generate_translation_prompt(dialogue, target_lang: str):
-    dialogue_text = "\n".join([f"{d['speaker']}: {d['text']}" for d in dialogue])
-    return f"""
-You are a professional subtitler like Netflix's best localization experts.
-Translate the following scene dialogue into {target_lang}, preserving emotional tone, idioms, slang, and natural fluency.
-Return lines ONLY in the format: SpeakerName: Translated text
-Do NOT add numbering, timestamps, or extra commentary.
-
-{dialogue_text}
-"""
-
-def translate_scene(dialogue, target_lang: str):
-    """Translate the whole scene using context. Fallback = echo source."""
-    if not GOOGLE_AI_AVAILABLE or not model:
-        return "\n".join([f"{d['speaker']}: {d['text']}" for d in dialogue])
+    """Parse .srt to [{'index','start','end','text'}] (times in ms, cue lines joined with spaces)"""
+    def skipped(line, message):
+        print(f"[warn] {os.path.basename(srt_path)}:{line}: skipping SRT block ({message})")
 
-    try:
-        prompt = generate_translation_prompt(dialogue, target_lang)
-        resp = model.generate_content(prompt)
-        return (resp.text or "").strip()
-    except Exception as e:
-        print(f"⚠️ Scene translation failed: {e} — falling back to echo.")
-        return "\n".join([f"{d['speaker']}: {d['text']}" for d in dialogue])
-
-def parse_translated_dialogue(translated_text: str):
-    """Parse 'Speaker: text' lines to [{'speaker','text'}]"""
-    out = []
-    for raw in translated_text.split('\n'):
-        line = raw.strip()
-        if not line:
-            continue
-        if ':' in line:
-            speaker, text = line.split(':', 1)
-            out.append({'speaker': speaker.strip(), 'text': text.strip()})
-        else:
-            out.append({'speaker': 'Unknown', 'text': line})
+    with subtitles.open_text(srt_path) as f:
+        return [
+            {'index': cue.index, 'start': cue.start, 'end': cue.end, 'text': ' '.join(cue.text.splitlines())}
+            for cue in subtitles.iter_srt(f, skipped)
+        ]
+
+def scene_windows(n: int, size: int, context: int):
+    """[(own_start, own_end, ctx_start, ctx_end)] covering n lines: each window
+    translates its own lines and sees `context` neighbours on either side."""
+    size = max(1, size)
+    return [(i, min(i + size, n), max(i - context, 0), min(i + size + context, n)) for i in range(0, n, size)]
+
+def generate_translation_prompt(dialogue, target_lang: str, own=None, ctx=None):
+    """
+    Scene prompt for dialogue[own[0]:own[1]] with '[id] Speaker: text' lines
+    (id = position in the script). Lines in ctx but outside own are shown
+    untagged as context only.
+    """
+    own = own or (0, len(dialogue))
+    ctx = ctx or own
+    before = "\n".join(f"{d['speaker']}: {d['text']}" for d in dialogue[ctx[0]:own[0]])
+    tagged = "\n".join(f"[{i}] {dialogue[i]['speaker']}: {dialogue[i]['text']}" for i in range(*own))
+    after = "\n".join(f"{d['speaker']}: {d['text']}" for d in dialogue[own[1]:ctx[1]])
+    return (
+        "You are a professional subtitler like Netflix's best localization experts.\n"
+        f"Translate the tagged scene lines into {target_lang}, preserving emotional tone, idioms, slang, and natural fluency.\n"
+        "Return one line per tagged line, ONLY in the format: [number] Translated text\n"
+        "Keep every [number] tag, do NOT merge or split lines, do NOT add speaker names or commentary.\n"
+        + (f"\nEarlier in the scene (context only, do not translate):\n{before}\n" if before else "")
+        + f"\nScene lines:\n{tagged}\n"
+        + (f"\nLater in the scene (context only, do not translate):\n{after}\n" if after else "")
+    )
+
+def parse_translated_dialogue(translated_text: str, dialogue):
+    """Parse '[id] text' lines to {id: text} for the IDs in dialogue; a repeated 'Speaker:' prefix is dropped."""
+    out = {}
+    for i, text in parse_batch_response(translated_text).items():
+        if 0 <= i < len(dialogue):
+            speaker = dialogue[i]['speaker']
+            if speaker and text.startswith(f"{speaker}:"):
+                text = text[len(speaker) + 1:].strip()
+            if text:
+                out[i] = text
+    return out
+
+def _translate_scene_window(dialogue, target_lang: str, own, ctx):
+    prompt = generate_translation_prompt(dialogue, target_lang, own, ctx)
+    scene_text = prompt.split("\n\n", 1)[-1]  # TM key: the lines, not the instructions
+    translated = cached = TM.get_scene(scene_text, target_lang) if TM else None
+    if not cached:
+        try:
+            translated = generate_text(prompt, lane="scene")
+        except Exception as e:
+            print(f"⚠️ Scene window {own[0]}-{own[1]} failed: {e} — its lines fall back to batches.")
+            return {}, False
+    # Only the window's own lines: the model may also answer for context lines
+    out = {i: t for i, t in parse_translated_dialogue(translated, dialogue).items() if own[0] <= i < own[1]}
+    if TM and not cached and len(out) == own[1] - own[0]:
+        TM.put_scene(scene_text, target_lang, translated)
+    return out, bool(cached)
+
+def translate_scene(dialogue, target_lang: str, report=None):
+    """
+    Translate the scene in windows of SCENE_WINDOW_LINES tagged lines (plus
+    SCENE_CONTEXT_LINES of untagged context either side), SCENE_CONCURRENCY
+    windows at a time. Returns {dialogue position: translation}; lines the
+    model dropped or merged are simply absent. TM first. Fallback = echo source.
+    """
+    if echo_mode():
+        return {i: d['text'] for i, d in enumerate(dialogue)}
+
+    windows = scene_windows(len(dialogue), SCENE_WINDOW_LINES, SCENE_CONTEXT_LINES)
+    with ThreadPoolExecutor(max_workers=max(1, SCENE_CONCURRENCY)) as pool:
+        results = list(pool.map(lambda w: _translate_scene_window(dialogue, target_lang, w[:2], w[2:]), windows))
+
+    out = {}
+    for translated, _ in results:
+        out.update(translated)
+    if report is not None:
+        report["scene_windows"] = len(windows)
+        report["scene_windows_from_tm"] = sum(hit for _, hit in results)
+        report["scene_lines_missing"] = len(dialogue) - len(out)
     return out
 
 # --- Japanese cleanup for better MT quality ---
@@ -115,9 +437,156 @@ def clean_japanese_text(text: str) -> str:
         return cleaned
     return text
 
+# ================== Translation Memory ==================
+
+class TranslationMemory:
+    """
+    Persistent (source text, target language) → translation store.
+    Keys are normalised with clean_japanese_text; least recently used rows
+    are evicted past max_entries, and rows older than ttl_seconds expire.
+    Single lines live in `tm` (what /tm/export and /tm/import carry); whole
+    scene-window answers are kept apart in `tm_scenes` (get_scene/put_scene).
+    """
+    EVICT_EVERY = 500  # puts between eviction sweeps
+    TABLES = ("tm", "tm_scenes")
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        for table in self.TABLES:
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " source TEXT NOT NULL, target_lang TEXT NOT NULL, translation TEXT NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL,"
+                " PRIMARY KEY (source, target_lang))"
+            )
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table}(last_used)")
+        self._db.commit()
+        self.evict()
+
+    @staticmethod
+    def key(text: str, target_lang: str):
+        return clean_japanese_text(text).strip(), target_lang.strip().lower()
+
+    def get_many(self, texts, target_lang: str, table: str = "tm"):
+        """Return {text: translation} for the texts found (hits refresh their LRU stamp)."""
+        texts = list(dict.fromkeys(texts))
+        if not texts:
+            return {}
+        now = time.time()
+        oldest = now - self.ttl_seconds if self.ttl_seconds > 0 else 0
+        found = {}
+        with self._lock:
+            for text in texts:
+                source, lang = self.key(text, target_lang)
+                row = self._db.execute(
+                    f"SELECT translation FROM {table} WHERE source=? AND target_lang=? AND created>=?",
+                    (source, lang, oldest)
+                ).fetchone()
+                if row:
+                    found[text] = row[0]
+                    self._db.execute(
+                        f"UPDATE {table} SET last_used=? WHERE source=? AND target_lang=?", (now, source, lang)
+                    )
+            self._db.commit()
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def get(self, text: str, target_lang: str):
+        return self.get_many([text], target_lang).get(text)
+
+    def put_many(self, pairs, target_lang: str, table: str = "tm"):
+        """Store [(source_text, translation)]."""
+        now = time.time()
+        rows = [(*self.key(src, target_lang), tr, now, now) for src, tr in pairs if src.strip() and tr]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany(f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+            self._puts += len(rows)
+            sweep = self._puts >= self.EVICT_EVERY
+        if sweep:
+            self.evict()
+
+    def put(self, text: str, target_lang: str, translation: str):
+        self.put_many([(text, translation)], target_lang)
+
+    def get_scene(self, scene_text: str, target_lang: str):
+        """The model's answer for a whole scene window (its tagged lines), or None."""
+        return self.get_many([scene_text], target_lang, table="tm_scenes").get(scene_text)
+
+    def put_scene(self, scene_text: str, target_lang: str, answer: str):
+        self.put_many([(scene_text, answer)], target_lang, table="tm_scenes")
+
+    def evict(self):
+        with self._lock:
+            self._puts = 0
+            for table in self.TABLES:
+                if self.ttl_seconds > 0:
+                    self._db.execute(f"DELETE FROM {table} WHERE created<?", (time.time() - self.ttl_seconds,))
+                self._db.execute(
+                    f"DELETE FROM {table} WHERE rowid IN ("
+                    f" SELECT rowid FROM {table} ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._db.commit()
+
+    def export_entries(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT source, target_lang, translation, created FROM tm ORDER BY last_used DESC"
+            ).fetchall()
+        return [{"source": s, "target_lang": l, "translation": t, "created": c} for s, l, t, c in rows]
+
+    def import_entries(self, entries):
+        """Bulk load [{'source','target_lang','translation'[,'created']}]; returns rows stored."""
+        now = time.time()
+        rows = []
+        for e in entries:
+            source, lang = self.key(e["source"], e["target_lang"])
+            created = float(e.get("created") or now)
+            rows.append((source, lang, e["translation"], created, now))
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO tm VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+        self.evict()
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+            scene_entries = self._db.execute("SELECT COUNT(*) FROM tm_scenes").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "scene_entries": scene_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate_pct": round(self.hits / lookups * 100.0, 1) if lookups else 0.0,
+        }
+
+TM = None
+if TM_PATH:
+    try:
+        TM = TranslationMemory(TM_PATH, TM_MAX_ENTRIES, TM_TTL_SECONDS)
+    except Exception as e:
+        print(f"⚠️ translation memory unavailable ({TM_PATH}): {e}")
+
 def translate_line(text: str, target_lang: str, max_retries: int = 3) -> str:
-    """Per-line translation with retries + JP cleanup. Fallback = echo."""
-    if not GOOGLE_AI_AVAILABLE or not model:
+    """Per-line translation with retries + JP cleanup. TM first. Fallback = echo."""
+    cached = TM.get(text, target_lang) if TM else None
+    if cached:
+        return cached
+
+    if echo_mode():
         return text
 
     cleaned = clean_japanese_text(text)
@@ -127,16 +596,19 @@ def translate_line(text: str, target_lang: str, max_retries: int = 3) -> str:
         "Output ONLY the translation, no quotes, no extra text."
     )
 
+    # Only an empty/identical answer is asked again here; rate limits are
+    # retried with backoff by SCHEDULER, and other errors would just repeat.
     for attempt in range(max_retries):
         try:
-            resp = model.generate_content(prompt)
-            translated = (resp.text or "").strip()
-            if translated and translated != cleaned:
-                return translated
-            else:
-                print(f"[warn] empty/identical translation attempt {attempt+1} for: {cleaned[:50]}...")
+            translated = generate_text(prompt, lane="line")
         except Exception as e:
-            print(f"[warn] line translation attempt {attempt+1} failed: {e}")
+            print(f"[warn] line translation failed: {e}")
+            break
+        if translated and translated != cleaned:
+            if TM:
+                TM.put(text, target_lang, translated)
+            return translated
+        print(f"[warn] empty/identical translation attempt {attempt+1} for: {cleaned[:50]}...")
 
     return f"[TRANSLATION FAILED] {text}"
 
@@ -149,7 +621,7 @@ def choose_best_variant(original_text: str, variants_text: str, target_lang: str
     if len(variants) <= 1:
         return variants[0] if variants else original_text
 
-    if not GOOGLE_AI_AVAILABLE or not model:
+    if echo_mode():
         return variants[0]
 
     prompt = (
@@ -159,39 +631,115 @@ def choose_best_variant(original_text: str, variants_text: str, target_lang: str
         "Reply with ONLY the chosen option text."
     )
     try:
-        resp = model.generate_content(prompt)
-        return (resp.text or "").strip() or variants[0]
+        return generate_text(prompt, lane="line") or variants[0]
     except Exception as e:
         print(f"[warn] variant choice failed: {e}")
         return variants[0]
 
-def align_translations_to_srt(srt_subtitles, translated_dialogue, target_lang: str):
+# --- Batched line translation ---
+_batch_line = re.compile(r'^\s*\[(\d+)\]\s*(.*)$')
+
+def generate_batch_prompt(items, target_lang: str):
+    """items: [(id, text)] → one prompt with '[id] text' lines."""
+    numbered = "\n".join(f"[{i}] {text}" for i, text in items)
+    return (
+        f"You are a professional subtitle translator. Translate each numbered line into {target_lang}.\n"
+        "Keep the [number] tag at the start of every line, one output line per input line.\n"
+        "Output ONLY the tagged translations, no extra text.\n\n"
+        f"{numbered}"
+    )
+
+def parse_batch_response(text: str):
+    """Parse '[id] translation' lines to {id: translation}. Untagged lines are ignored."""
+    out = {}
+    for raw in text.split('\n'):
+        m = _batch_line.match(raw)
+        if m and m.group(2).strip():
+            out[int(m.group(1))] = m.group(2).strip()
+    return out
+
+def translate_batch(items, target_lang: str):
+    """
+    Translate [(id, text)] in a single model call. Returns {id: translation}
+    for the IDs the model answered; missing/identical lines are left out so
+    the caller can fall back per line. Fallback = echo.
+    """
+    if echo_mode():
+        return {i: text for i, text in items}
+
+    cleaned = [(i, clean_japanese_text(text)) for i, text in items]
+    try:
+        parsed = parse_batch_response(generate_text(generate_batch_prompt(cleaned, target_lang), lane="batch"))
+    except Exception as e:
+        print(f"[warn] batch translation of {len(items)} lines failed: {e}")
+        return {}
+
+    sources = dict(cleaned)
+    return {i: t for i, t in parsed.items() if i in sources and t != sources[i]}
+
+def translate_lines_batched(lines, target_lang: str, report=None):
     """
-    Align scene-level translated lines to SRT lines. If we run out,
-    fallback to per-line translation. Also retry failures.
+    Translate {key: source_text} → {key: translation}.
+    Lines already in the translation memory are served from it. The rest are
+    packed BATCH_SIZE per prompt and up to BATCH_CONCURRENCY batches run at once;
+    only IDs missing from a batch response go through translate_line.
+    Counts go to `report` (tm_lines, batch_calls, line_fallbacks) when given.
     """
+    report = {} if report is None else report
+    remembered = TM.get_many(lines.values(), target_lang) if TM else {}
+    result = {k: remembered[v] for k, v in lines.items() if v in remembered}
+    report["tm_lines"] = report.get("tm_lines", 0) + len(result)
+    lines = {k: v for k, v in lines.items() if k not in result}
+    if not lines:
+        return result
+    keys = list(lines)
+
+    with ThreadPoolExecutor(max_workers=max(1, BATCH_CONCURRENCY)) as pool:
+        # If a source line has slash-variants, pick one first
+        sources = dict(zip(keys, pool.map(
+            lambda k: choose_best_variant(lines[k], lines[k], target_lang) if '/' in lines[k] else lines[k],
+            keys
+        )))
+
+        items = list(enumerate(sources[k] for k in keys))
+        batches = [items[i:i + max(1, BATCH_SIZE)] for i in range(0, len(items), max(1, BATCH_SIZE))]
+        translated = {}
+        for answered in pool.map(lambda b: translate_batch(b, target_lang), batches):
+            translated.update(answered)
+
+        missing = [i for i, _ in items if i not in translated]
+        report["batch_calls"] = report.get("batch_calls", 0) + len(batches)
+        report["line_fallbacks"] = report.get("line_fallbacks", 0) + len(missing)
+        if missing:
+            print(f"[debug] batch fallback: {len(missing)}/{len(items)} lines translated individually")
+
+        for i, text in zip(missing, pool.map(lambda i: translate_line(items[i][1], target_lang), missing)):
+            translated[i] = text
+
+    fresh = {k: translated[i] for i, k in enumerate(keys)}
+    if TM and not echo_mode():
+        TM.put_many([(lines[k], t) for k, t in fresh.items()
+                     if not t.startswith("[TRANSLATION FAILED]")], target_lang)
+    result.update(fresh)
+    return result
+
+def align_translations_to_srt(srt_subtitles, translated_dialogue, target_lang: str, report=None):
+    """
+    Align scene translations to SRT lines by ID: translated_dialogue maps a
+    script position to its translation, and script line i belongs to SRT cue i.
+    Cues without one (no script, or the model dropped/merged that line) are
+    translated in batches (see translate_lines_batched); a missing line never
+    shifts the ones after it.
+    """
+    report = {} if report is None else report
     aligned = []
-    td_i = 0
+    pending = {}
     print(f"[debug] SRT lines={len(srt_subtitles)}, scene lines={len(translated_dialogue)}")
 
     for i, sub in enumerate(srt_subtitles):
-        # If the source subtitle has slash-variants, optionally pick one first
-        source_text = sub['text']
-        if '/' in source_text:
-            chosen = choose_best_variant(source_text, source_text, target_lang)
-        else:
-            chosen = source_text
-
-        if td_i < len(translated_dialogue):
-            translated_text = translated_dialogue[td_i]['text']
-            td_i += 1
-        else:
-            translated_text = translate_line(chosen, target_lang)
-
-        if translated_text.startswith("[TRANSLATION FAILED]"):
-            retry = translate_line(chosen, target_lang, max_retries=1)
-            if not retry.startswith("[TRANSLATION FAILED]"):
-                translated_text = retry
+        translated_text = translated_dialogue.get(i)
+        if translated_text is None:
+            pending[i] = sub['text']
 
         aligned.append({
             'index': sub['index'],
@@ -200,17 +748,33 @@ def align_translations_to_srt(srt_subtitles, translated_dialogue, target_lang: s
             'translated_text': translated_text
         })
 
-    if len(translated_dialogue) > len(srt_subtitles):
-        print(f"[warn] Unused scene lines: {len(translated_dialogue) - len(srt_subtitles)}")
+    report["scene_lines"] = len(aligned) - len(pending)
+    report["fallback_lines"] = len(pending)
+    # Remember scene answers per cue too, so the same lines hit the TM
+    # later without a script (re-cut uploads, repeated intros/outros).
+    if TM and report["scene_lines"] and not echo_mode():
+        TM.put_many([(sub['text'], a['translated_text']) for sub, a in zip(srt_subtitles, aligned)
+                     if a['translated_text'] is not None], target_lang)
+    for i, text in translate_lines_batched(pending, target_lang, report).items():
+        aligned[i]['translated_text'] = text
+
+    unused = sum(1 for i in translated_dialogue if i >= len(srt_subtitles))
+    if unused:
+        print(f"[warn] Unused scene lines: {unused}")
 
     return aligned
 
-def translation_stats(aligned, target_language: str):
+def translation_stats(aligned, target_language: str, report=None):
+    """
+    Per-language quality summary. With the `report` filled in by
+    translate_scene/align_translations_to_srt (or retranslate_incremental) it
+    also says where the lines came from and how many model calls that took.
+    """
     total = len(aligned)
     failed = [s for s in aligned if s['translated_text'].startswith("[TRANSLATION FAILED]")]
     ok = total - len(failed)
     rate = (ok / total * 100.0) if total else 0.0
-    return {
+    stats = {
         "language": target_language,
         "total_lines": total,
         "translated": ok,
@@ -218,22 +782,237 @@ def translation_stats(aligned, target_language: str):
         "success_rate_pct": round(rate, 1),
         "failed_indices": [s['index'] for s in failed]
     }
+    if report:
+        scene_calls = report.get("scene_windows", 0) - report.get("scene_windows_from_tm", 0)
+        # Each line fallback is at least one translate_line call (more on retries)
+        model_calls = (scene_calls + report.get("batch_calls", 0) + report.get("context_calls", 0)
+                       + report.get("line_fallbacks", 0))
+        if "scene_lines" in report:
+            coverage = round(report["scene_lines"] / total * 100.0, 1) if total else 0.0
+            report = {**report, "scene_coverage_pct": coverage}
+        stats["efficiency"] = {
+            **report,
+            "min_model_calls": model_calls,
+            # vs. translating every cue with its own translate_line call
+            "line_calls_avoided": max(total - model_calls, 0),
+        }
+    return stats
 
 def write_srt_file(aligned, output_path: str):
-    with open(output_path, 'w', encoding='utf-8') as f:
-        for sub in aligned:
-            f.write(f"{sub['index']}\n")
-            f.write(f"{sub['start']} --> {sub['end']}\n")
-            f.write(f"{sub['translated_text']}\n\n")
+    subtitles.write_srt((subtitles.Cue(sub['index'], sub['start'], sub['end'], sub['translated_text'])
+                         for sub in aligned), output_path, renumber=False)
+
+# --- Incremental re-translation ---
+def _cue_key(text: str) -> str:
+    return " ".join(text.split())
+
+def diff_cues(old_subs, new_subs):
+    """
+    Match new cues to old ones by text (difflib over the cue sequence).
+    Returns ({new position: old position} for cues whose text is unchanged,
+    [new positions whose text is new or edited]).
+    """
+    matcher = difflib.SequenceMatcher(None, [_cue_key(s['text']) for s in old_subs],
+                                      [_cue_key(s['text']) for s in new_subs], autojunk=False)
+    carried, changed = {}, []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            carried.update(zip(range(j1, j2), range(i1, i2)))
+        elif tag in ("replace", "insert"):
+            changed.extend(range(j1, j2))
+    return carried, changed
+
+def _runs(positions, size: int = 0):
+    """[3, 4, 5, 9] → [[3, 4, 5], [9]]; with size=2 → [[3, 4], [5], [9]]"""
+    runs = []
+    for p in sorted(positions):
+        if runs and p == runs[-1][-1] + 1 and not (size and len(runs[-1]) >= size):
+            runs[-1].append(p)
+        else:
+            runs.append([p])
+    return runs
+
+def generate_context_prompt(items, before, after, target_lang: str):
+    """items: [(id, text)] to translate; before/after: [(source, translation)] of the neighbouring cues."""
+    ctx = lambda pairs: "\n".join(f"{src} => {tr}" for src, tr in pairs)
+    return (
+        f"You are a professional subtitle translator. Translate each numbered line into {target_lang}.\n"
+        "The neighbouring subtitles are shown with their existing translations; stay consistent with "
+        "their terminology, names and tone.\n"
+        "Keep the [number] tag at the start of every line, one output line per input line.\n"
+        "Output ONLY the tagged translations, no extra text.\n"
+        + (f"\nBefore (already translated):\n{ctx(before)}\n" if before else "")
+        + "\nTranslate:\n" + "\n".join(f"[{i}] {text}" for i, text in items) + "\n"
+        + (f"\nAfter (already translated):\n{ctx(after)}\n" if after else "")
+    )
+
+def retranslate_incremental(new_subs, old_subs, old_translations, target_lang: str, report=None):
+    """
+    Update a previous translation for an edited source SRT. old_translations[i]
+    is the translation of old_subs[i] (None if unknown). Cues whose text is
+    unchanged keep their translation with the new timing; each run of edited
+    or new cues (cut into pieces of at most BATCH_SIZE) is translated in one
+    call that shows RETRANSLATE_CONTEXT_CUES carried-over neighbours on
+    either side. Returns aligned cues like
+    align_translations_to_srt.
+    """
+    report = {} if report is None else report
+    carried, changed = diff_cues(old_subs, new_subs)
+    aligned, retimed = [], 0
+    for i, sub in enumerate(new_subs):
+        old = carried.get(i)
+        text = old_translations[old] if old is not None else None
+        if text is None or text.startswith("[TRANSLATION FAILED]"):
+            text = None
+            if old is not None:
+                changed.append(i)
+        elif (old_subs[old]['start'], old_subs[old]['end']) != (sub['start'], sub['end']):
+            retimed += 1
+        aligned.append({'index': sub['index'], 'start': sub['start'], 'end': sub['end'], 'translated_text': text})
+
+    pending = {i: new_subs[i]['text'] for i in changed}
+    remembered = TM.get_many(pending.values(), target_lang) if TM else {}
+    for i in [i for i in pending if pending[i] in remembered]:
+        aligned[i]['translated_text'] = remembered[pending.pop(i)]
+
+    runs = _runs(pending, BATCH_SIZE)
+    report.update({
+        "carried_lines": len(new_subs) - len(changed),
+        "retimed_lines": retimed,
+        "old_lines_dropped": len(old_subs) - len(carried),  # edited or deleted since the previous run
+        "changed_lines": len(changed),
+        "tm_lines": len(changed) - len(pending),
+        "context_calls": 0 if echo_mode() else len(runs),
+    })
+
+    def context(positions):
+        return [(new_subs[p]['text'], aligned[p]['translated_text']) for p in positions
+                if aligned[p]['translated_text'] is not None]
+
+    def translate_run(run):
+        if echo_mode():
+            return {i: pending[i] for i in run}
+        lo, hi = run[0], run[-1] + 1
+        before = context(range(max(lo - RETRANSLATE_CONTEXT_CUES, 0), lo))
+        after = context(range(hi, min(hi + RETRANSLATE_CONTEXT_CUES, len(new_subs))))
+        sources = {i: clean_japanese_text(pending[i]) for i in run}
+        try:
+            answered = parse_batch_response(generate_text(
+                generate_context_prompt(sources.items(), before, after, target_lang), lane="batch"))
+        except Exception as e:
+            print(f"[warn] context re-translation of cues {lo}-{hi - 1} failed: {e}")
+            answered = {}
+        return {i: answered[i] for i in run if answered.get(i) and answered[i] != sources[i]}
+
+    fresh = {}
+    with ThreadPoolExecutor(max_workers=max(1, BATCH_CONCURRENCY)) as pool:
+        for answered in pool.map(translate_run, runs):
+            fresh.update(answered)
+        missing = [i for i in pending if i not in fresh]
+        report["line_fallbacks"] = len(missing)
+        for i, text in zip(missing, pool.map(lambda i: translate_line(pending[i], target_lang), missing)):
+            fresh[i] = text
+
+    for i, text in fresh.items():
+        aligned[i]['translated_text'] = text
+    if TM and not echo_mode():
+        TM.put_many([(pending[i], t) for i, t in fresh.items()
+                     if not t.startswith("[TRANSLATION FAILED]")], target_lang)
+    print(f"[debug] incremental: {report['carried_lines']} carried ({retimed} retimed), "
+          f"{len(changed)} changed in {len(runs)} runs, {report['old_lines_dropped']} old lines dropped")
+    return aligned
+
+def read_previous_translation(old_subs, translated_path: str):
+    """Translations of old_subs from their translated SRT: by position when the cue counts match, else by index."""
+    cues = subtitles.read_srt(translated_path)
+    if len(cues) == len(old_subs):
+        return list(cues.texts)
+    by_index = {c.index: c.text for c in cues}
+    return [by_index.get(s['index']) for s in old_subs]
 
 # ================== Endpoint ==================
-app = FastAPI(title="Subtitle Translator API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start serving (liveness) at once; readiness follows when the backend is built.
+    if TRANSLATION_WARMUP:
+        asyncio.get_running_loop().run_in_executor(None, warm_up)
+    yield
+
+app = FastAPI(title="Subtitle Translator API", lifespan=lifespan)
+
+_job_slots = asyncio.Semaphore(MAX_ACTIVE_JOBS)
+_jobs_active = 0
+_jobs_waiting = 0
+
+def run_translation(tmpdir: str, srt, target_lang: str, script=None, previous=None):
+    """
+    Blocking part of /translate: save inputs, translate, write output. Runs on JOB_EXECUTOR.
+    previous=(source srt, translated srt) of an earlier run switches to
+    incremental re-translation. Stage timings (seconds) are returned in stats["timings"].
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    # Save inputs
+    srt_path = os.path.join(tmpdir, srt.filename or "input.srt")
+    with open(srt_path, "wb") as f:
+        shutil.copyfileobj(srt.file, f)
+
+    script_path = None
+    if script is not None:
+        script_path = os.path.join(tmpdir, script.filename or "script.txt")
+        with open(script_path, "wb") as f:
+            shutil.copyfileobj(script.file, f)
+
+    previous_paths = None
+    if previous is not None:
+        previous_paths = (os.path.join(tmpdir, "previous_source.srt"), os.path.join(tmpdir, "previous_translated.srt"))
+        for upload, path in zip(previous, previous_paths):
+            with open(path, "wb") as f:
+                shutil.copyfileobj(upload.file, f)
+
+    # Parse
+    srt_subs = parse_srt_file(srt_path)
+    t = _lap(timings, "parse", t0)
+
+    report = {}
+    if previous_paths:  # Only the cues that changed since the previous translation
+        old_subs = parse_srt_file(previous_paths[0])
+        old_translations = read_previous_translation(old_subs, previous_paths[1])
+        aligned = retranslate_incremental(srt_subs, old_subs, old_translations, target_lang, report)
+        t = _lap(timings, "incremental", t)
+    else:
+        translated_dialogue = {}
+        if script_path:  # Context-aware scene translation
+            dialogue = parse_script_file(script_path)
+            translated_dialogue = translate_scene(dialogue, target_lang, report)
+            t = _lap(timings, "scene", t)
+
+        # Align by ID (with batched fallback for lines the scene pass missed)
+        aligned = align_translations_to_srt(srt_subs, translated_dialogue, target_lang, report)
+        t = _lap(timings, "align", t)
+
+    # Write output
+    out_path = os.path.join(tmpdir, f"translated_{target_lang}.srt")
+    write_srt_file(aligned, out_path)
+    _lap(timings, "write", t)
+    _lap(timings, "total", t0)
+
+    return out_path, {**translation_stats(aligned, target_lang, report), "timings": timings}
+
+def _lap(timings: dict, stage: str, since: float) -> float:
+    now = time.perf_counter()
+    timings[stage] = round(now - since, 3)
+    JOB_SECONDS.observe(now - since, stage=stage)
+    return now
+
 @app.post("/translate")
 async def translate_endpoint(
     srt: UploadFile = File(...),
     target_lang: str = Form(...),
     script: UploadFile | None = File(None),     # optional: better context if provided
-    return_json_stats: bool = Form(False)       # optional: include stats JSON with file
+    return_json_stats: bool = Form(False),      # optional: include stats JSON with file
+    previous_srt: UploadFile | None = File(None),          # optional: source SRT of an earlier run
+    previous_translation: UploadFile | None = File(None)   # optional: that run's translated SRT
 ):
     """
     Inputs:
@@ -241,40 +1020,49 @@ async def translate_endpoint(
       - target_lang: e.g., "Japanese", "Spanish", "fr", etc.
       - script (optional): scene/script text file with lines like 'Speaker: text'
       - return_json_stats (optional): if True returns JSON + SRT path; else returns the .srt file directly
+      - previous_srt + previous_translation (optional, together): an earlier source SRT and its
+        translation; only cues whose text changed are translated (script is then ignored),
+        the rest keep their translation with the new timing
     Output:
       - translated_{target_lang}.srt (FileResponse) OR JSON with stats + temp path
+      - 503 + Retry-After when MAX_ACTIVE_JOBS are running and MAX_QUEUED_JOBS are waiting,
+        or when the translation backend cannot be initialised
     """
-    tmpdir = tempfile.mkdtemp()
-    try:
-        # Save inputs
-        srt_path = os.path.join(tmpdir, srt.filename or "input.srt")
-        with open(srt_path, "wb") as f:
-            shutil.copyfileobj(srt.file, f)
-
-        script_path = None
-        if script is not None:
-            script_path = os.path.join(tmpdir, script.filename or "script.txt")
-            with open(script_path, "wb") as f:
-                shutil.copyfileobj(script.file, f)
-
-        # Parse
-        srt_subs = parse_srt_file(srt_path)
-
-        translated_dialogue = []
-        if script_path:  # Context-aware scene translation
-            dialogue = parse_script_file(script_path)
-            scene_text = translate_scene(dialogue, target_lang)
-            translated_dialogue = parse_translated_dialogue(scene_text)
-
-        # Align (with fallback per-line translation)
-        aligned = align_translations_to_srt(srt_subs, translated_dialogue, target_lang)
+    global _jobs_active, _jobs_waiting
+    if (previous_srt is None) != (previous_translation is None):
+        return JSONResponse({"ok": False, "error": "previous_srt and previous_translation go together"},
+                            status_code=422)
+    if not BACKEND.ready:
+        try:
+            await asyncio.to_thread(BACKEND.get)
+        except BackendUnavailable as e:
+            JOBS_TOTAL.inc(outcome="unavailable")
+            return JSONResponse({"ok": False, "error": str(e)}, status_code=503,
+                                headers={"Retry-After": str(int(BACKEND_RETRY_SECONDS))})
+    if _job_slots.locked() and _jobs_waiting >= MAX_QUEUED_JOBS:
+        JOBS_TOTAL.inc(outcome="rejected")
+        return JSONResponse({"ok": False, "error": "Translator busy, retry later"},
+                            status_code=503, headers={"Retry-After": str(BUSY_RETRY_AFTER)})
 
-        # Write output
-        out_path = os.path.join(tmpdir, f"translated_{target_lang}.srt")
-        write_srt_file(aligned, out_path)
+    _jobs_waiting += 1
+    queued_at = time.perf_counter()
+    try:
+        await _job_slots.acquire()
+    finally:
+        _jobs_waiting -= 1
+    queue_wait = time.perf_counter() - queued_at
+    JOB_QUEUE_WAIT_SECONDS.observe(queue_wait)
 
-        # Build stats (optional)
-        stats = translation_stats(aligned, target_lang)
+    tmpdir = tempfile.mkdtemp()
+    _jobs_active += 1
+    try:
+        loop = asyncio.get_running_loop()
+        out_path, stats = await loop.run_in_executor(
+            JOB_EXECUTOR, run_translation, tmpdir, srt, target_lang, script,
+            (previous_srt, previous_translation) if previous_srt is not None else None
+        )
+        stats["timings"]["queue_wait"] = round(queue_wait, 3)
+        JOBS_TOTAL.inc(outcome="ok")
 
         if return_json_stats:
             # Return JSON (path is temp; orchestrator can fetch file immediately)
@@ -287,7 +1075,86 @@ async def translate_endpoint(
         # Default: return the SRT file directly
         return FileResponse(out_path,
                             filename=f"translated_{target_lang}.srt",
-                            media_type="text/plain")
+                            media_type="text/plain",
+                            headers={"X-Queue-Wait-Seconds": str(round(queue_wait, 3)),
+                                     "X-Translate-Seconds": str(stats["timings"]["total"])})
 
     except Exception as e:
+        JOBS_TOTAL.inc(outcome="error")
         return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        _jobs_active -= 1
+        _job_slots.release()
+
+@app.get("/tm/export")
+async def tm_export():
+    """Dump the translation memory as JSON (for backup or seeding another instance)."""
+    if not TM:
+        return JSONResponse({"ok": False, "error": "Translation memory disabled"}, status_code=404)
+    entries = await asyncio.get_running_loop().run_in_executor(JOB_EXECUTOR, TM.export_entries)
+    return {"ok": True, "entries": entries}
+
+@app.post("/tm/import")
+async def tm_import(file: UploadFile = File(...)):
+    """Bulk-load a /tm/export dump (either the full response or just its 'entries' list)."""
+    if not TM:
+        return JSONResponse({"ok": False, "error": "Translation memory disabled"}, status_code=404)
+    try:
+        payload = json.loads(await file.read())
+        entries = payload["entries"] if isinstance(payload, dict) else payload
+        stored = await asyncio.get_running_loop().run_in_executor(JOB_EXECUTOR, TM.import_entries, entries)
+        return {"ok": True, "imported": stored, "tm": TM.stats()}
+    except Exception as e:
+        return JSONResponse({"ok": False, "error": f"Invalid TM dump: {e}"}, status_code=422)
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is serving. Whether it can translate is /readyz."""
+    return {
+        "ok": True,
+        "backend": BACKEND.stats(),
+        "tm": TM.stats() if TM else None,
+        "jobs_active": _jobs_active,
+        "jobs_waiting": _jobs_waiting,
+        "max_active_jobs": MAX_ACTIVE_JOBS,
+        "max_queued_jobs": MAX_QUEUED_JOBS,
+        "model_scheduler": SCHEDULER.stats(),
+    }
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: 200 once the translation backend is built, else 503 with its
+    state. A cold or failed backend (after BACKEND_RETRY_SECONDS) is
+    initialised in the background, so probes never wait on it.
+    """
+    backend = BACKEND.stats()
+    if backend["state"] == "ready":
+        return {"ok": True, "backend": backend}
+    if backend["state"] != "initialising":
+        asyncio.get_running_loop().run_in_executor(None, warm_up)
+    return JSONResponse({"ok": False, "backend": backend}, status_code=503)
+
+@app.get("/metrics")
+async def metrics():
+    tm = TM.stats() if TM else {"entries": 0, "hits": 0, "misses": 0}
+    sched = SCHEDULER.stats()
+    lines = [
+        *gauge("translate_backend_ready", "1 once the translation backend is initialised", int(BACKEND.ready)),
+        *gauge("translate_model_queued", "Model calls waiting in the scheduler", sched["queued"]),
+        *gauge("translate_model_running", "Model calls in flight", sched["running"]),
+        *gauge("translate_jobs_active", "Translation jobs holding a slot", _jobs_active),
+        *gauge("translate_jobs_waiting", "Translation jobs waiting for a slot", _jobs_waiting),
+        *gauge("translate_tm_entries", "Translation memory rows", tm["entries"]),
+        *gauge("translate_tm_hits_total", "Translation memory hits since start", tm["hits"], "counter"),
+        *gauge("translate_tm_misses_total", "Translation memory misses since start", tm["misses"], "counter"),
+        *JOBS_TOTAL.render(),
+        *JOB_SECONDS.render(),
+        *JOB_QUEUE_WAIT_SECONDS.render(),
+        *MODEL_CALLS.render(),
+        *MODEL_CALL_SECONDS.render(),
+        *MODEL_QUEUE_WAIT_SECONDS.render(),
+        *MODEL_RETRIES.render(),
+        *MODEL_COALESCED.render(),
+    ]
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
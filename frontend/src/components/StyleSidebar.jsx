@@ -9,9 +9,9 @@ import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card.j
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs.jsx'
 import { Badge } from '@/components/ui/badge.jsx'
 import { ScrollArea } from '@/components/ui/scroll-area.jsx'
-import { Type, Palette, Eye, Move, Settings, Sparkles, RotateCcw } from 'lucide-react'
+import { Type, Palette, Eye, Move, Settings, Sparkles, RotateCcw, Film, Loader2 } from 'lucide-react'
 
-const StyleSidebar = ({ styleConfig, onStyleChange, onPresetApply }) => {
+const StyleSidebar = ({ styleConfig, onStyleChange, onPresetApply, onRenderPreview, previewUrl, isPreviewing, previewError }) => {
   const [colorInputs, setColorInputs] = useState({
     font_color: styleConfig.font_color,
     outline_color: styleConfig.outline_color
@@ -461,6 +461,52 @@ const StyleSidebar = ({ styleConfig, onStyleChange, onPresetApply }) => {
                 </CardContent>
               </Card>
 
+              {/* Server Preview */}
+              {onRenderPreview && (
+                <Card>
+                  <CardHeader className="pb-3">
+                    <CardTitle className="text-sm flex items-center gap-2">
+                      <Film className="w-4 h-4" />
+                      Server Preview
+                    </CardTitle>
+                  </CardHeader>
+                  <CardContent className="space-y-3">
+                    <p className="text-xs text-muted-foreground">
+                      Render a few seconds with the real encoder to check the burned-in result
+                    </p>
+                    <Button
+                      size="sm"
+                      className="w-full"
+                      onClick={onRenderPreview}
+                      disabled={isPreviewing}
+                    >
+                      {isPreviewing ? (
+                        <>
+                          <Loader2 className="w-4 h-4 mr-2 animate-spin" />
+                          Rendering...
+                        </>
+                      ) : (
+                        'Render Preview'
+                      )}
+                    </Button>
+                    {previewError && (
+                      <p className="text-xs text-destructive">{previewError}</p>
+                    )}
+                    {previewUrl && (
+                      <video
+                        key={previewUrl}
+                        src={previewUrl}
+                        className="w-full rounded"
+                        controls
+                        autoPlay
+                        loop
+                        muted
+                      />
+                    )}
+                  </CardContent>
+                </Card>
+              )}
+
               {/* Reset Button */}
               <Button 
                 variant="outline" 
@@ -4,9 +4,14 @@ export const API_BASE_URL = "https://audio-subtitler-orchestrator.onrender.com";
 export const API_ENDPOINTS = {
   PROCESS_INITIAL: `${API_BASE_URL}/process_initial`,
   OVERLAY: `${API_BASE_URL}/overlay`,
+  PREVIEW: `${API_BASE_URL}/preview`,
   HEALTH: `${API_BASE_URL}/healthz`,
+  JOB_STATUS: (jobId) => `${API_BASE_URL}/jobs/${jobId}`,
 };
 
+// How often to poll a background job while it is queued/running (ms)
+export const JOB_POLL_INTERVAL_MS = 2000;
+
 // Default fetch options with CORS support
 export const DEFAULT_FETCH_OPTIONS = {
   mode: "cors",
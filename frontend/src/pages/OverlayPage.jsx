@@ -4,7 +4,7 @@ import { Button } from "@/components/ui/button.jsx";
 import { ArrowLeft, Download, Loader2 } from "lucide-react";
 import StyleSidebar from "../components/StyleSidebar";
 import VideoPlayer from "../components/VideoPlayer";
-import { applyOverlay } from "../utils/api.js";
+import { applyOverlay, previewOverlay } from "../utils/api.js";
 
 const OverlayPage = () => {
   const [videoUrl, setVideoUrl] = useState(null);
@@ -14,6 +14,9 @@ const OverlayPage = () => {
   const [srtData, setSrtData] = useState([]);
   const [isDownloading, setIsDownloading] = useState(false);
   const [isProcessing, setIsProcessing] = useState(false);
+  const [previewUrl, setPreviewUrl] = useState(null);
+  const [isPreviewing, setIsPreviewing] = useState(false);
+  const [previewError, setPreviewError] = useState(null);
   const [styleConfig, setStyleConfig] = useState({
     font: "Arial",
     font_size: 28,
@@ -59,6 +62,33 @@ const OverlayPage = () => {
     setSrtData(sampleSrt);
   }, [navigate]);
 
+  // Release the last server preview when it is replaced or the page unmounts
+  useEffect(() => {
+    return () => {
+      if (previewUrl) URL.revokeObjectURL(previewUrl);
+    };
+  }, [previewUrl]);
+
+  const handleRenderPreview = async () => {
+    if (!jobId) return;
+    setIsPreviewing(true);
+    setPreviewError(null);
+    try {
+      // A few seconds from the start, burned with the current style
+      const blob = await previewOverlay(jobId, styleConfig, { start: 0 });
+      setPreviewUrl(URL.createObjectURL(blob));
+    } catch (error) {
+      console.error("Error rendering preview:", error);
+      setPreviewError(
+        error.message.includes("Failed to fetch")
+          ? "Unable to connect to the server."
+          : error.message
+      );
+    } finally {
+      setIsPreviewing(false);
+    }
+  };
+
   const handleStyleChange = (newStyle) => {
     setStyleConfig((prev) => ({ ...prev, ...newStyle }));
   };
@@ -141,6 +171,10 @@ const OverlayPage = () => {
           styleConfig={styleConfig}
           onStyleChange={handleStyleChange}
           onPresetApply={handlePresetApply}
+          onRenderPreview={handleRenderPreview}
+          previewUrl={previewUrl}
+          isPreviewing={isPreviewing}
+          previewError={previewError}
         />
       </div>
 
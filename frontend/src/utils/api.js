@@ -3,6 +3,7 @@ import {
   DEFAULT_FETCH_OPTIONS,
   UPLOAD_FETCH_OPTIONS,
   DOWNLOAD_FETCH_OPTIONS,
+  JOB_POLL_INTERVAL_MS,
 } from "../config.js";
 
 /**
@@ -27,9 +28,28 @@ export async function checkBackendHealth() {
 }
 
 /**
- * Process initial video upload
+ * Fetch the status of a background job
  */
-export async function processInitialVideo(file, targetLanguage) {
+export async function getJobStatus(jobId) {
+  const response = await fetch(API_ENDPOINTS.JOB_STATUS(jobId), {
+    method: "GET",
+    ...DEFAULT_FETCH_OPTIONS,
+  });
+
+  if (!response.ok) {
+    const errorText = await response.text();
+    throw new Error(`Job status failed: ${response.status} - ${errorText}`);
+  }
+
+  return await response.json();
+}
+
+/**
+ * Process initial video upload.
+ * The backend queues the job and returns a job_id right away; we poll
+ * until extraction + translation are done. onProgress receives each status.
+ */
+export async function processInitialVideo(file, targetLanguage, onProgress) {
   const formData = new FormData();
   formData.append("file", file);
   formData.append("target_lang", targetLanguage);
@@ -45,7 +65,21 @@ export async function processInitialVideo(file, targetLanguage) {
     throw new Error(`Processing failed: ${response.status} - ${errorText}`);
   }
 
-  return await response.json();
+  const { job_id } = await response.json();
+
+  for (;;) {
+    const status = await getJobStatus(job_id);
+    onProgress?.(status);
+
+    if (status.status === "done") {
+      return status;
+    }
+    if (status.status === "failed") {
+      throw new Error(`Processing failed: ${status.error}`);
+    }
+
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
 }
 
 /**
@@ -70,3 +104,31 @@ export async function applyOverlay(jobId, styleConfig) {
   // Return the blob for download
   return await response.blob();
 }
+
+/**
+ * Render a short low-resolution preview of the current style.
+ * window: { start, duration } in seconds, or { cue } to preview one subtitle.
+ */
+export async function previewOverlay(jobId, styleConfig, window = {}) {
+  const formData = new FormData();
+  formData.append("job_id", jobId);
+  formData.append("style_json", JSON.stringify(styleConfig));
+  for (const key of ["start", "duration", "cue"]) {
+    if (window[key] !== undefined && window[key] !== null) {
+      formData.append(key, String(window[key]));
+    }
+  }
+
+  const response = await fetch(API_ENDPOINTS.PREVIEW, {
+    method: "POST",
+    body: formData,
+    ...DOWNLOAD_FETCH_OPTIONS,
+  });
+
+  if (!response.ok) {
+    const errorText = await response.text();
+    throw new Error(`Preview failed: ${response.status} - ${errorText}`);
+  }
+
+  return await response.blob();
+}